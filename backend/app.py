@@ -1,16 +1,55 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, request, jsonify, Response, make_response, g, has_request_context, send_file
 from flask_cors import CORS
 import mysql.connector
 from datetime import datetime
+import csv
+import io
+import logging
 import os
+import sys
+import time
+from functools import wraps
+from db_pool import get_pool, all_pool_stats, PoolExhaustedError
+from db_router import ReplicaRouter
+from serialization import RowJSONProvider
+from columnar import to_columnar
+from compression import compress_response
+from exports import EXPORT_QUERIES, EXPORT_FORMATS, ndjson_chunks, csv_chunks
+from table_versions import touch_tables, read_versions, make_etag
+from rollups import (ALL_OWNERS_ID, SKILL_FLAGS, trainee_changed, trainees_inserted, trainees_changed,
+                     training_changed, trainings_changed, lock_trainee, lock_trainees, lock_training,
+                     lock_trainings, professional_added, professional_removed, read_stats)
+from reports import ReportParamError, build_report_query
+from search import SearchParamError, build_search_queries
+from changes import (UPSERT, DELETE, MAX_LIMIT as CHANGES_MAX_LIMIT, DEFAULT_LIMIT as CHANGES_DEFAULT_LIMIT,
+                     CursorExpiredError, record_changes, owned_row_deletes, parse_cursor, current_cursor,
+                     read_changes)
+from enrollments import (EnrollmentError, parse_trainee_ids, enroll, unenroll, trainees_removed,
+                         owner_trainees_removed, capacity_error)
+from events import EventBroker, TooManySubscribersError, event_stream, replay
+from result_cache import cache_from_env
+from metrics import Metrics
+from db_timing import TimedConnection, record_connect
+from slow_queries import SlowQueryLog
+from health import HealthMonitor
+import repository
+import sqlite_backend
+import sync
+import jobs
+from flags import parse_flag
+from listing import (ListSpec, ListParamError, ALL_OWNERS, parse_list_args, build_filters,
+                     build_list_query, page_rows)
 from werkzeug.security import generate_password_hash, check_password_hash
 
-app = Flask(__name__)
-CORS(app)
-
-# Production-ready configuration
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'suraksha-medical-training-2024')
-app.config['DEBUG'] = os.environ.get('FLASK_ENV') != 'production'
+# The endpoints; create_app() registers them on the application
+api = Blueprint('api', __name__)
+# Same logger as the application's app.logger
+logger = logging.getLogger(__name__)
+# Request metrics; create_app() installs the hooks (see metrics.py)
+metrics = Metrics()
+# Logs statements slower than SLOW_QUERY_MS, with sampled EXPLAIN plans (see slow_queries.py)
+slow_query_log = SlowQueryLog(app_logger=logger)
+slow_query_log.install()
 
 # Database configuration
 DB_CONFIG = {
@@ -21,21 +60,301 @@ DB_CONFIG = {
     'charset': 'utf8mb4',
     'use_unicode': True
 }
+DB_CONNECT_KWARGS = {
+    'connection_timeout': 30,
+    'autocommit': True
+}
+# Under gunicorn's gevent worker the C extension would block every greenlet of
+# the worker while one waits on MySQL; the pure-Python protocol yields instead
+if 'gevent.monkey' in sys.modules and sys.modules['gevent.monkey'].is_module_patched('socket'):
+    DB_CONNECT_KWARGS['use_pure'] = True
+DB_CONNECT = mysql.connector.connect
+
+# DB_BACKEND=sqlite runs everything on an embedded database instead (see sqlite_backend.py)
+DB_BACKENDS = ('mysql', 'sqlite')
+DB_BACKEND = os.environ.get('DB_BACKEND', 'mysql')
+if DB_BACKEND not in DB_BACKENDS:
+    raise ValueError(f"DB_BACKEND must be one of: {', '.join(DB_BACKENDS)}")
+if DB_BACKEND == 'sqlite':
+    DB_CONFIG = {'database': sqlite_backend.SQLITE_PATH}
+    DB_CONNECT = sqlite_backend.connect
+
+# Sends @read_only views to the read replicas in DB_REPLICAS (see db_router.py)
+db_router = (ReplicaRouter([]) if DB_BACKEND == 'sqlite' else
+             ReplicaRouter.from_env(DB_CONFIG, connect_kwargs=DB_CONNECT_KWARGS))
+
+BLOCKS = ('Bastar', 'Bilaspur', 'Durg', 'Raigarh', 'Raipur', 'Surguja')
+TRAINEE_REQUIRED_FIELDS = ('name', 'gender', 'age', 'department', 'address', 'block', 'training_date',
+                           'registered_by')
+TRAINING_STATUSES = ('Planned', 'Ongoing', 'Completed', 'Cancelled')
+TRAINING_REQUIRED_FIELDS = ('title', 'training_topic', 'address', 'block', 'training_date', 'training_time')
+PROFESSIONAL_REQUIRED_FIELDS = ('name', 'username', 'gender', 'age')
+
+# Columns the PATCH variants of the edit endpoints may write
+TRAINEE_PATCH_COLUMNS = ('name', 'mobile_number', 'gender', 'age', 'department', 'designation', 'address', 'block',
+                         'training_date') + SKILL_FLAGS
+TRAINING_PATCH_COLUMNS = ('title', 'description', 'training_topic', 'address', 'block', 'training_date',
+                          'training_time', 'duration_hours', 'max_trainees', 'status')
+PROFESSIONAL_PATCH_COLUMNS = ('name', 'username', 'mobile_number', 'gender', 'age', 'designation', 'department',
+                              'specialization', 'experience_years')
+
+# Bulk import limits
+BULK_MAX_ROWS = int(os.environ.get('BULK_MAX_ROWS', 5000))
+BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', 500))
+
+# Training and trainee counts are computed with correlated COUNT(*) subqueries
+# that each walk one foreign-key index, instead of LEFT JOINing both tables to
+# users (which produced #trainings x #trainees rows per professional before
+# COUNT(DISTINCT ...) collapsed them).
+PROFESSIONAL_SELECT = """
+    u.id, u.name, u.username, u.mobile_number, u.gender, u.age, 
+    u.designation, u.department, u.specialization, u.experience_years, u.created_at,
+    (SELECT COUNT(*) FROM trainings t WHERE t.conducted_by = u.id) as total_trainings,
+    (SELECT COUNT(*) FROM trainees tr WHERE tr.registered_by = u.id) as total_trainees_trained
+"""
+
+# Cached list responses (see result_cache.py for the RESULT_CACHE_* settings)
+result_cache = cache_from_env()
+# Read by create_app() at startup so the first dashboard loads come from the result cache
+WARM_PATHS = [path for path in os.environ.get(
+    'WARM_PATHS', '/api/stats?role=admin,/api/get_trainings?role=admin').split(',') if path]
+
+# Filters and sort keys accepted by the list endpoints
+TRAINEE_LIST_SPEC = ListSpec(
+    select_sql='t.*, u.name as registered_by_name',
+    from_sql='trainees t JOIN users u ON t.registered_by = u.id',
+    owner_column='t.registered_by',
+    id_column='t.id',
+    sort_keys={
+        'created_at': [('t.created_at', 'created_at')],
+        'training_date': [('t.training_date', 'training_date')],
+        'name': [('t.name', 'name')],
+    },
+    default_sort='created_at',
+    filters={
+        'block': ('eq', 't.block'),
+        'department': ('eq', 't.department'),
+        'training_date_from': ('date_from', 't.training_date'),
+        'training_date_to': ('date_to', 't.training_date'),
+        'cpr_training': ('bool', 't.cpr_training'),
+        'first_aid_kit_given': ('bool', 't.first_aid_kit_given'),
+        'life_saving_skills': ('bool', 't.life_saving_skills'),
+        'search': ('search', ['t.name', 't.mobile_number']),
+    }
+)
+
+TRAINING_LIST_SPEC = ListSpec(
+    select_sql='t.*, u.name as conducted_by_name',
+    from_sql='trainings t JOIN users u ON t.conducted_by = u.id',
+    owner_column='t.conducted_by',
+    id_column='t.id',
+    sort_keys={
+        'training_date': [('t.training_date', 'training_date'), ('t.training_time', 'training_time')],
+        'created_at': [('t.created_at', 'created_at')],
+        'title': [('t.title', 'title')],
+    },
+    default_sort='training_date',
+    filters={
+        'block': ('eq', 't.block'),
+        'status': ('eq', 't.status'),
+        'training_date_from': ('date_from', 't.training_date'),
+        'training_date_to': ('date_to', 't.training_date'),
+        'search': ('search', ['t.title', 't.training_topic']),
+    }
+)
+
+PROFESSIONAL_LIST_SPEC = ListSpec(
+    select_sql=PROFESSIONAL_SELECT,
+    from_sql='users u',
+    base_where=["u.role = 'professional'"],
+    id_column='u.id',
+    sort_keys={
+        'created_at': [('u.created_at', 'created_at')],
+        'name': [('u.name', 'name')],
+    },
+    default_sort='created_at',
+    filters={
+        'department': ('eq', 'u.department'),
+        'specialization': ('eq', 'u.specialization'),
+        'search': ('search', ['u.name', 'u.username', 'u.mobile_number']),
+    }
+)
+
+# List spec whose row shape /api/changes returns for each synced table
+CHANGE_SPECS = {'trainees': TRAINEE_LIST_SPEC, 'trainings': TRAINING_LIST_SPEC, 'users': PROFESSIONAL_LIST_SPEC}
+
+def owner_id_error(data, column):
+    """Why the owning professional's id in ``column`` is unusable, or None (the rollups key on it as an int)"""
+    value = data.get(column)
+    if value and (isinstance(value, bool) or not str(value).isdigit()):
+        return f"{column} must be a user id"
+    return None
+
+def trainee_errors(data):
+    """Validation problems for one trainee payload (empty list when valid)"""
+    errors = []
+    missing = [field for field in TRAINEE_REQUIRED_FIELDS if not data.get(field)]
+    if missing:
+        errors.append(f"Missing required fields: {', '.join(missing)}")
+    if data.get('block') and data.get('block') not in BLOCKS:
+        errors.append(f"Block must be one of: {', '.join(BLOCKS)}")
+    owner_error = owner_id_error(data, 'registered_by')
+    if owner_error:
+        errors.append(owner_error)
+    return errors
+
+def patch_values(data, columns, required):
+    """{column: value} of a PATCH payload, restricted to ``columns``; raises ValueError"""
+    if not isinstance(data, dict):
+        raise ValueError('Request body must be a JSON object')
+    unknown = sorted(set(data) - set(columns))
+    if unknown:
+        raise ValueError(f"Fields cannot be updated: {', '.join(unknown)}")
+    values = {column: data[column] for column in columns if column in data}
+    if not values:
+        raise ValueError('No fields to update')
+    emptied = [column for column in required if column in values and values[column] in (None, '')]
+    if emptied:
+        raise ValueError(f"Fields cannot be empty: {', '.join(emptied)}")
+    if 'block' in values and values['block'] not in BLOCKS:
+        raise ValueError(f"Block must be one of: {', '.join(BLOCKS)}")
+    if 'status' in values and values['status'] not in TRAINING_STATUSES:
+        raise ValueError(f"Status must be one of: {', '.join(TRAINING_STATUSES)}")
+    return values
+
+def trainee_insert_values(data):
+    """Parameters for repository.trainees.insert() from a trainee payload"""
+    return (data.get('name'), data.get('mobile_number'), data.get('gender'), data.get('age'),
+            data.get('department'), data.get('designation', ''), data.get('address'), data.get('block'),
+            data.get('training_date'), parse_flag(data.get('cpr_training', False)),
+            parse_flag(data.get('first_aid_kit_given', False)), parse_flag(data.get('life_saving_skills', False)),
+            data.get('registered_by'))
+
+def reader_key():
+    """Read-your-writes key of the caller: 'admin' or their user_id"""
+    if request.args.get('role') == 'admin':
+        return 'admin'
+    return request.args.get('user_id')
+
+def primary_pool():
+    return get_pool('primary', DB_CONFIG, connect_kwargs=DB_CONNECT_KWARGS, connect=DB_CONNECT)
 
 def get_db_connection():
-    """Get database connection with better error handling"""
-    try:
-        connection = mysql.connector.connect(
-            **DB_CONFIG,
-            connection_timeout=30,
-            autocommit=True
-        )
-        return connection
+    """Check out a pooled database connection; close() returns it to the pool.
+
+    Inside @read_only views the connection comes from a read replica when one
+    is healthy and caught up (see db_router.py).
+    """
+    try:
+        started = time.perf_counter()
+        try:
+            connection = None
+            if has_request_context() and g.get('read_only'):
+                connection = db_router.read_connection(reader_key(), g.get('table_versions'))
+            if connection is None:
+                connection = primary_pool().acquire()
+        finally:
+            record_connect(time.perf_counter() - started)
+        return TimedConnection(connection)
+    except PoolExhaustedError as e:
+        logger.error(f"Database pool exhausted: {e}")
+        return None
     except mysql.connector.Error as e:
-        app.logger.error(f"Database connection error: {e}")
+        logger.error(f"Database connection error: {e}")
         return None
 
-@app.route('/api/login', methods=['POST'])
+# Fans committed change_log entries out to /api/events subscribers (see events.py)
+event_broker = EventBroker(get_db_connection, logger=logger)
+# Pings the primary in the background for the health probes (see health.py)
+health_monitor = HealthMonitor(lambda: primary_pool().acquire(), logger=logger)
+
+def versioned_read(*tables):
+    """ETag / 304 handling and result caching for read endpoints over ``tables``.
+
+    The ETag is derived from the endpoint, its query parameters (which carry
+    role and user_id) and the table_versions stamps, so the check costs one
+    primary-key lookup. The same value keys the result cache, which means a
+    write in any worker makes older entries unreachable; commit_write()
+    additionally drops them from this worker's cache straight away.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            connection = get_db_connection()
+            if not connection:
+                return view(*args, **kwargs)
+            try:
+                versions = read_versions(connection, tables)
+            except mysql.connector.Error as e:
+                logger.warning(f"Could not read table versions: {e}")
+                return view(*args, **kwargs)
+            finally:
+                connection.close()
+
+            etag = make_etag(request.path, request.args.items(multi=True), versions)
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                cache_key = f"{request.path}:{etag}"
+                cached = result_cache.get(cache_key)
+                if cached is not None:
+                    body, mimetype = cached
+                    response = Response(body, mimetype=mimetype)
+                    response.headers['X-Cache'] = 'HIT'
+                else:
+                    # A replica may only serve the view once it has these versions too
+                    g.table_versions = versions
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    if not response.is_streamed:
+                        result_cache.set(cache_key, (response.get_data(), response.mimetype), tables)
+                    response.headers['X-Cache'] = 'MISS'
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+def read_only(view):
+    """Let the view read from a replica; place it below @versioned_read, whose stamps come from the primary"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+def commit_write(connection, *tables, changes=()):
+    """Bump table versions, log ``changes`` for /api/changes, commit, then drop cached results built from ``tables``
+
+    ``changes`` holds (table, row_id, op, owner_id) entries, op being UPSERT or DELETE.
+    The owners and the caller then read from the primary for a while (see db_router.py).
+    """
+    touch_tables(connection, *tables)
+    record_changes(connection, list(changes))
+    connection.commit()
+    result_cache.invalidate(tables)
+    if db_router.enabled:
+        writers = {str(owner_id) for _, _, _, owner_id in changes if owner_id is not None}
+        if has_request_context() and reader_key():
+            writers.add(reader_key())
+        db_router.mark_written(writers)
+    if changes:
+        event_broker.notify()
+
+def shape_rows(rows):
+    """Rows as plain objects, or column arrays with ?layout=columnar (see columnar.py)"""
+    if request.args.get('layout') == 'columnar':
+        return to_columnar(rows)
+    return rows
+
+@api.after_app_request
+def compress(response):
+    """gzip/brotli compress large JSON and CSV bodies for clients that accept it"""
+    return compress_response(response, request.accept_encodings)
+
+@api.route('/api/login', methods=['POST'])
+@read_only
 def login():
     """Login endpoint"""
     data = request.get_json()
@@ -51,10 +370,15 @@ def login():
         return jsonify({'error': 'Database connection failed'}), 500
     
     try:
-        cursor = connection.cursor(dictionary=True)
-        query = "SELECT * FROM users WHERE username = %s AND password = %s AND role = %s"
-        cursor.execute(query, (username, password, role))
-        user = cursor.fetchone()
+        user = repository.users.find_login(connection, username, password, role)
+
+        if not user and g.pop('read_only', False):
+            # An account created moments ago may not have reached the replica yet
+            primary = get_db_connection()
+            if primary:
+                connection.close()
+                connection = primary
+                user = repository.users.find_login(connection, username, password, role)
         
         if user:
             return jsonify({
@@ -79,10 +403,9 @@ def login():
     except mysql.connector.Error as e:
         return jsonify({'error': f'Database error: {str(e)}'}), 500
     finally:
-        cursor.close()
         connection.close()
 
-@app.route('/api/register_professional', methods=['POST'])
+@api.route('/api/register_professional', methods=['POST'])
 def register_professional():
     """Register new medical professional (admin only)"""
     data = request.get_json()
@@ -105,20 +428,18 @@ def register_professional():
     
     try:
         cursor = connection.cursor()
+        connection.start_transaction()
         
         # Check if username already exists
-        check_query = "SELECT id FROM users WHERE username = %s"
-        cursor.execute(check_query, (username,))
-        if cursor.fetchone():
+        if repository.users.username_taken(connection, username):
             return jsonify({'error': 'Username already exists'}), 400
         
         # Insert new professional (password will be mobile number)
-        insert_query = """INSERT INTO users (name, username, password, mobile_number, gender, age, role, designation, 
-                         department, specialization, experience_years) 
-                         VALUES (%s, %s, %s, %s, %s, %s, 'professional', %s, %s, %s, %s)"""
-        cursor.execute(insert_query, (name, username, mobile_number, mobile_number, gender, age, designation, 
-                                    department, specialization, experience_years))
-        connection.commit()
+        user_id = repository.users.insert_professional(connection, (
+            name, username, mobile_number, mobile_number, gender, age, designation, department, specialization,
+            experience_years))
+        professional_added(cursor)
+        commit_write(connection, 'users', changes=[('users', user_id, UPSERT, user_id)])
         
         return jsonify({'success': True, 'message': 'Professional registered successfully'})
         
@@ -128,26 +449,13 @@ def register_professional():
         cursor.close()
         connection.close()
 
-@app.route('/api/register_trainee', methods=['POST'])
+@api.route('/api/register_trainee', methods=['POST'])
 def register_trainee():
     """Register new trainee"""
     data = request.get_json()
-    name = data.get('name')
-    mobile_number = data.get('mobile_number')
-    gender = data.get('gender')
-    age = data.get('age')
-    department = data.get('department')
-    designation = data.get('designation', '')
-    address = data.get('address')
-    block = data.get('block')
-    training_date = data.get('training_date')
-    cpr_training = data.get('cpr_training', False)
-    first_aid_kit_given = data.get('first_aid_kit_given', False)
-    life_saving_skills = data.get('life_saving_skills', False)
-    registered_by = data.get('registered_by')
-
-    if not all([name, gender, age, department, address, block, training_date, registered_by]):
-        return jsonify({'error': 'All required fields must be provided'}), 400
+    errors = trainee_errors(data)
+    if errors:
+        return jsonify({'error': '; '.join(errors)}), 400
 
     connection = get_db_connection()
     if not connection:
@@ -155,14 +463,12 @@ def register_trainee():
 
     try:
         cursor = connection.cursor()
-        insert_query = """
-            INSERT INTO trainees (name, mobile_number, gender, age, department, designation, address, block, training_date, 
-                                cpr_training, first_aid_kit_given, life_saving_skills, registered_by)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        cursor.execute(insert_query, (name, mobile_number, gender, age, department, designation, address, block, training_date,
-                                    cpr_training, first_aid_kit_given, life_saving_skills, registered_by))
-        connection.commit()
+        connection.start_transaction()
+        values = trainee_insert_values(data)
+        trainee_id = repository.trainees.insert(connection, values)
+        trainee = dict(zip(repository.TRAINEE_INSERT_COLUMNS, values))
+        trainee_changed(cursor, new=trainee)
+        commit_write(connection, 'trainees', changes=[('trainees', trainee_id, UPSERT, trainee['registered_by'])])
 
         return jsonify({'success': True, 'message': 'Trainee registered successfully'})
 
@@ -172,99 +478,536 @@ def register_trainee():
         cursor.close()
         connection.close()
 
-@app.route('/api/get_trainees', methods=['GET'])
+def read_bulk_trainees():
+    """Rows for /api/trainees/bulk from an uploaded CSV file or a JSON array"""
+    if 'file' in request.files:
+        text = request.files['file'].read().decode('utf-8-sig')
+        rows = [dict(row) for row in csv.DictReader(io.StringIO(text))]
+        default_registered_by = request.form.get('registered_by')
+    else:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            default_registered_by = data.get('registered_by')
+            data = data.get('trainees')
+        else:
+            default_registered_by = None
+        if not isinstance(data, list):
+            raise ValueError('Send a JSON array of trainees or upload a CSV file as "file"')
+        rows = data
+    default_registered_by = default_registered_by or request.args.get('registered_by')
+    for row in rows:
+        if isinstance(row, dict) and default_registered_by and not row.get('registered_by'):
+            row['registered_by'] = default_registered_by
+    return rows
+
+def insert_trainee_chunk(connection, cursor, chunk, results):
+    """Insert one chunk in a single transaction, falling back to row-by-row on failure"""
+    try:
+        connection.start_transaction()
+        # One multi-row INSERT, whose auto-increment ids are consecutive from first_id
+        first_id = repository.trainees.insert_many(connection, [values for _, values in chunk])
+        trainees = [dict(zip(repository.TRAINEE_INSERT_COLUMNS, values)) for _, values in chunk]
+        trainees_inserted(cursor, trainees)
+        commit_write(connection, 'trainees', changes=[
+            ('trainees', first_id + offset, UPSERT, trainee['registered_by'])
+            for offset, trainee in enumerate(trainees)
+        ])
+        for index, _ in chunk:
+            results[index] = {'row': index + 1, 'status': 'accepted'}
+        return
+    except mysql.connector.Error:
+        connection.rollback()
+
+    # Find the offending rows so the rest of the chunk can still be accepted
+    for index, values in chunk:
+        try:
+            connection.start_transaction()
+            trainee_id = repository.trainees.insert(connection, values)
+            trainee = dict(zip(repository.TRAINEE_INSERT_COLUMNS, values))
+            trainee_changed(cursor, new=trainee)
+            commit_write(connection, 'trainees', changes=[('trainees', trainee_id, UPSERT, trainee['registered_by'])])
+            results[index] = {'row': index + 1, 'status': 'accepted'}
+        except mysql.connector.Error as e:
+            connection.rollback()
+            results[index] = {'row': index + 1, 'status': 'rejected', 'errors': [f'Database error: {str(e)}']}
+
+@api.route('/api/trainees/bulk', methods=['POST'])
+def bulk_register_trainees():
+    """Register many trainees at once from a JSON array or an uploaded CSV file.
+
+    Every row is validated like register_trainee; valid rows are inserted with
+    multi-row executemany in chunked transactions. Returns a per-row report.
+    """
+    try:
+        rows = read_bulk_trainees()
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': str(e)}), 400
+    if not rows:
+        return jsonify({'error': 'No trainees provided'}), 400
+    if len(rows) > BULK_MAX_ROWS:
+        return jsonify({'error': f'At most {BULK_MAX_ROWS} trainees per request'}), 413
+
+    results = [None] * len(rows)
+    valid = []
+    for index, row in enumerate(rows):
+        errors = trainee_errors(row) if isinstance(row, dict) else ['Row must be an object']
+        if errors:
+            results[index] = {'row': index + 1, 'status': 'rejected', 'errors': errors}
+        else:
+            valid.append((index, trainee_insert_values(row)))
+
+    if valid:
+        connection = get_db_connection()
+        if not connection:
+            return jsonify({'error': 'Database connection failed'}), 500
+        try:
+            cursor = connection.cursor()
+            for start in range(0, len(valid), BULK_CHUNK_SIZE):
+                insert_trainee_chunk(connection, cursor, valid[start:start + BULK_CHUNK_SIZE], results)
+        finally:
+            cursor.close()
+            connection.close()
+
+    accepted = sum(1 for result in results if result['status'] == 'accepted')
+    return jsonify({
+        'success': True,
+        'accepted': accepted,
+        'rejected': len(results) - accepted,
+        'results': results
+    })
+
+def bulk_target_ids(connection, data, spec):
+    """Ids named by a bulk request: {"ids": [...]} or {"filter": {...}} using the list endpoint filters"""
+    if not isinstance(data, dict) or ('ids' in data) == ('filter' in data):
+        raise ValueError('Provide either ids or filter')
+    if 'ids' in data:
+        ids = data['ids']
+        if not isinstance(ids, list) or not ids:
+            raise ValueError('ids must be a non-empty list')
+        if any(isinstance(value, bool) or not str(value).isdigit() for value in ids):
+            raise ValueError('ids must be positive integers')
+        return list(dict.fromkeys(int(value) for value in ids))
+
+    filters = data['filter']
+    if not isinstance(filters, dict) or not filters:
+        raise ValueError('filter must be a non-empty object')
+    unknown = sorted(set(filters) - set(spec.filters))
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(unknown)}")
+    filters = {name: str(value).lower() if isinstance(value, bool) else value for name, value in filters.items()}
+    where, params = build_filters(filters, spec)
+    if len(where) == len(spec.base_where):
+        raise ValueError('filter must match on at least one field')
+    return repository.lists.ids_matching(connection, spec, where, params, BULK_MAX_ROWS + 1)
+
+def bulk_mutation(spec, apply_chunk):
+    """Run ``apply_chunk(connection, cursor, ids)`` over the requested ids in chunked transactions (admin only).
+
+    ``apply_chunk`` locks its rows, applies one set-based statement and
+    returns ({id: outcome}, tables touched, change_log entries).
+    """
+    if request.args.get('role') != 'admin':
+        return jsonify({'error': 'Admin access required'}), 403
+    data = request.get_json(silent=True)
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        try:
+            ids = bulk_target_ids(connection, data, spec)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if len(ids) > BULK_MAX_ROWS:
+            return jsonify({'error': f'At most {BULK_MAX_ROWS} rows per request'}), 413
+
+        cursor = connection.cursor()
+        outcomes = {}
+        errors = {}
+        try:
+            for start in range(0, len(ids), BULK_CHUNK_SIZE):
+                chunk = ids[start:start + BULK_CHUNK_SIZE]
+                try:
+                    connection.start_transaction()
+                    chunk_outcomes, tables, changes = apply_chunk(connection, cursor, chunk)
+                    if changes:
+                        commit_write(connection, *tables, changes=changes)
+                    else:
+                        connection.commit()
+                    outcomes.update(chunk_outcomes)
+                except mysql.connector.Error as e:
+                    connection.rollback()
+                    outcomes.update((row_id, 'failed') for row_id in chunk)
+                    errors.update((row_id, f'Database error: {str(e)}') for row_id in chunk)
+        finally:
+            cursor.close()
+    except mysql.connector.Error as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    finally:
+        connection.close()
+
+    results = []
+    summary = {}
+    for row_id in ids:
+        result = {'id': row_id, 'status': outcomes[row_id]}
+        if row_id in errors:
+            result['error'] = errors[row_id]
+        results.append(result)
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return jsonify({'success': True, 'summary': summary, 'results': results})
+
+def training_status_chunk(status):
+    def apply_chunk(connection, cursor, ids):
+        old = lock_trainings(cursor, ids)
+        changed = [training_id for training_id in ids
+                   if training_id in old and old[training_id]['status'] != status]
+        if changed:
+            repository.trainings.set_status(connection, changed, status)
+            trainings_changed(cursor, [(old[training_id], {**old[training_id], 'status': status})
+                                       for training_id in changed])
+        outcomes = {training_id: 'not_found' if training_id not in old else
+                    'updated' if training_id in changed else 'unchanged' for training_id in ids}
+        changes = [('trainings', training_id, UPSERT, old[training_id]['conducted_by']) for training_id in changed]
+        return outcomes, ('trainings',), changes
+    return apply_chunk
+
+def training_delete_chunk(connection, cursor, ids):
+    old = lock_trainings(cursor, ids)
+    found = [training_id for training_id in ids if training_id in old]
+    if found:
+        # Enrollments cascade with the trainings
+        repository.trainings.delete_many(connection, found)
+        trainings_changed(cursor, [(old[training_id], None) for training_id in found])
+    outcomes = {training_id: 'deleted' if training_id in old else 'not_found' for training_id in ids}
+    changes = [('trainings', training_id, DELETE, old[training_id]['conducted_by']) for training_id in found]
+    return outcomes, ('trainings', 'training_enrollments'), changes
+
+def trainee_delete_chunk(connection, cursor, ids):
+    old = lock_trainees(cursor, ids)
+    found = [trainee_id for trainee_id in ids if trainee_id in old]
+    changes = []
+    if found:
+        changes = [('trainings', training_id, UPSERT, owner) for training_id, owner in trainees_removed(cursor, found)]
+        repository.trainees.delete_many(connection, found)
+        trainees_changed(cursor, [(old[trainee_id], None) for trainee_id in found])
+        changes += [('trainees', trainee_id, DELETE, old[trainee_id]['registered_by']) for trainee_id in found]
+    outcomes = {trainee_id: 'deleted' if trainee_id in old else 'not_found' for trainee_id in ids}
+    return outcomes, ('trainees', 'trainings', 'training_enrollments'), changes
+
+@api.route('/api/trainings/bulk_status', methods=['POST'])
+def bulk_training_status():
+    """Set the status of many trainings: {"status": ..., "ids": [...]} or {"status": ..., "filter": {...}}"""
+    data = request.get_json(silent=True)
+    status = data.get('status') if isinstance(data, dict) else None
+    if status not in TRAINING_STATUSES:
+        return jsonify({'error': f"Status must be one of: {', '.join(TRAINING_STATUSES)}"}), 400
+    return bulk_mutation(TRAINING_LIST_SPEC, training_status_chunk(status))
+
+@api.route('/api/trainings/bulk_delete', methods=['POST'])
+def bulk_delete_trainings():
+    """Delete many trainings by {"ids": [...]} or {"filter": {...}}"""
+    return bulk_mutation(TRAINING_LIST_SPEC, training_delete_chunk)
+
+@api.route('/api/trainees/bulk_delete', methods=['POST'])
+def bulk_delete_trainees():
+    """Delete many trainees by {"ids": [...]} or {"filter": {...}}"""
+    return bulk_mutation(TRAINEE_LIST_SPEC, trainee_delete_chunk)
+
+def training_errors(data):
+    """Validation problems for one new training payload (empty list when valid)"""
+    errors = []
+    missing = [field for field in TRAINING_REQUIRED_FIELDS + ('conducted_by',) if not data.get(field)]
+    if missing:
+        errors.append(f"Missing required fields: {', '.join(missing)}")
+    if data.get('block') and data.get('block') not in BLOCKS:
+        errors.append(f"Block must be one of: {', '.join(BLOCKS)}")
+    owner_error = owner_id_error(data, 'conducted_by')
+    if owner_error:
+        errors.append(owner_error)
+    return errors
+
+# Each /api/sync operation returns (outcome, row id, tables touched, change_log entries)
+# or raises sync.OperationRejected before writing anything
+
+def sync_create_trainee(connection, cursor, user_id, row_id, data):
+    data = {**data, 'registered_by': data.get('registered_by') or user_id}
+    errors = trainee_errors(data)
+    if errors:
+        raise sync.OperationRejected('; '.join(errors))
+    values = trainee_insert_values(data)
+    trainee_id = repository.trainees.insert(connection, values)
+    trainee = dict(zip(repository.TRAINEE_INSERT_COLUMNS, values))
+    trainee_changed(cursor, new=trainee)
+    return (sync.CREATED, trainee_id, ('trainees',),
+            [('trainees', trainee_id, UPSERT, trainee['registered_by'])])
+
+def sync_edit_trainee(connection, cursor, user_id, trainee_id, data):
+    try:
+        values = patch_values(data, TRAINEE_PATCH_COLUMNS, TRAINEE_REQUIRED_FIELDS)
+    except ValueError as e:
+        raise sync.OperationRejected(str(e))
+    for flag in SKILL_FLAGS:
+        if flag in values:
+            values[flag] = parse_flag(values[flag])
+    old = lock_trainee(cursor, trainee_id)
+    if not old:
+        raise sync.OperationRejected('Trainee not found', sync.NOT_FOUND)
+    repository.trainees.patch(connection, trainee_id, values)
+    trainee_changed(cursor, old, {**old, **{column: values[column] for column in old if column in values}})
+    return (sync.UPDATED, trainee_id, ('trainees',),
+            [('trainees', trainee_id, UPSERT, old['registered_by'])])
+
+def sync_delete_trainee(connection, cursor, user_id, trainee_id, data):
+    old = lock_trainee(cursor, trainee_id)
+    if not old:
+        raise sync.OperationRejected('Trainee not found', sync.NOT_FOUND)
+    # Their enrollments cascade; give the seats back first
+    changes = [('trainings', training_id, UPSERT, owner) for training_id, owner in trainees_removed(cursor, [trainee_id])]
+    repository.trainees.delete(connection, trainee_id)
+    trainee_changed(cursor, old=old)
+    changes.append(('trainees', trainee_id, DELETE, old['registered_by']))
+    return sync.DELETED, trainee_id, ('trainees', 'trainings', 'training_enrollments'), changes
+
+def sync_create_training(connection, cursor, user_id, row_id, data):
+    data = {**data, 'conducted_by': data.get('conducted_by') or user_id}
+    errors = training_errors(data)
+    if errors:
+        raise sync.OperationRejected('; '.join(errors))
+    values = tuple(data.get(column) for column in repository.TRAINING_INSERT_COLUMNS)
+    training = dict(zip(repository.TRAINING_INSERT_COLUMNS, values))
+    training.update(description=training['description'] or '', duration_hours=training['duration_hours'] or 1.0,
+                    max_trainees=training['max_trainees'] or 50)
+    training_id = repository.trainings.insert(connection, tuple(training.values()))
+    training_changed(cursor, new={**training, 'status': 'Planned'})
+    return (sync.CREATED, training_id, ('trainings',),
+            [('trainings', training_id, UPSERT, training['conducted_by'])])
+
+def sync_edit_training(connection, cursor, user_id, training_id, data):
+    try:
+        values = patch_values(data, TRAINING_PATCH_COLUMNS, TRAINING_REQUIRED_FIELDS)
+    except ValueError as e:
+        raise sync.OperationRejected(str(e))
+    old = lock_training(cursor, training_id)
+    if not old:
+        raise sync.OperationRejected('Training not found', sync.NOT_FOUND)
+    error = capacity_error(cursor, training_id, values['max_trainees']) if 'max_trainees' in values else None
+    if error:
+        raise sync.OperationRejected(error)
+    repository.trainings.patch(connection, training_id, values)
+    training_changed(cursor, old, {**old, **{column: values[column] for column in old if column in values}})
+    return (sync.UPDATED, training_id, ('trainings',),
+            [('trainings', training_id, UPSERT, old['conducted_by'])])
+
+def sync_delete_training(connection, cursor, user_id, training_id, data):
+    old = lock_training(cursor, training_id)
+    if not old:
+        raise sync.OperationRejected('Training not found', sync.NOT_FOUND)
+    # Enrollments cascade with the training
+    repository.trainings.delete(connection, training_id)
+    training_changed(cursor, old=old)
+    return (sync.DELETED, training_id, ('trainings', 'training_enrollments'),
+            [('trainings', training_id, DELETE, old['conducted_by'])])
+
+SYNC_HANDLERS = {
+    ('trainee', sync.CREATE): sync_create_trainee,
+    ('trainee', sync.EDIT): sync_edit_trainee,
+    ('trainee', sync.REMOVE): sync_delete_trainee,
+    ('training', sync.CREATE): sync_create_training,
+    ('training', sync.EDIT): sync_edit_training,
+    ('training', sync.REMOVE): sync_delete_training,
+}
+
+def sync_row_id(operation, outcomes, stored):
+    """Row id an edit or delete applies to, resolving a ref through the create it names"""
+    if operation['ref'] is None:
+        return operation['id']
+    created = outcomes.get(operation['ref'])
+    if created is None and operation['ref'] in stored:
+        created = stored[operation['ref']][1]
+    if not created or created.get('status') != sync.CREATED or created.get('entity') != operation['entity']:
+        raise sync.OperationRejected(f"ref {operation['ref']!r} does not name an earlier create of a "
+                                     f"{operation['entity']}")
+    return created['id']
+
+def apply_sync_chunk(connection, cursor, user_id, chunk, outcomes):
+    """Apply and commit one chunk of operations in a single transaction; returns {key: result}.
+
+    ``outcomes`` holds the results of the batch's earlier chunks, for refs.
+    Keys already stored are answered from the store.
+    """
+    connection.start_transaction()
+    keys = [operation['key'] for operation in chunk]
+    stored = sync.stored_results(cursor, user_id, keys + [operation['ref'] for operation in chunk
+                                                          if isinstance(operation['ref'], str)])
+    results = {}
+    fresh = []
+    tables = set()
+    changes = []
+    for operation in chunk:
+        key = operation['key']
+        if key in stored:
+            request_hash, stored_result = stored[key]
+            if request_hash == operation['hash']:
+                results[key] = {**stored_result, 'replayed': True}
+            else:
+                results[key] = sync.result(operation, sync.CONFLICT, entity=operation['entity'],
+                                           error='Key was already used for a different operation')
+            continue
+        try:
+            if operation['error']:
+                raise sync.OperationRejected(operation['error'])
+            row_id = None if operation['op'] == sync.CREATE else sync_row_id(operation, {**outcomes, **results}, stored)
+            handler = SYNC_HANDLERS[(operation['entity'], operation['op'])]
+            status, row_id, touched, row_changes = handler(connection, cursor, user_id, row_id,
+                                                           operation['data'] or {})
+            tables.update(touched)
+            changes += row_changes
+            results[key] = sync.result(operation, status, entity=operation['entity'], id=row_id)
+        except sync.OperationRejected as e:
+            results[key] = sync.result(operation, e.status, entity=operation['entity'], error=str(e))
+        fresh.append((operation, results[key]))
+
+    sync.store_results(cursor, user_id, fresh)
+    if changes:
+        commit_write(connection, *sorted(tables), changes=changes)
+    else:
+        connection.commit()
+    return results
+
+def sync_chunk(connection, cursor, user_id, chunk, outcomes):
+    """Apply one chunk in a single transaction, falling back to one operation per transaction on failure"""
+    try:
+        outcomes.update(apply_sync_chunk(connection, cursor, user_id, chunk, outcomes))
+        return
+    except mysql.connector.Error:
+        connection.rollback()
+
+    # Isolate the failing operations so the rest of the chunk is still applied
+    for operation in chunk:
+        try:
+            outcomes.update(apply_sync_chunk(connection, cursor, user_id, [operation], outcomes))
+        except (mysql.connector.IntegrityError, mysql.connector.DataError) as e:
+            # Bad data fails the same way every time, so it is stored like any rejection
+            connection.rollback()
+            rejected = sync.result(operation, sync.REJECTED, entity=operation['entity'],
+                                   error=f'Database error: {str(e)}')
+            try:
+                connection.start_transaction()
+                sync.store_results(cursor, user_id, [(operation, rejected)])
+                connection.commit()
+            except mysql.connector.Error:
+                connection.rollback()
+            outcomes[operation['key']] = rejected
+        except mysql.connector.Error as e:
+            # Lock timeouts and the like are not stored; the device retries the key later
+            connection.rollback()
+            outcomes[operation['key']] = sync.result(operation, sync.FAILED, entity=operation['entity'],
+                                                     error=f'Database error: {str(e)}')
+
+@api.route('/api/sync', methods=['POST'])
+def sync_operations():
+    """Apply a batch of operations queued offline, each under a client-generated idempotency key.
+
+    Body: {"user_id": ..., "operations": [{"key", "op", "entity", "id" | "ref", "data"}]}.
+    Operations are applied in order, in chunks of SYNC_CHUNK_SIZE with one
+    transaction each; a resent key returns its stored result (see sync.py).
+    """
+    try:
+        user_id, operations = sync.parse_batch(request.get_json(silent=True), request.args.get('user_id'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        if repository.users.role(connection, user_id) is None:
+            return jsonify({'error': 'User not found'}), 404
+        cursor = connection.cursor()
+        outcomes = {}
+        try:
+            for start in range(0, len(operations), sync.SYNC_CHUNK_SIZE):
+                sync_chunk(connection, cursor, user_id, operations[start:start + sync.SYNC_CHUNK_SIZE], outcomes)
+        finally:
+            cursor.close()
+    except mysql.connector.Error as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    finally:
+        connection.close()
+
+    results = [outcomes[operation['key']] for operation in operations]
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return jsonify({'success': True, 'summary': summary, 'results': results})
+
+@api.route('/api/get_trainees', methods=['GET'])
+@versioned_read('trainees', 'users')
+@read_only
 def get_trainees():
-    """Get trainees (filtered by user role)"""
+    """Get trainees (filtered by user role, optional filters, sorting and keyset pagination)"""
     user_id = request.args.get('user_id')
     role = request.args.get('role')
 
+    try:
+        list_request = parse_list_args(request.args, TRAINEE_LIST_SPEC)
+        # Admin sees all trainees, professionals see only their own
+        where, params = build_filters(request.args, TRAINEE_LIST_SPEC,
+                                      owner_id=ALL_OWNERS if role == 'admin' else user_id)
+    except ListParamError as e:
+        return jsonify({'error': str(e)}), 400
+
+    query, params, count_query, count_params = build_list_query(TRAINEE_LIST_SPEC, where, params, list_request)
+
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Database connection failed'}), 500
 
     try:
-        cursor = connection.cursor(dictionary=True)
+        trainees, next_cursor = page_rows(repository.lists.rows(connection, query, params), TRAINEE_LIST_SPEC, list_request)
 
-        if role == 'admin':
-            # Admin sees all trainees
-            query = """
-                SELECT t.*, u.name as registered_by_name 
-                FROM trainees t 
-                JOIN users u ON t.registered_by = u.id
-                ORDER BY t.created_at DESC
-            """
-            cursor.execute(query)
-        else:
-            # Professionals see only their own trainees
-            query = """
-                SELECT t.*, u.name as registered_by_name 
-                FROM trainees t 
-                JOIN users u ON t.registered_by = u.id
-                WHERE t.registered_by = %s
-                ORDER BY t.created_at DESC
-            """
-            cursor.execute(query, (user_id,))
-
-        trainees = cursor.fetchall()
-
-        # Convert date objects to strings
-        for trainee in trainees:
-            if trainee['training_date']:
-                trainee['training_date'] = trainee['training_date'].strftime('%Y-%m-%d')
-            if trainee['created_at']:
-                trainee['created_at'] = trainee['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-            # Ensure designation is present (for backward compatibility)
-            if 'designation' not in trainee:
-                trainee['designation'] = ''
-
-        return jsonify({'success': True, 'trainees': trainees})
+        response = {'success': True, 'trainees': shape_rows(trainees)}
+        if list_request.paginate:
+            response['next_cursor'] = next_cursor
+        if count_query:
+            response['total'] = repository.lists.total(connection, count_query, count_params)
+        return jsonify(response)
 
     except mysql.connector.Error as e:
         return jsonify({'error': f'Database error: {str(e)}'}), 500
     finally:
-        cursor.close()
         connection.close()
 
-@app.route('/api/get_professionals', methods=['GET'])
+@api.route('/api/get_professionals', methods=['GET'])
+@versioned_read('users', 'trainings', 'trainees')
+@read_only
 def get_professionals():
-    """Get all medical professionals with training and trainee counts (admin only)"""
+    """Get medical professionals with training and trainee counts (admin only)"""
+    try:
+        list_request = parse_list_args(request.args, PROFESSIONAL_LIST_SPEC)
+        where, params = build_filters(request.args, PROFESSIONAL_LIST_SPEC)
+    except ListParamError as e:
+        return jsonify({'error': str(e)}), 400
+
+    query, params, count_query, count_params = build_list_query(PROFESSIONAL_LIST_SPEC, where, params, list_request)
+
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Database connection failed'}), 500
     try:
-        cursor = connection.cursor(dictionary=True)
-        # Fetch professionals with training and trainee counts
-        query = """
-            SELECT 
-                u.id, u.name, u.username, u.mobile_number, u.gender, u.age, 
-                u.designation, u.department, u.specialization, u.experience_years, u.created_at,
-                COUNT(DISTINCT t.id) as total_trainings,
-                COUNT(DISTINCT tr.id) as total_trainees_trained
-            FROM users u
-            LEFT JOIN trainings t ON u.id = t.conducted_by
-            LEFT JOIN trainees tr ON u.id = tr.registered_by
-            WHERE u.role = 'professional'
-            GROUP BY u.id, u.name, u.username, u.mobile_number, u.gender, u.age, 
-                     u.designation, u.department, u.specialization, u.experience_years, u.created_at
-            ORDER BY u.created_at DESC
-        """
-        cursor.execute(query)
-        professionals = cursor.fetchall()
-        # Convert datetime to string
-        for prof in professionals:
-            if prof['created_at']:
-                prof['created_at'] = prof['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-            # Ensure counts are integers
-            prof['total_trainings'] = int(prof['total_trainings']) if prof['total_trainings'] else 0
-            prof['total_trainees_trained'] = int(prof['total_trainees_trained']) if prof['total_trainees_trained'] else 0
-        return jsonify({'success': True, 'professionals': professionals})
+        professionals, next_cursor = page_rows(repository.lists.rows(connection, query, params), PROFESSIONAL_LIST_SPEC, list_request)
+        response = {'success': True, 'professionals': shape_rows(professionals)}
+        if list_request.paginate:
+            response['next_cursor'] = next_cursor
+        if count_query:
+            response['total'] = repository.lists.total(connection, count_query, count_params)
+        return jsonify(response)
     except mysql.connector.Error as e:
         return jsonify({'error': f'Database error: {str(e)}'}), 500
     finally:
-        cursor.close()
         connection.close()
 
-@app.route('/api/edit_trainee/<int:trainee_id>', methods=['PUT'])
+@api.route('/api/edit_trainee/<int:trainee_id>', methods=['PUT'])
 def edit_trainee(trainee_id):
     """Edit trainee details"""
     data = request.get_json()
@@ -277,9 +1020,9 @@ def edit_trainee(trainee_id):
     address = data.get('address')
     block = data.get('block')
     training_date = data.get('training_date')
-    cpr_training = data.get('cpr_training', False)
-    first_aid_kit_given = data.get('first_aid_kit_given', False)
-    life_saving_skills = data.get('life_saving_skills', False)
+    cpr_training = parse_flag(data.get('cpr_training', False))
+    first_aid_kit_given = parse_flag(data.get('first_aid_kit_given', False))
+    life_saving_skills = parse_flag(data.get('life_saving_skills', False))
 
     if not all([name, gender, age, department, address, block, training_date]):
         return jsonify({'error': 'All required fields must be provided'}), 400
@@ -290,28 +1033,64 @@ def edit_trainee(trainee_id):
 
     try:
         cursor = connection.cursor()
-        update_query = """
-            UPDATE trainees 
-            SET name = %s, mobile_number = %s, gender = %s, age = %s, department = %s, designation = %s, address = %s, block = %s, training_date = %s,
-                cpr_training = %s, first_aid_kit_given = %s, life_saving_skills = %s
-            WHERE id = %s
-        """
-        cursor.execute(update_query, (name, mobile_number, gender, age, department, designation, address, block, training_date,
-                                    cpr_training, first_aid_kit_given, life_saving_skills, trainee_id))
-        connection.commit()
+        connection.start_transaction()
+        old = lock_trainee(cursor, trainee_id)
+        if not old:
+            return jsonify({'error': 'Trainee not found'}), 404
 
-        if cursor.rowcount > 0:
-            return jsonify({'success': True, 'message': 'Trainee updated successfully'})
-        else:
+        repository.trainees.update(connection, trainee_id, (
+            name, mobile_number, gender, age, department, designation, address, block, training_date,
+            cpr_training, first_aid_kit_given, life_saving_skills))
+        trainee_changed(cursor, old, {
+            'block': block, 'department': department, 'cpr_training': cpr_training,
+            'first_aid_kit_given': first_aid_kit_given, 'life_saving_skills': life_saving_skills,
+            'registered_by': old['registered_by'], 'training_date': training_date
+        })
+        commit_write(connection, 'trainees', changes=[('trainees', trainee_id, UPSERT, old['registered_by'])])
+
+        return jsonify({'success': True, 'message': 'Trainee updated successfully'})
+
+    except mysql.connector.Error as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    finally:
+        cursor.close()
+        connection.close()
+
+@api.route('/api/edit_trainee/<int:trainee_id>', methods=['PATCH'])
+def patch_trainee(trainee_id):
+    """Update only the trainee fields present in the request"""
+    try:
+        values = patch_values(request.get_json(silent=True), TRAINEE_PATCH_COLUMNS, TRAINEE_REQUIRED_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    for flag in SKILL_FLAGS:
+        if flag in values:
+            values[flag] = parse_flag(values[flag])
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        cursor = connection.cursor()
+        connection.start_transaction()
+        old = lock_trainee(cursor, trainee_id)
+        if not old:
             return jsonify({'error': 'Trainee not found'}), 404
 
+        repository.trainees.patch(connection, trainee_id, values)
+        trainee_changed(cursor, old, {**old, **{column: values[column] for column in old if column in values}})
+        commit_write(connection, 'trainees', changes=[('trainees', trainee_id, UPSERT, old['registered_by'])])
+
+        return jsonify({'success': True, 'message': 'Trainee updated successfully', 'updated': list(values)})
+
     except mysql.connector.Error as e:
         return jsonify({'error': f'Database error: {str(e)}'}), 500
     finally:
         cursor.close()
         connection.close()
 
-@app.route('/api/delete_trainee/<int:trainee_id>', methods=['DELETE'])
+@api.route('/api/delete_trainee/<int:trainee_id>', methods=['DELETE'])
 def delete_trainee(trainee_id):
     """Delete trainee"""
     connection = get_db_connection()
@@ -320,14 +1099,20 @@ def delete_trainee(trainee_id):
     
     try:
         cursor = connection.cursor()
-        delete_query = "DELETE FROM trainees WHERE id = %s"
-        cursor.execute(delete_query, (trainee_id,))
-        connection.commit()
-        
-        if cursor.rowcount > 0:
-            return jsonify({'success': True, 'message': 'Trainee deleted successfully'})
-        else:
+        connection.start_transaction()
+        old = lock_trainee(cursor, trainee_id)
+        if not old:
             return jsonify({'error': 'Trainee not found'}), 404
+
+        # Their enrollments cascade; give the seats back first
+        released = trainees_removed(cursor, [trainee_id])
+        repository.trainees.delete(connection, trainee_id)
+        trainee_changed(cursor, old=old)
+        changes = [('trainings', training_id, UPSERT, owner) for training_id, owner in released]
+        changes.append(('trainees', trainee_id, DELETE, old['registered_by']))
+        commit_write(connection, 'trainees', 'trainings', 'training_enrollments', changes=changes)
+        
+        return jsonify({'success': True, 'message': 'Trainee deleted successfully'})
         
     except mysql.connector.Error as e:
         return jsonify({'error': f'Database error: {str(e)}'}), 500
@@ -335,7 +1120,7 @@ def delete_trainee(trainee_id):
         cursor.close()
         connection.close()
 
-@app.route('/api/delete_professional/<int:professional_id>', methods=['DELETE'])
+@api.route('/api/delete_professional/<int:professional_id>', methods=['DELETE'])
 def delete_professional(professional_id):
     """Delete medical professional"""
     connection = get_db_connection()
@@ -344,24 +1129,34 @@ def delete_professional(professional_id):
     
     try:
         cursor = connection.cursor()
+        connection.start_transaction()
         
         # Check if professional exists and is not admin
-        check_query = "SELECT role FROM users WHERE id = %s"
-        cursor.execute(check_query, (professional_id,))
-        result = cursor.fetchone()
+        role = repository.users.role(connection, professional_id)
         
-        if not result:
+        if not role:
             return jsonify({'error': 'Professional not found'}), 404
         
-        if result[0] == 'admin':
+        if role == 'admin':
             return jsonify({'error': 'Cannot delete admin user'}), 403
         
+        # Their trainees and trainings go with them (ON DELETE CASCADE); log those as deletions too
+        changes = owned_row_deletes(cursor, professional_id)
+        # Seats their trainees held in other professionals' trainings are released
+        changes += [('trainings', training_id, UPSERT, owner)
+                    for training_id, owner in owner_trainees_removed(cursor, professional_id)
+                    if owner != professional_id]
+
         # Delete the professional
-        delete_query = "DELETE FROM users WHERE id = %s AND role = 'professional'"
-        cursor.execute(delete_query, (professional_id,))
-        connection.commit()
+        deleted = repository.users.delete_professional(connection, professional_id)
+        if deleted > 0:
+            professional_removed(cursor, professional_id)
+            changes.append(('users', professional_id, DELETE, professional_id))
+        else:
+            changes = []
+        commit_write(connection, 'users', 'trainees', 'trainings', 'training_enrollments', changes=changes)
         
-        if cursor.rowcount > 0:
+        if deleted > 0:
             return jsonify({'success': True, 'message': 'Medical professional deleted successfully'})
         else:
             return jsonify({'error': 'Professional not found or could not be deleted'}), 404
@@ -372,7 +1167,7 @@ def delete_professional(professional_id):
         cursor.close()
         connection.close()
 
-@app.route('/api/edit_professional/<int:professional_id>', methods=['PUT'])
+@api.route('/api/edit_professional/<int:professional_id>', methods=['PUT'])
 def edit_professional(professional_id):
     """Edit medical professional"""
     connection = get_db_connection()
@@ -381,35 +1176,19 @@ def edit_professional(professional_id):
     
     try:
         data = request.get_json()
-        cursor = connection.cursor()
+        connection.start_transaction()
         
         # Check if professional exists and is not admin
-        check_query = "SELECT role FROM users WHERE id = %s"
-        cursor.execute(check_query, (professional_id,))
-        result = cursor.fetchone()
+        role = repository.users.role(connection, professional_id)
         
-        if not result:
+        if not role:
             return jsonify({'error': 'Professional not found'}), 404
         
-        if result[0] == 'admin':
+        if role == 'admin':
             return jsonify({'error': 'Cannot edit admin user'}), 403
         
         # Update the professional
-        update_query = """
-        UPDATE users SET 
-            name = %s, 
-            username = %s, 
-            mobile_number = %s,
-            gender = %s,
-            age = %s,
-            designation = %s,
-            department = %s,
-            specialization = %s,
-            experience_years = %s
-        WHERE id = %s AND role = 'professional'
-        """
-        
-        cursor.execute(update_query, (
+        updated = repository.users.update_professional(connection, professional_id, (
             data.get('name'),
             data.get('username'),
             data.get('mobile_number'),
@@ -418,12 +1197,11 @@ def edit_professional(professional_id):
             data.get('designation'),
             data.get('department'),
             data.get('specialization'),
-            data.get('experience_years'),
-            professional_id
+            data.get('experience_years')
         ))
-        connection.commit()
         
-        if cursor.rowcount > 0:
+        if updated > 0:
+            commit_write(connection, 'users', changes=[('users', professional_id, UPSERT, professional_id)])
             return jsonify({'success': True, 'message': 'Professional updated successfully'})
         else:
             return jsonify({'error': 'Professional not found or could not be updated'}), 404
@@ -431,11 +1209,40 @@ def edit_professional(professional_id):
     except mysql.connector.Error as e:
         return jsonify({'error': f'Database error: {str(e)}'}), 500
     finally:
-        cursor.close()
+        connection.close()
+
+@api.route('/api/edit_professional/<int:professional_id>', methods=['PATCH'])
+def patch_professional(professional_id):
+    """Update only the professional fields present in the request"""
+    try:
+        values = patch_values(request.get_json(silent=True), PROFESSIONAL_PATCH_COLUMNS, PROFESSIONAL_REQUIRED_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        connection.start_transaction()
+        role = repository.users.role(connection, professional_id, for_update=True)
+        if not role:
+            return jsonify({'error': 'Professional not found'}), 404
+        if role == 'admin':
+            return jsonify({'error': 'Cannot edit admin user'}), 403
+
+        if repository.users.patch_professional(connection, professional_id, values):
+            commit_write(connection, 'users', changes=[('users', professional_id, UPSERT, professional_id)])
+
+        return jsonify({'success': True, 'message': 'Professional updated successfully', 'updated': list(values)})
+
+    except mysql.connector.Error as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    finally:
         connection.close()
 
 # Training endpoints
-@app.route('/api/create_training', methods=['POST'])
+@api.route('/api/create_training', methods=['POST'])
 def create_training():
     """Create new training session"""
     data = request.get_json()
@@ -452,6 +1259,9 @@ def create_training():
 
     if not all([title, training_topic, address, block, training_date, training_time, conducted_by]):
         return jsonify({'error': 'All required fields must be provided'}), 400
+    owner_error = owner_id_error(data, 'conducted_by')
+    if owner_error:
+        return jsonify({'error': owner_error}), 400
 
     connection = get_db_connection()
     if not connection:
@@ -459,14 +1269,13 @@ def create_training():
 
     try:
         cursor = connection.cursor()
-        insert_query = """
-            INSERT INTO trainings (title, description, training_topic, address, block, training_date, 
-                                 training_time, duration_hours, max_trainees, conducted_by)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        cursor.execute(insert_query, (title, description, training_topic, address, block, training_date,
-                                    training_time, duration_hours, max_trainees, conducted_by))
-        connection.commit()
+        connection.start_transaction()
+        training_id = repository.trainings.insert(connection, (
+            title, description, training_topic, address, block, training_date, training_time, duration_hours,
+            max_trainees, conducted_by))
+        training_changed(cursor, new={'status': 'Planned', 'block': block, 'conducted_by': conducted_by,
+                                      'training_date': training_date, 'duration_hours': duration_hours})
+        commit_write(connection, 'trainings', changes=[('trainings', training_id, UPSERT, conducted_by)])
 
         return jsonify({'success': True, 'message': 'Training created successfully'})
 
@@ -476,9 +1285,11 @@ def create_training():
         cursor.close()
         connection.close()
 
-@app.route('/api/get_trainings', methods=['GET'])
+@api.route('/api/get_trainings', methods=['GET'])
+@versioned_read('trainings', 'users')
+@read_only
 def get_trainings():
-    """Get trainings (filtered by user role)"""
+    """Get trainings (filtered by user role, optional filters, sorting and keyset pagination)"""
     user_id = request.args.get('user_id')
     role = request.args.get('role')
 
@@ -489,55 +1300,36 @@ def get_trainings():
     if role != 'admin' and not user_id:
         return jsonify({'error': 'User ID is required for non-admin users'}), 400
 
+    try:
+        list_request = parse_list_args(request.args, TRAINING_LIST_SPEC)
+        # Admin sees all trainings, professionals see only their own
+        where, params = build_filters(request.args, TRAINING_LIST_SPEC,
+                                      owner_id=ALL_OWNERS if role == 'admin' else user_id)
+    except ListParamError as e:
+        return jsonify({'error': str(e)}), 400
+
+    query, params, count_query, count_params = build_list_query(TRAINING_LIST_SPEC, where, params, list_request)
+
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Database connection failed'}), 500
 
     try:
-        cursor = connection.cursor(dictionary=True)
+        trainings, next_cursor = page_rows(repository.lists.rows(connection, query, params), TRAINING_LIST_SPEC, list_request)
 
-        if role == 'admin':
-            # Admin sees all trainings
-            query = """
-                SELECT t.*, u.name as conducted_by_name 
-                FROM trainings t 
-                JOIN users u ON t.conducted_by = u.id
-                ORDER BY t.training_date DESC, t.training_time DESC
-            """
-            cursor.execute(query)
-        else:
-            # Professionals see only their own trainings
-            query = """
-                SELECT t.*, u.name as conducted_by_name 
-                FROM trainings t 
-                JOIN users u ON t.conducted_by = u.id
-                WHERE t.conducted_by = %s
-                ORDER BY t.training_date DESC, t.training_time DESC
-            """
-            cursor.execute(query, (user_id,))
-
-        trainings = cursor.fetchall()
-
-        # Convert date and time objects to strings
-        for training in trainings:
-            if training['training_date']:
-                training['training_date'] = training['training_date'].strftime('%Y-%m-%d')
-            if training['training_time']:
-                training['training_time'] = str(training['training_time'])
-            if training['created_at']:
-                training['created_at'] = training['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-            if training['updated_at']:
-                training['updated_at'] = training['updated_at'].strftime('%Y-%m-%d %H:%M:%S')
-
-        return jsonify({'success': True, 'trainings': trainings})
+        response = {'success': True, 'trainings': shape_rows(trainings)}
+        if list_request.paginate:
+            response['next_cursor'] = next_cursor
+        if count_query:
+            response['total'] = repository.lists.total(connection, count_query, count_params)
+        return jsonify(response)
 
     except mysql.connector.Error as e:
         return jsonify({'error': f'Database error: {str(e)}'}), 500
     finally:
-        cursor.close()
         connection.close()
 
-@app.route('/api/edit_training/<int:training_id>', methods=['PUT'])
+@api.route('/api/edit_training/<int:training_id>', methods=['PUT'])
 def edit_training(training_id):
     """Edit training details"""
     data = request.get_json()
@@ -561,20 +1353,56 @@ def edit_training(training_id):
 
     try:
         cursor = connection.cursor()
-        update_query = """
-            UPDATE trainings 
-            SET title = %s, description = %s, training_topic = %s, address = %s, block = %s, 
-                training_date = %s, training_time = %s, duration_hours = %s, max_trainees = %s, status = %s
-            WHERE id = %s
-        """
-        cursor.execute(update_query, (title, description, training_topic, address, block, training_date,
-                                    training_time, duration_hours, max_trainees, status, training_id))
-        connection.commit()
+        connection.start_transaction()
+        old = lock_training(cursor, training_id)
+        if not old:
+            return jsonify({'error': 'Training not found'}), 404
+        error = capacity_error(cursor, training_id, max_trainees)
+        if error:
+            return jsonify({'error': error}), 409
 
-        if cursor.rowcount > 0:
-            return jsonify({'success': True, 'message': 'Training updated successfully'})
-        else:
+        repository.trainings.update(connection, training_id, (
+            title, description, training_topic, address, block, training_date, training_time, duration_hours,
+            max_trainees, status))
+        training_changed(cursor, old, {'status': status, 'block': block, 'conducted_by': old['conducted_by'],
+                                       'training_date': training_date, 'duration_hours': duration_hours})
+        commit_write(connection, 'trainings', changes=[('trainings', training_id, UPSERT, old['conducted_by'])])
+
+        return jsonify({'success': True, 'message': 'Training updated successfully'})
+
+    except mysql.connector.Error as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    finally:
+        cursor.close()
+        connection.close()
+
+@api.route('/api/edit_training/<int:training_id>', methods=['PATCH'])
+def patch_training(training_id):
+    """Update only the training fields present in the request"""
+    try:
+        values = patch_values(request.get_json(silent=True), TRAINING_PATCH_COLUMNS, TRAINING_REQUIRED_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        cursor = connection.cursor()
+        connection.start_transaction()
+        old = lock_training(cursor, training_id)
+        if not old:
             return jsonify({'error': 'Training not found'}), 404
+        error = capacity_error(cursor, training_id, values['max_trainees']) if 'max_trainees' in values else None
+        if error:
+            return jsonify({'error': error}), 409
+
+        repository.trainings.patch(connection, training_id, values)
+        training_changed(cursor, old, {**old, **{column: values[column] for column in old if column in values}})
+        commit_write(connection, 'trainings', changes=[('trainings', training_id, UPSERT, old['conducted_by'])])
+
+        return jsonify({'success': True, 'message': 'Training updated successfully', 'updated': list(values)})
 
     except mysql.connector.Error as e:
         return jsonify({'error': f'Database error: {str(e)}'}), 500
@@ -582,7 +1410,7 @@ def edit_training(training_id):
         cursor.close()
         connection.close()
 
-@app.route('/api/delete_training/<int:training_id>', methods=['DELETE'])
+@api.route('/api/delete_training/<int:training_id>', methods=['DELETE'])
 def delete_training(training_id):
     """Delete training"""
     connection = get_db_connection()
@@ -591,14 +1419,17 @@ def delete_training(training_id):
     
     try:
         cursor = connection.cursor()
-        delete_query = "DELETE FROM trainings WHERE id = %s"
-        cursor.execute(delete_query, (training_id,))
-        connection.commit()
-        
-        if cursor.rowcount > 0:
-            return jsonify({'success': True, 'message': 'Training deleted successfully'})
-        else:
+        connection.start_transaction()
+        old = lock_training(cursor, training_id)
+        if not old:
             return jsonify({'error': 'Training not found'}), 404
+
+        repository.trainings.delete(connection, training_id)
+        training_changed(cursor, old=old)
+        commit_write(connection, 'trainings', 'training_enrollments',
+                     changes=[('trainings', training_id, DELETE, old['conducted_by'])])
+        
+        return jsonify({'success': True, 'message': 'Training deleted successfully'})
         
     except mysql.connector.Error as e:
         return jsonify({'error': f'Database error: {str(e)}'}), 500
@@ -606,32 +1437,535 @@ def delete_training(training_id):
         cursor.close()
         connection.close()
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/trainings/<int:training_id>/enrollments', methods=['GET'])
+@versioned_read('trainings', 'trainees', 'training_enrollments')
+@read_only
+def get_enrollments(training_id):
+    """Trainees enrolled in a training, with its capacity (professionals: own trainings only)"""
+    role = request.args.get('role')
+    user_id = request.args.get('user_id')
+    if not role:
+        return jsonify({'error': 'Role parameter is required'}), 400
+    if role != 'admin' and not user_id:
+        return jsonify({'error': 'User ID is required for non-admin users'}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        training = repository.trainings.find(connection, training_id)
+        if not training or (role != 'admin' and str(training['conducted_by']) != str(user_id)):
+            return jsonify({'error': 'Training not found'}), 404
+        trainees = repository.trainings.enrolled_trainees(connection, training_id)
+        return jsonify({'success': True, 'training': training, 'trainees': shape_rows(trainees)})
+    except mysql.connector.Error as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    finally:
+        connection.close()
+
+def change_enrollments(training_id, operation):
+    """Run enroll() or unenroll() for the posted trainee_ids in one transaction"""
+    try:
+        trainee_ids = parse_trainee_ids(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        cursor = connection.cursor()
+        connection.start_transaction()
+        results, conducted_by, changed = operation(cursor, training_id, trainee_ids)
+        if changed:
+            commit_write(connection, 'trainings', 'training_enrollments',
+                         changes=[('trainings', training_id, UPSERT, conducted_by)])
+        else:
+            connection.commit()
+
+        current_trainees, max_trainees = repository.trainings.seats(connection, training_id)
+        return jsonify({
+            'success': True,
+            'changed': changed,
+            'current_trainees': current_trainees,
+            'max_trainees': max_trainees,
+            'results': results
+        })
+    except EnrollmentError as e:
+        connection.rollback()
+        return jsonify({'error': str(e)}), e.status
+    except mysql.connector.Error as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    finally:
+        cursor.close()
+        connection.close()
+
+@api.route('/api/trainings/<int:training_id>/enrollments', methods=['POST'])
+def enroll_trainees(training_id):
+    """Enroll {"trainee_ids": [...]} in a training; trainees beyond its capacity are reported as full"""
+    return change_enrollments(training_id, enroll)
+
+@api.route('/api/trainings/<int:training_id>/enrollments', methods=['DELETE'])
+def unenroll_trainees(training_id):
+    """Remove {"trainee_ids": [...]} from a training"""
+    return change_enrollments(training_id, unenroll)
+
+def health_payload():
+    """(body, ready) of the readiness answers, from the cached database status"""
+    ready, message = health_monitor.readiness()
+    return {
+        'status': 'OK' if ready else 'ERROR',
+        'message': message,
+        'timestamp': datetime.now().isoformat(),
+        'database': health_monitor.info(),
+        'pools': all_pool_stats(),
+    }, ready
+
+@api.route('/api/health/live', methods=['GET'])
+def liveness():
+    """Liveness probe: the worker answers requests; never touches the database"""
+    return jsonify({'status': 'OK', 'pid': os.getpid(), 'uptime_seconds': round(health_monitor.uptime(), 3)})
+
+@api.route('/api/health/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: warmed up and the cached database check is recent and passing"""
+    body, ready = health_payload()
+    return jsonify(body), 200 if ready else 503
+
+@api.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (the readiness answer, with 500 instead of 503)"""
+    body, ready = health_payload()
+    return jsonify(body), 200 if ready else 500
+
+@api.route('/api/stats', methods=['GET'])
+@versioned_read('trainees', 'trainings', 'users')
+@read_only
+def get_stats():
+    """Dashboard totals and breakdowns from the stat_rollups counters (admin: everyone, professional: own)"""
+    role = request.args.get('role')
+    user_id = request.args.get('user_id')
+    if not role:
+        return jsonify({'error': 'Role parameter is required'}), 400
+    if role == 'admin':
+        owner_id = ALL_OWNERS_ID
+    else:
+        try:
+            owner_id = int(user_id)
+        except (TypeError, ValueError):
+            owner_id = None
+        if not owner_id or owner_id < 0:
+            return jsonify({'error': 'User ID is required for non-admin users'}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
     try:
+        cursor = connection.cursor()
+        return jsonify({'success': True, 'stats': read_stats(cursor, owner_id)})
+    except mysql.connector.Error as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    finally:
+        cursor.close()
+        connection.close()
+
+@api.route('/api/reports', methods=['GET'])
+@versioned_read('trainees', 'trainings', 'users')
+@read_only
+def get_reports():
+    """Trainee / training trends per day, week, month or quarter from the report summary tables"""
+    role = request.args.get('role')
+    user_id = request.args.get('user_id')
+    if not role:
+        return jsonify({'error': 'Role parameter is required'}), 400
+    if role != 'admin' and not user_id:
+        return jsonify({'error': 'User ID is required for non-admin users'}), 400
+
+    try:
+        query, params, metric, bucket, group_by = build_report_query(
+            request.args, owner_id=None if role == 'admin' else user_id, dialect=DB_BACKEND)
+    except ReportParamError as e:
+        return jsonify({'error': str(e)}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        return jsonify({
+            'success': True,
+            'metric': metric,
+            'bucket': bucket,
+            'group_by': group_by,
+            'rows': shape_rows(repository.lists.rows(connection, query, params))
+        })
+    except mysql.connector.Error as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    finally:
+        connection.close()
+
+@api.route('/api/search', methods=['GET'])
+@versioned_read('trainees', 'trainings', 'users')
+@read_only
+def search():
+    """Ranked prefix / full-text search over trainees, trainings and (admin only) professionals"""
+    role = request.args.get('role')
+    user_id = request.args.get('user_id')
+    if not role:
+        return jsonify({'error': 'Role parameter is required'}), 400
+    if role != 'admin' and not user_id:
+        return jsonify({'error': 'User ID is required for non-admin users'}), 400
+
+    try:
+        queries = build_search_queries(request.args, owner_id=None if role == 'admin' else user_id,
+                                       dialect=DB_BACKEND)
+    except SearchParamError as e:
+        return jsonify({'error': str(e)}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        results = {name: shape_rows(repository.lists.rows(connection, query, params))
+                   for name, query, params in queries}
+        return jsonify({'success': True, 'results': results})
+    except mysql.connector.Error as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    finally:
+        connection.close()
+
+@api.route('/api/changes', methods=['GET'])
+@versioned_read('trainees', 'trainings', 'users')
+@read_only
+def get_changes():
+    """Rows inserted, updated or deleted since a change cursor (delta sync for the dashboards).
+
+    Without ``since`` only the current cursor is returned: fetch it, load the
+    lists, then poll with ``since`` to keep the local copy current.
+    """
+    role = request.args.get('role')
+    user_id = request.args.get('user_id')
+    if not role:
+        return jsonify({'error': 'Role parameter is required'}), 400
+    if role != 'admin' and not user_id:
+        return jsonify({'error': 'User ID is required for non-admin users'}), 400
+    try:
+        since = parse_cursor(request.args.get('since'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', CHANGES_DEFAULT_LIMIT)), 1), CHANGES_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'Limit must be an integer'}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        cursor = connection.cursor()
+        if since is None:
+            return jsonify({'success': True, 'changes': {}, 'next_cursor': str(current_cursor(cursor)),
+                            'has_more': False})
+        try:
+            latest, next_cursor, has_more = read_changes(cursor, since, None if role == 'admin' else user_id, limit)
+        except CursorExpiredError as e:
+            return jsonify({'error': f'{e}; reload the lists and start again without since'}), 410
+
+        changes = {}
+        for table, ops in latest.items():
+            upserted_ids = [row_id for row_id, op in ops.items() if op == UPSERT]
+            rows = repository.lists.find_many(connection, CHANGE_SPECS[table], upserted_ids) if upserted_ids else []
+            found = {row['id'] for row in rows}
+            # Rows deleted after the last entry of this page no longer exist either
+            deleted = sorted(row_id for row_id, op in ops.items() if op == DELETE or row_id not in found)
+            changes[table] = {'upserted': shape_rows(rows), 'deleted': deleted}
+
+        return jsonify({'success': True, 'changes': changes, 'next_cursor': str(next_cursor),
+                        'has_more': has_more})
+    except mysql.connector.Error as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    finally:
+        cursor.close()
+        connection.close()
+
+@api.route('/api/events', methods=['GET'])
+def events():
+    """Server-Sent Events stream of committed changes, scoped like get_trainees / get_trainings.
+
+    Each event is ``{"table", "id", "op"}`` with the change_log seq as its id;
+    a reconnect with ``Last-Event-ID`` (or ``?last_event_id=``) replays what
+    was missed, or sends a ``resync`` event when that is too much.
+    """
+    role = request.args.get('role')
+    user_id = request.args.get('user_id')
+    if not role:
+        return jsonify({'error': 'Role parameter is required'}), 400
+    owner_id = None
+    if role != 'admin':
+        try:
+            owner_id = int(user_id)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'User ID is required for non-admin users'}), 400
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = parse_cursor(last_event_id)
+    except ValueError:
+        return jsonify({'error': 'Last-Event-ID must be an event id from this stream'}), 400
+
+    try:
+        subscriber = event_broker.subscribe(owner_id)
+    except TooManySubscribersError as e:
+        return jsonify({'error': str(e)}), 503
+
+    backlog, resync = [], False
+    if last_event_id is not None:
+        backlog = None
         connection = get_db_connection()
         if connection:
+            try:
+                cursor = connection.cursor()
+                backlog = replay(cursor, last_event_id, owner_id)
+                cursor.close()
+            except mysql.connector.Error as e:
+                logger.warning(f"Event replay failed: {e}")
+            finally:
+                connection.close()
+        if backlog is None:
+            backlog, resync = [], True
+
+    response = Response(event_stream(event_broker, subscriber, backlog, resync), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Also covers clients that disconnect before the body generator starts
+    response.call_on_close(lambda: event_broker.unsubscribe(subscriber))
+    return response
+
+@api.route('/api/event_stats', methods=['GET'])
+def event_stats():
+    """Event stream subscribers and poller counters for this worker process"""
+    return jsonify({'success': True, 'events': event_broker.info()})
+
+@api.route('/api/pool_stats', methods=['GET'])
+def pool_stats():
+    """Connection pool and replica routing counters for this worker process"""
+    return jsonify({'success': True, 'pools': all_pool_stats(), 'replicas': db_router.stats()})
+
+def job_owner():
+    """Owner scope of a /api/jobs request: None for admins, else the user_id; raises ValueError"""
+    if request.args.get('role') == 'admin':
+        return None
+    user_id = request.args.get('user_id')
+    if not user_id or not user_id.isdigit():
+        raise ValueError('User ID is required for non-admin users')
+    return int(user_id)
+
+def visible_job(connection, job_id, owner_id):
+    """The job when the caller may see it, else None"""
+    job = jobs.get_job(connection, job_id)
+    if job is None or (owner_id is not None and job['owner_id'] != owner_id):
+        return None
+    return job
+
+@api.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue an export or report job for the background workers (see jobs.py).
+
+    Body: {"kind": "export", "params": {"table": "trainees", "format": "csv"}}
+    or {"kind": "report", "params": {<the /api/reports parameters>, "format": ...}}.
+    """
+    data = request.get_json(silent=True)
+    try:
+        owner_id = job_owner()
+        if not isinstance(data, dict):
+            raise ValueError('Request body must be a JSON object')
+        params = jobs.parse_params(data.get('kind'), data.get('params', {}), owner_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        job_id = jobs.submit(connection, data['kind'], params, owner_id)
+        job = jobs.get_job(connection, job_id)
+    except jobs.TooManyJobsError as e:
+        return jsonify({'error': str(e)}), 429
+    except mysql.connector.Error as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    finally:
+        connection.close()
+
+    response = jsonify({'success': True, 'job': jobs.describe(job)})
+    response.status_code = 202
+    response.headers['Location'] = f"/api/jobs/{job_id}"
+    return response
+
+@api.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """The caller's most recent jobs (everyone's for admins)"""
+    try:
+        owner_id = job_owner()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        return jsonify({'success': True, 'jobs': [jobs.describe(job) for job in jobs.list_jobs(connection, owner_id)]})
+    except mysql.connector.Error as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    finally:
+        connection.close()
+
+@api.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status and progress of one job"""
+    try:
+        owner_id = job_owner()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        job = visible_job(connection, job_id, owner_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify({'success': True, 'job': jobs.describe(job)})
+    except mysql.connector.Error as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    finally:
+        connection.close()
+
+@api.route('/api/jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued job, or stop a running one after its current chunk"""
+    try:
+        owner_id = job_owner()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        job = visible_job(connection, job_id, owner_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        if job['status'] not in jobs.ACTIVE:
+            return jsonify({'error': f"Job is already {job['status']}"}), 409
+        return jsonify({'success': True, 'job': jobs.describe(jobs.cancel(connection, job_id))})
+    except mysql.connector.Error as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    finally:
+        connection.close()
+
+@api.route('/api/jobs/<int:job_id>/download', methods=['GET'])
+def download_job(job_id):
+    """The gzip-compressed CSV / NDJSON file of a finished job"""
+    try:
+        owner_id = job_owner()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+    try:
+        job = visible_job(connection, job_id, owner_id)
+    except mysql.connector.Error as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    finally:
+        connection.close()
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] != jobs.DONE:
+        return jsonify({'error': f"Job is {job['status']}"}), 409
+    path = jobs.artifact_path(job)
+    if not os.path.exists(path):
+        return jsonify({'error': 'Job output has been removed'}), 410
+    return send_file(path, mimetype='application/gzip', as_attachment=True, download_name=jobs.artifact_name(job))
+
+def stream_export(export_format, table):
+    """Stream one table (or all of them) as NDJSON or CSV without buffering it in memory"""
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    if table and table not in EXPORT_QUERIES:
+        return jsonify({'error': f"Table must be one of: {', '.join(EXPORT_QUERIES)}"}), 400
+    if export_format == 'csv' and not table:
+        return jsonify({'error': 'CSV export needs a table parameter'}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    tables = [table] if table else list(EXPORT_QUERIES)
+
+    def generate():
+        try:
+            if export_format == 'csv':
+                yield from csv_chunks(connection, table)
+            else:
+                yield from ndjson_chunks(connection, tables)
+        except mysql.connector.Error as e:
+            # Headers are already sent; log and end the stream early
+            logger.error(f"Export of {', '.join(tables)} failed: {e}")
+        finally:
             connection.close()
-            return jsonify({
-                'status': 'OK', 
-                'message': 'Server and database are running',
-                'timestamp': datetime.now().isoformat()
-            })
-        else:
-            return jsonify({
-                'status': 'ERROR', 
-                'message': 'Database connection failed'
-            }), 500
-    except Exception as e:
-        return jsonify({
-            'status': 'ERROR', 
-            'message': f'Health check failed: {str(e)}'
-        }), 500
 
-@app.route('/api/data', methods=['GET'])
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    filename = f"suraksha-{table or 'all'}.{export_format}"
+    return Response(generate(), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}',
+        'X-Accel-Buffering': 'no'
+    })
+
+@api.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request latency, error, size and database timing metrics in the Prometheus text format"""
+    return Response(metrics.exposition(), mimetype='text/plain; version=0.0.4')
+
+@api.route('/api/slow_queries', methods=['GET'])
+def slow_queries():
+    """Slowest statement fingerprints by total time for this worker process (admin only)"""
+    if request.args.get('role') != 'admin':
+        return jsonify({'error': 'Admin access required'}), 403
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({'error': 'Limit must be an integer'}), 400
+    return jsonify({
+        'success': True,
+        'slow_queries': slow_query_log.top(max(1, min(limit, 200))),
+        'log': slow_query_log.info()
+    })
+
+@api.route('/api/cache_stats', methods=['GET'])
+def cache_stats():
+    """Result cache hit/miss/eviction counters for this worker process"""
+    return jsonify({'success': True, 'cache': result_cache.info()})
+
+@api.route('/api/data', methods=['GET'])
+@versioned_read('users', 'trainees', 'trainings')
+@read_only
 def get_all_data():
-    """Get all data from all tables for viewing table structures"""
+    """Get all data from all tables for viewing table structures.
+
+    With ?format=ndjson|csv (and optionally ?table=...) the rows are streamed
+    from an unbuffered cursor in batches instead of being built into one JSON
+    document.
+    """
+    export_format = request.args.get('format')
+    if export_format:
+        return stream_export(export_format, request.args.get('table'))
+
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Database connection failed'}), 500
@@ -639,43 +1973,11 @@ def get_all_data():
     try:
         cursor = connection.cursor(dictionary=True)
         
-        # Get data from all tables
+        # Get data from all tables; dates and times are formatted by the JSON provider
         data = {}
-        
-        # Users table
-        cursor.execute("SELECT * FROM users ORDER BY created_at DESC")
-        users = cursor.fetchall()
-        # Convert datetime objects to strings for users
-        for user in users:
-            if user['created_at']:
-                user['created_at'] = user['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-        data['users'] = users
-        
-        # Trainees table
-        cursor.execute("SELECT * FROM trainees ORDER BY created_at DESC")
-        trainees = cursor.fetchall()
-        # Convert datetime and date objects to strings for trainees
-        for trainee in trainees:
-            if trainee['training_date']:
-                trainee['training_date'] = trainee['training_date'].strftime('%Y-%m-%d')
-            if trainee['created_at']:
-                trainee['created_at'] = trainee['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-        data['trainees'] = trainees
-        
-        # Trainings table
-        cursor.execute("SELECT * FROM trainings ORDER BY created_at DESC")
-        trainings = cursor.fetchall()
-        # Convert datetime, date and time objects to strings for trainings
-        for training in trainings:
-            if training['training_date']:
-                training['training_date'] = training['training_date'].strftime('%Y-%m-%d')
-            if training['training_time']:
-                training['training_time'] = str(training['training_time'])
-            if training['created_at']:
-                training['created_at'] = training['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-            if training['updated_at']:
-                training['updated_at'] = training['updated_at'].strftime('%Y-%m-%d %H:%M:%S')
-        data['trainings'] = trainings
+        for table, query in EXPORT_QUERIES.items():
+            cursor.execute(query)
+            data[table] = shape_rows(cursor.fetchall())
         
         return jsonify({
             'success': True, 
@@ -690,21 +1992,74 @@ def get_all_data():
         connection.close()
 
 # Error handlers for production
-@app.errorhandler(404)
+@api.app_errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
-@app.errorhandler(Exception)
+@api.app_errorhandler(Exception)
 def handle_exception(e):
-    app.logger.error(f"Unhandled exception: {str(e)}")
+    logger.error(f"Unhandled exception: {str(e)}")
     return jsonify({'error': 'An unexpected error occurred'}), 500
 
+def warm_up(app):
+    """Open the pooled connections, check the replicas and fill the result cache for WARM_PATHS"""
+    started = time.perf_counter()
+    try:
+        opened = primary_pool().warm()
+        for replica in db_router.replicas:
+            db_router.check(replica)
+    except Exception as e:
+        logger.warning(f"Warm-up could not open database connections: {e}")
+        opened = 0
+    health_monitor.check()
+    with app.test_client() as client:
+        for path in WARM_PATHS:
+            response = client.get(path, headers={'X-Request-ID': 'warm-up'})
+            if response.status_code != 200:
+                logger.warning(f"Warm-up request {path} answered {response.status_code}")
+    logger.info(f"Warmed up {opened} connections and {len(WARM_PATHS)} cached reads "
+                f"in {time.perf_counter() - started:.3f}s")
+
+def create_app(warm=True):
+    """Build the application.
+
+    With ``warm`` the pools, replica checks and result cache of this process
+    are warmed before it returns, and /api/health/ready only passes after
+    that. Call it in every worker (gunicorn 'app:create_app()' without
+    --preload): pools and caches belong to the process that filled them.
+    """
+    app = Flask(__name__)
+    app.json = RowJSONProvider(app)
+    CORS(app, expose_headers=['ETag', 'X-Request-ID'])
+    # Installed before the blueprint's compression hook so response sizes are measured after compression
+    metrics.init_app(app)
+    app.register_blueprint(api)
+
+    # Production-ready configuration
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'suraksha-medical-training-2024')
+    app.config['DEBUG'] = os.environ.get('FLASK_ENV') != 'production'
+
+    if warm:
+        warm_up(app)
+    # Starts the background checks, which from now on decide readiness
+    health_monitor.mark_warmed()
+    return app
+
+def __getattr__(name):
+    # "from app import app", gunicorn app:app and flask run get an application built on first use, unwarmed
+    global app
+    if name == 'app':
+        app = create_app(warm=False)
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == '__main__':
     # Production-ready settings
+    app = create_app()
     port = int(os.environ.get('PORT', 6969))
     debug = app.config['DEBUG']
     
@@ -0,0 +1,84 @@
+"""Compare bulk trainee import throughput with one register_trainee request per trainee.
+
+Drives both endpoints through Flask's test client against the configured
+database (DB_HOST / DB_USER / DB_PASSWORD / DB_NAME, or DB_BACKEND=sqlite),
+so the numbers cover request handling, validation and the inserts but not
+network round trips. Inserted rows are tagged and deleted afterwards.
+
+    cd backend
+    python benchmarks/bench_bulk_import.py --rows 2000 --registered-by 2
+    DB_BACKEND=sqlite SQLITE_PATH=:memory: python benchmarks/bench_bulk_import.py --rows 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import app, DB_CONFIG, DB_CONNECT, BLOCKS, BULK_MAX_ROWS
+
+BENCH_ADDRESS = 'Bulk import benchmark'
+
+
+def make_rows(count, registered_by):
+    return [{
+        'name': f"Bench trainee {n}",
+        'mobile_number': f"9{n:09d}",
+        'gender': 'Female' if n % 2 else 'Male',
+        'age': 20 + n % 30,
+        'department': 'Emergency',
+        'address': BENCH_ADDRESS,
+        'block': BLOCKS[n % len(BLOCKS)],
+        'training_date': '2024-06-01',
+        'cpr_training': n % 3 == 0,
+        'registered_by': registered_by,
+    } for n in range(count)]
+
+
+def cleanup(client):
+    """Delete the tagged trainees through the API so stats, reports and the change log stay consistent"""
+    connection = DB_CONNECT(**DB_CONFIG, autocommit=True)
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT id FROM trainees WHERE address = %s", (BENCH_ADDRESS,))
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+    finally:
+        connection.close()
+    for start in range(0, len(ids), BULK_MAX_ROWS):
+        response = client.post('/api/trainees/bulk_delete?role=admin', json={'ids': ids[start:start + BULK_MAX_ROWS]})
+        assert response.status_code == 200, response.get_json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--registered-by', type=int, default=2, help='id of an existing professional')
+    args = parser.parse_args()
+
+    client = app.test_client()
+    rows = make_rows(args.rows, args.registered_by)
+    try:
+        started = time.perf_counter()
+        for row in rows:
+            response = client.post('/api/register_trainee', json=row)
+            assert response.status_code == 200, response.get_json()
+        single = time.perf_counter() - started
+        cleanup(client)
+
+        started = time.perf_counter()
+        response = client.post('/api/trainees/bulk', json=rows)
+        bulk = time.perf_counter() - started
+        report = response.get_json()
+        assert report['accepted'] == args.rows, report
+    finally:
+        cleanup(client)
+
+    print(f"single   {args.rows / single:10.0f} rows/sec  ({single:.2f}s)")
+    print(f"bulk     {args.rows / bulk:10.0f} rows/sec  ({bulk:.2f}s)")
+    print(f"speedup  {single / bulk:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Fire hundreds of parallel enrollments at one training and check nothing is overbooked.
+
+Creates a tagged training with --capacity seats and --trainees tagged
+trainees through the API of a running server, then enrolls every trainee in
+it from --concurrency threads at once (--batch trainees per request). The run
+fails if more trainees were enrolled than there are seats, if
+current_trainees disagrees with the enrollment rows, or if any request
+errored (e.g. a lock wait timeout or deadlock). Latency percentiles show
+whether requests queue behind the training row lock. The tagged rows are
+deleted through the API afterwards.
+
+    cd backend
+    gunicorn -w 8 -b 127.0.0.1:6970 app:app
+    python benchmarks/bench_enrollment.py --url http://127.0.0.1:6970 --trainees 500 --capacity 50 --conducted-by 2
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import mysql.connector
+
+from app import DB_CONFIG, BLOCKS
+
+BENCH_ADDRESS = 'Enrollment benchmark'
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def api_request(base_url, method, path, payload=None):
+    """(status, JSON body) of one API call"""
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = urllib.request.Request(base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b'{}')
+
+
+def tagged_ids(table):
+    connection = mysql.connector.connect(**DB_CONFIG, autocommit=True)
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT id FROM {table} WHERE address = %s ORDER BY id", (BENCH_ADDRESS,))
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        return ids
+    finally:
+        connection.close()
+
+
+def setup(base_url, trainees, capacity, conducted_by):
+    status, body = api_request(base_url, 'POST', '/api/create_training', {
+        'title': 'Enrollment benchmark session', 'training_topic': 'CPR', 'address': BENCH_ADDRESS,
+        'block': 'Raipur', 'training_date': '2030-01-01', 'training_time': '10:00:00',
+        'max_trainees': capacity, 'conducted_by': conducted_by,
+    })
+    assert status == 200, body
+    rows = [{
+        'name': f"Enrollment bench {n}", 'gender': 'Female' if n % 2 else 'Male', 'age': 20 + n % 30,
+        'department': 'Emergency', 'address': BENCH_ADDRESS, 'block': BLOCKS[n % len(BLOCKS)],
+        'training_date': '2030-01-01', 'registered_by': conducted_by,
+    } for n in range(trainees)]
+    status, body = api_request(base_url, 'POST', '/api/trainees/bulk', rows)
+    assert status == 200 and body['accepted'] == trainees, body
+    return tagged_ids('trainings')[-1], tagged_ids('trainees')
+
+
+def cleanup(base_url):
+    for training_id in tagged_ids('trainings'):
+        api_request(base_url, 'DELETE', f"/api/delete_training/{training_id}")
+    for trainee_id in tagged_ids('trainees'):
+        api_request(base_url, 'DELETE', f"/api/delete_trainee/{trainee_id}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:6970')
+    parser.add_argument('--trainees', type=int, default=500)
+    parser.add_argument('--capacity', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=200, help='parallel requests')
+    parser.add_argument('--batch', type=int, default=1, help='trainees per enrollment request')
+    parser.add_argument('--conducted-by', type=int, default=2, help='id of an existing professional')
+    args = parser.parse_args()
+
+    cleanup(args.url)
+    training_id, trainee_ids = setup(args.url, args.trainees, args.capacity, args.conducted_by)
+    path = f"/api/trainings/{training_id}/enrollments"
+    batches = [trainee_ids[start:start + args.batch] for start in range(0, len(trainee_ids), args.batch)]
+
+    def enroll(batch):
+        started = time.perf_counter()
+        status, body = api_request(args.url, 'POST', path, {'trainee_ids': batch})
+        return time.perf_counter() - started, status, body
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            outcomes = list(pool.map(enroll, batches))
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency for latency, _, _ in outcomes]
+        errors = [body.get('error') for _, status, body in outcomes if status != 200]
+        granted = sum(1 for _, status, body in outcomes if status == 200
+                      for result in body['results'] if result['status'] == 'enrolled')
+        full = sum(1 for _, status, body in outcomes if status == 200
+                   for result in body['results'] if result['status'] == 'full')
+        status, listing = api_request(args.url, 'GET', f"{path}?role=admin")
+        assert status == 200, listing
+        enrolled_rows = len(listing['trainees'])
+        current = listing['training']['current_trainees']
+
+        print(f"{len(batches)} requests ({args.trainees} trainees, {args.concurrency} in parallel) "
+              f"in {elapsed:.2f}s: {granted} enrolled, {full} full, {len(errors)} errors")
+        print(f"latency p50 {percentile(latencies, 0.5) * 1000:.0f} ms, p95 {percentile(latencies, 0.95) * 1000:.0f} ms, "
+              f"p99 {percentile(latencies, 0.99) * 1000:.0f} ms, max {max(latencies) * 1000:.0f} ms")
+        print(f"capacity {args.capacity}, current_trainees {current}, enrollment rows {enrolled_rows}")
+        if errors:
+            print(f"errors, e.g. {errors[0]}")
+
+        expected = min(args.capacity, args.trainees)
+        ok = granted == enrolled_rows == current == expected and not errors
+        print('OK: no overbooking' if ok else 'FAILED')
+        return 0 if ok else 1
+    finally:
+        cleanup(args.url)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""Hold thousands of idle /api/events streams open and measure event fan-out latency.
+
+Opens --subscribers SSE connections to a running server, keeps them idle for
+--hold seconds while counting heartbeats, then (with --writes) registers and
+deletes tagged trainees through the API and measures how long every
+subscriber takes to receive each change event. Start the server with an
+async worker so idle streams do not each occupy a worker:
+
+    cd backend
+    EVENTS_HEARTBEAT=5 gunicorn -k gevent -w 1 --worker-connections 20000 -b 127.0.0.1:6970 app:app
+    python benchmarks/bench_events.py --url http://127.0.0.1:6970 --subscribers 5000 --hold 30
+    python benchmarks/bench_events.py --url http://127.0.0.1:6970 --subscribers 2000 --writes 20 --registered-by 2
+
+--server-pid reports the server's resident memory before and after the
+streams are opened.
+"""
+import argparse
+import asyncio
+import json
+import resource
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+BENCH_ADDRESS = 'Event stream benchmark'
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def rss_mib(pid):
+    if not pid:
+        return None
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+class Stream:
+    """One raw-socket SSE client (HTTP/1.0, so the body is not chunked)"""
+
+    def __init__(self, host, port, path):
+        self.host, self.port, self.path = host, port, path
+        self.connect_time = None
+        self.heartbeats = 0
+        self.events = []  # (received_at, event)
+        self.error = None
+        self.connected = asyncio.Event()
+
+    async def run(self, stop):
+        started = time.perf_counter()
+        writer = None
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            writer.write(f"GET {self.path} HTTP/1.0\r\nHost: {self.host}\r\nAccept: text/event-stream\r\n\r\n"
+                         .encode('ascii'))
+            await writer.drain()
+            status = await reader.readline()
+            if b' 200 ' not in status:
+                raise RuntimeError(status.decode('latin-1').strip())
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            self.connect_time = time.perf_counter() - started
+            self.connected.set()
+            while not stop.is_set():
+                line = await reader.readline()
+                if not line:
+                    raise RuntimeError('stream closed by server')
+                if line.startswith(b': ping'):
+                    self.heartbeats += 1
+                elif line.startswith(b'data: ') and line.strip() != b'data: {}':
+                    self.events.append((time.perf_counter(), json.loads(line[6:])))
+        except Exception as e:
+            self.error = str(e) or type(e).__name__
+            self.connected.set()
+        finally:
+            if writer is not None:
+                writer.close()
+
+
+def api_request(base_url, method, path, payload=None):
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = urllib.request.Request(base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())
+
+
+async def wait_for_event(streams, match, started, timeout):
+    """Seconds each stream took to receive the first event after ``started`` matching ``match``"""
+    deadline = time.perf_counter() + timeout
+    while True:
+        latencies = []
+        for stream in streams:
+            for received_at, event in stream.events:
+                if received_at >= started and match(event):
+                    latencies.append(received_at - started)
+                    break
+        if len(latencies) == len(streams) or time.perf_counter() > deadline:
+            return latencies
+        await asyncio.sleep(0.01)
+
+
+async def main_async(args):
+    parts = urlsplit(args.url)
+    path = f"/api/events?role={args.role}" + (f"&user_id={args.user_id}" if args.user_id else '')
+    stop = asyncio.Event()
+    streams = [Stream(parts.hostname, parts.port or 80, path) for _ in range(args.subscribers)]
+
+    rss_before = rss_mib(args.server_pid)
+    tasks = []
+    opened = time.perf_counter()
+    for n, stream in enumerate(streams):
+        tasks.append(asyncio.create_task(stream.run(stop)))
+        if n % 200 == 199:
+            await asyncio.sleep(0.05)  # ramp up instead of a SYN flood
+    await asyncio.gather(*(stream.connected.wait() for stream in streams))
+    open_seconds = time.perf_counter() - opened
+    connected = [stream for stream in streams if stream.connect_time is not None]
+    print(f"opened {len(connected)}/{len(streams)} streams in {open_seconds:.1f}s; connect p50 "
+          f"{percentile([s.connect_time for s in connected], 0.5) * 1000:.1f} ms, p99 "
+          f"{percentile([s.connect_time for s in connected], 0.99) * 1000:.1f} ms" if connected else
+          'no stream could connect')
+
+    await asyncio.sleep(args.hold)
+    alive = [stream for stream in connected if stream.error is None]
+    heartbeats = [stream.heartbeats for stream in alive]
+    print(f"after {args.hold:.0f}s idle: {len(alive)} streams alive, heartbeats per stream "
+          f"min {min(heartbeats, default=0)} / max {max(heartbeats, default=0)}")
+    rss_after = rss_mib(args.server_pid)
+    if rss_before is not None and rss_after is not None:
+        per_stream = (rss_after - rss_before) * 1024 / max(1, len(alive))
+        print(f"server RSS {rss_before:.1f} MiB -> {rss_after:.1f} MiB ({per_stream:.1f} KiB per stream)")
+
+    latencies = []
+    missed = 0
+    for n in range(args.writes):
+        started = time.perf_counter()
+        await asyncio.to_thread(api_request, args.url, 'POST', '/api/register_trainee', {
+            'name': f"Event bench {n}", 'gender': 'Female', 'age': 30, 'department': 'Emergency',
+            'address': BENCH_ADDRESS, 'block': 'Raipur', 'training_date': '2024-06-01',
+            'registered_by': args.registered_by,
+        })
+        received = await wait_for_event(alive, lambda e: e['table'] == 'trainees' and e['op'] == 'upsert',
+                                         started, args.timeout)
+        latencies += received
+        missed += len(alive) - len(received)
+        created = [event for stream in alive for received_at, event in stream.events
+                   if received_at >= started and event['table'] == 'trainees' and event['op'] == 'upsert']
+        if created:
+            trainee_id = created[0]['id']
+            started = time.perf_counter()
+            await asyncio.to_thread(api_request, args.url, 'DELETE', f"/api/delete_trainee/{trainee_id}")
+            received = await wait_for_event(
+                alive, lambda e: e['id'] == trainee_id and e['op'] == 'delete', started, args.timeout)
+            latencies += received
+            missed += len(alive) - len(received)
+
+    if args.writes:
+        deliveries = len(latencies)
+        print(f"{args.writes * 2} writes, {deliveries} deliveries, {missed} missed; delivery latency "
+              f"p50 {percentile(latencies, 0.5) * 1000:.0f} ms, p95 {percentile(latencies, 0.95) * 1000:.0f} ms, "
+              f"p99 {percentile(latencies, 0.99) * 1000:.0f} ms" if latencies else f"{missed} deliveries missed")
+
+    errors = [stream.error for stream in streams if stream.error]
+    if errors:
+        print(f"{len(errors)} stream errors, e.g. {errors[0]}")
+    stop.set()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:6970')
+    parser.add_argument('--subscribers', type=int, default=2000)
+    parser.add_argument('--hold', type=float, default=20, help='seconds to keep the streams idle')
+    parser.add_argument('--role', default='admin')
+    parser.add_argument('--user-id', type=int)
+    parser.add_argument('--writes', type=int, default=0, help='trainees to create and delete through the API')
+    parser.add_argument('--registered-by', type=int, default=2, help='id of an existing professional')
+    parser.add_argument('--timeout', type=float, default=10, help='seconds to wait for each event')
+    parser.add_argument('--server-pid', type=int, help='report this process\'s resident memory')
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < args.subscribers + 100:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, args.subscribers + 1000), hard))
+    asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Benchmark the get_professionals aggregation against the old join fan-out query.
+
+Seeds professionals with thousands of trainings and trainees each into the
+configured database (DB_HOST / DB_USER / DB_PASSWORD / DB_NAME), times both
+queries and removes the seeded rows again (deleting the bench users cascades
+to their trainings and trainees).
+
+    cd backend
+    python benchmarks/bench_professionals.py --professionals 20 --per-professional 3000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import mysql.connector
+
+from app import DB_CONFIG, PROFESSIONAL_SELECT
+
+BENCH_PREFIX = 'bench_prof_'
+
+# The query get_professionals ran before the counts moved to subqueries
+LEGACY_QUERY = """
+    SELECT 
+        u.id, u.name, u.username, u.mobile_number, u.gender, u.age, 
+        u.designation, u.department, u.specialization, u.experience_years, u.created_at,
+        COUNT(DISTINCT t.id) as total_trainings,
+        COUNT(DISTINCT tr.id) as total_trainees_trained
+    FROM users u
+    LEFT JOIN trainings t ON u.id = t.conducted_by
+    LEFT JOIN trainees tr ON u.id = tr.registered_by
+    WHERE u.role = 'professional'
+    GROUP BY u.id, u.name, u.username, u.mobile_number, u.gender, u.age, 
+             u.designation, u.department, u.specialization, u.experience_years, u.created_at
+    ORDER BY u.created_at DESC
+"""
+
+CURRENT_QUERY = f"""
+    SELECT {PROFESSIONAL_SELECT}
+    FROM users u
+    WHERE u.role = 'professional'
+    ORDER BY u.created_at DESC, u.id DESC
+"""
+
+
+def seed(cursor, professionals, per_professional, chunk=1000):
+    ids = []
+    for i in range(professionals):
+        cursor.execute(
+            """INSERT INTO users (name, username, password, mobile_number, gender, age, role)
+               VALUES (%s, %s, 'bench', '9000000000', 'Male', 40, 'professional')""",
+            (f"Bench Professional {i}", f"{BENCH_PREFIX}{i}")
+        )
+        ids.append(cursor.lastrowid)
+
+    training_sql = """INSERT INTO trainings (title, training_topic, address, block, training_date,
+                      training_time, conducted_by) VALUES (%s, 'Bench', 'Bench Hall', 'Raipur', '2024-01-01', '09:00:00', %s)"""
+    trainee_sql = """INSERT INTO trainees (name, gender, age, department, address, block, training_date, registered_by)
+                     VALUES (%s, 'Female', 30, 'Bench', 'Bench Hall', 'Raipur', '2024-01-01', %s)"""
+    for user_id in ids:
+        for start in range(0, per_professional, chunk):
+            count = min(chunk, per_professional - start)
+            cursor.executemany(training_sql, [(f"Bench training {start + n}", user_id) for n in range(count)])
+            cursor.executemany(trainee_sql, [(f"Bench trainee {start + n}", user_id) for n in range(count)])
+    return ids
+
+
+def time_query(cursor, query, repeat):
+    samples = []
+    rows = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor.execute(query)
+        rows = cursor.fetchall()
+        samples.append(time.perf_counter() - started)
+    return samples, rows
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<10} median {statistics.median(samples) * 1000:9.1f} ms   p95 {p95 * 1000:9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--professionals', type=int, default=20)
+    parser.add_argument('--per-professional', type=int, default=2000,
+                        help='trainings and trainees seeded for each professional')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--keep', action='store_true', help='leave the seeded rows in place')
+    args = parser.parse_args()
+
+    connection = mysql.connector.connect(**DB_CONFIG, autocommit=True)
+    cursor = connection.cursor(dictionary=True)
+    try:
+        print(f"Seeding {args.professionals} professionals x {args.per_professional} trainings/trainees ...")
+        seed(cursor, args.professionals, args.per_professional)
+        cursor.execute("ANALYZE TABLE users, trainings, trainees")
+        cursor.fetchall()
+
+        legacy, legacy_rows = time_query(cursor, LEGACY_QUERY, args.repeat)
+        current, current_rows = time_query(cursor, CURRENT_QUERY, args.repeat)
+
+        legacy_counts = {r['id']: (r['total_trainings'], r['total_trainees_trained']) for r in legacy_rows}
+        current_counts = {r['id']: (r['total_trainings'], r['total_trainees_trained']) for r in current_rows}
+        if legacy_counts != current_counts:
+            print('WARNING: the two queries returned different counts')
+
+        report('legacy', legacy)
+        report('current', current)
+        print(f"speedup    {statistics.median(legacy) / statistics.median(current):9.1f}x")
+    finally:
+        if not args.keep:
+            cursor.execute("DELETE FROM users WHERE username LIKE %s", (f"{BENCH_PREFIX}%",))
+        cursor.close()
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Time the repository statements with and without the prepared statement cache.
+
+Runs --cycles insert / update / lookup / delete cycles of one trainee through
+repository.py on a pooled connection of the configured backend. The first
+pass uses a pool with DB_STATEMENT_CACHE_SIZE prepared statements per
+connection and the second one plain cursors. The rollup hooks are not
+called; each trainee is deleted in the cycle that inserted it. With
+DB_BACKEND=sqlite and SQLITE_PATH=:memory: everything runs in-process.
+
+    cd backend
+    python benchmarks/bench_repository.py --cycles 2000 --registered-by 2
+    DB_BACKEND=sqlite SQLITE_PATH=:memory: python benchmarks/bench_repository.py
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import DB_BACKEND, DB_CONFIG, DB_CONNECT, DB_CONNECT_KWARGS
+from db_pool import ConnectionPool, STATEMENT_CACHE_SIZE
+import repository
+
+BENCH_ADDRESS = 'Repository benchmark'
+OPERATIONS = ('insert', 'update', 'lookup', 'delete')
+
+
+def trainee_values(n, registered_by):
+    return (f"Repository bench {n}", f"9{n:09d}", 'Female' if n % 2 else 'Male', 20 + n % 30, 'Emergency', '',
+            BENCH_ADDRESS, 'Raipur', '2030-01-01', n % 3 == 0, False, False, registered_by)
+
+
+def run(pool, cycles, registered_by):
+    """{operation: total seconds} over ``cycles`` cycles"""
+    totals = dict.fromkeys(OPERATIONS, 0.0)
+    for n in range(cycles):
+        values = trainee_values(n, registered_by)
+        connection = pool.acquire()
+        try:
+            started = time.perf_counter()
+            trainee_id = repository.trainees.insert(connection, values)
+            inserted = time.perf_counter()
+            repository.trainees.update(connection, trainee_id, values[:-1])
+            updated = time.perf_counter()
+            assert repository.users.role(connection, registered_by) == 'professional'
+            looked_up = time.perf_counter()
+            repository.trainees.delete(connection, trainee_id)
+            deleted = time.perf_counter()
+        finally:
+            connection.close()
+        totals['insert'] += inserted - started
+        totals['update'] += updated - inserted
+        totals['lookup'] += looked_up - updated
+        totals['delete'] += deleted - looked_up
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cycles', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--registered-by', type=int, default=2, help='id of an existing professional')
+    args = parser.parse_args()
+
+    results = {}
+    for label, cache_size in (('prepared', STATEMENT_CACHE_SIZE or 32), ('plain', 0)):
+        pool = ConnectionPool(DB_CONFIG, size=1, max_overflow=0, connect_kwargs=DB_CONNECT_KWARGS,
+                              connect=DB_CONNECT, statement_cache_size=cache_size)
+        try:
+            run(pool, args.warmup, args.registered_by)
+            results[label] = run(pool, args.cycles, args.registered_by)
+            stats = pool.stats()
+        finally:
+            pool.dispose()
+        print(f"{label:9} statement cache {cache_size:3}: {stats['prepared_statements']} prepared, "
+              f"{stats['statement_hits']} hits, {stats['statement_misses']} misses")
+
+    print(f"\n{DB_BACKEND}, {args.cycles} cycles    prepared µs    plain µs   speedup")
+    for operation in OPERATIONS + ('cycle',):
+        if operation == 'cycle':
+            prepared, plain = (sum(results[label].values()) for label in ('prepared', 'plain'))
+        else:
+            prepared, plain = results['prepared'][operation], results['plain'][operation]
+        print(f"{operation:22} {prepared / args.cycles * 1e6:13.1f} {plain / args.cycles * 1e6:11.1f} "
+              f"{plain / prepared:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
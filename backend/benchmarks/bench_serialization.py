@@ -0,0 +1,107 @@
+"""Micro-benchmark: encoding trainee rows with the row JSON provider vs. the old per-row strftime path.
+
+Builds synthetic rows shaped like `SELECT t.*, u.name as registered_by_name`
+results (date, datetime and TIME/DECIMAL values included) and measures
+encode time and peak Python allocations (tracemalloc) for both paths.
+Needs no database.
+
+    cd backend
+    python benchmarks/bench_serialization.py --rows 100000
+"""
+import argparse
+import copy
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import serialization
+from serialization import RowJSONProvider
+
+BLOCKS = ('Bastar', 'Bilaspur', 'Durg', 'Raigarh', 'Raipur', 'Surguja')
+
+
+def make_rows(count):
+    base = datetime(2024, 1, 1, 9, 30)
+    return [{
+        'id': n,
+        'name': f"Trainee {n}",
+        'mobile_number': f"9{n:09d}",
+        'gender': 'Female' if n % 2 else 'Male',
+        'age': 20 + n % 40,
+        'department': 'Emergency',
+        'designation': 'Paramedic',
+        'address': f"Ward {n % 50}, District Hospital",
+        'block': BLOCKS[n % len(BLOCKS)],
+        'training_date': date(2024, 1, 1) + timedelta(days=n % 365),
+        'training_time': timedelta(hours=9 + n % 8),
+        'duration_hours': Decimal('2.5'),
+        'cpr_training': n % 2,
+        'first_aid_kit_given': n % 3 == 0,
+        'life_saving_skills': 1,
+        'registered_by': 2 + n % 14,
+        'created_at': base + timedelta(minutes=n),
+        'registered_by_name': f"Dr. Professional {n % 14}",
+    } for n in range(count)]
+
+
+def legacy_encode(app, rows):
+    """What get_trainees did before: rewrite each row, then jsonify with the stdlib encoder"""
+    for row in rows:
+        if row['training_date']:
+            row['training_date'] = row['training_date'].strftime('%Y-%m-%d')
+        if row['training_time']:
+            row['training_time'] = str(row['training_time'])
+        if row['created_at']:
+            row['created_at'] = row['created_at'].strftime('%Y-%m-%d %H:%M:%S')
+    return app.json.response({'success': True, 'trainees': rows}).get_data()
+
+
+def current_encode(app, rows):
+    return app.json.response({'success': True, 'trainees': rows}).get_data()
+
+
+def measure(label, func, app, rows):
+    """Time one encode, then repeat it under tracemalloc for the allocation peak"""
+    with app.app_context():
+        timed_rows = copy.deepcopy(rows)
+        started = time.perf_counter()
+        body = func(app, timed_rows)
+        elapsed = time.perf_counter() - started
+
+        traced_rows = copy.deepcopy(rows)
+        tracemalloc.start()
+        func(app, traced_rows)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    print(f"{label:<8} {elapsed * 1000:9.1f} ms   peak {peak / 1024 / 1024:8.1f} MiB   body {len(body) / 1024 / 1024:6.1f} MiB")
+    return body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    legacy_app = Flask('legacy')
+    legacy_app.json = DefaultJSONProvider(legacy_app)
+    current_app = Flask('current')
+    current_app.json = RowJSONProvider(current_app)
+
+    print(f"{args.rows} rows, JSON backend: {serialization.BACKEND}")
+    legacy = measure('legacy', legacy_encode, legacy_app, rows)
+    current = measure('current', current_encode, current_app, rows)
+    if serialization.loads(legacy) != serialization.loads(current):
+        print('WARNING: the two encodings decode to different documents')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Check that reads routed to replicas never miss a write that was just made.
+
+Run against a server started with DB_REPLICAS pointing at a replica of its
+database. Each round registers a uniquely named trainee and reads it back at
+once, first as its professional (the read-your-writes window) and then as
+admin (the table version check). A read that does not see the trainee fails
+the run. The replica and fallback counters of the worker that answers
+/api/pool_stats are printed at the end. The trainees are deleted afterwards.
+
+    cd backend
+    DB_REPLICAS=127.0.0.1:3307 REPLICA_MAX_LAG=5 gunicorn -w 4 -b 127.0.0.1:6970 app:app
+    python benchmarks/check_read_your_writes.py --url http://127.0.0.1:6970 --professional 2 --rounds 100
+"""
+import argparse
+import json
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+BENCH_ADDRESS = 'Read-your-writes check'
+
+
+def api_request(base_url, method, path, payload=None):
+    """(status, JSON body) of one API call"""
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = urllib.request.Request(base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b'{}')
+
+
+def find_trainees(base_url, params):
+    status, body = api_request(base_url, 'GET', '/api/get_trainees?' + urllib.parse.urlencode(params))
+    assert status == 200, body
+    return [trainee['id'] for trainee in body['trainees'] if trainee['address'] == BENCH_ADDRESS]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:6970')
+    parser.add_argument('--professional', type=int, default=2, help='id of an existing professional')
+    parser.add_argument('--rounds', type=int, default=100)
+    args = parser.parse_args()
+
+    run = int(time.time())
+    created = set()
+    stale = {'professional': 0, 'admin': 0}
+    try:
+        for n in range(args.rounds):
+            name = f"RYW {run} {n}"
+            status, body = api_request(args.url, 'POST', '/api/register_trainee', {
+                'name': name, 'gender': 'Female', 'age': 30, 'department': 'Emergency',
+                'address': BENCH_ADDRESS, 'block': 'Raipur', 'training_date': '2030-01-01',
+                'registered_by': args.professional,
+            })
+            assert status == 200, body
+            for reader, params in (('professional', {'role': 'professional', 'user_id': args.professional}),
+                                   ('admin', {'role': 'admin'})):
+                found = find_trainees(args.url, {**params, 'search': name})
+                if not found:
+                    stale[reader] += 1
+                created.update(found)
+
+        status, body = api_request(args.url, 'GET', '/api/pool_stats')
+        replicas = body.get('replicas', {})
+        print(f"{args.rounds} writes, each read back as its professional and as admin")
+        print(f"stale reads: {stale['professional']} as professional, {stale['admin']} as admin")
+        for replica in replicas.get('replicas', []):
+            print(f"{replica['name']} {replica['host']}:{replica['port']}: {replica['reads']} reads, "
+                  f"lag {replica['lag_seconds']}s, error {replica['error']}")
+        print(f"primary fallbacks (answering worker only): {replicas.get('primary_reads')}")
+        ok = not any(stale.values())
+        print('OK: every write was visible to the next read' if ok else 'FAILED')
+        return 0 if ok else 1
+    finally:
+        created.update(find_trainees(args.url, {'role': 'admin', 'search': f"RYW {run}"}))
+        for trainee_id in created:
+            api_request(args.url, 'DELETE', f"/api/delete_trainee/{trainee_id}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
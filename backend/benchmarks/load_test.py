@@ -0,0 +1,464 @@
+"""Drive every endpoint with a mixed read/write profile and record latency per endpoint.
+
+--concurrency threads act as users of a running server for --duration
+seconds after a --warmup period that is not recorded. Each thread draws
+operations by weight from OPERATIONS: lists, stats, reports, search,
+changes, exports, login and the admin counters, plus creates, edits,
+deletes, bulk changes and enrollments. Writes only touch rows the thread
+created itself, and those rows are deleted at the end. --profile scales the
+write weights. /api/events is left out because it streams for as long as
+the client stays connected; benchmarks/bench_events.py covers it.
+
+The results are written as JSON to --output for every endpoint: requests,
+throughput, error rate, status codes and p50/p95/p99 latency. Run metadata
+such as the git commit, the profile and the data size is included. With
+--baseline the p95 and throughput changes against an earlier file are
+printed. For runs that are comparable across commits, seed the same data
+first and keep the seed, profile and concurrency fixed:
+
+    cd backend
+    python manage.py seed --trainees 1000000 --random-seed 42
+    gunicorn -w 8 -k gevent -b 127.0.0.1:6970 app:app
+    python benchmarks/load_test.py --url http://127.0.0.1:6970 --duration 120 --output runs/$(git rev-parse --short HEAD).json
+    python benchmarks/load_test.py ... --baseline runs/<previous>.json
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+LOAD_ADDRESS = 'Load test'
+BLOCKS = ('Bastar', 'Bilaspur', 'Durg', 'Raigarh', 'Raipur', 'Surguja')
+SEARCH_TERMS = ('Priya', 'Kumar', 'Sharma', 'Rahul', 'Emergency', 'CPR', 'First Aid', 'Raipur', 'Verma', 'Trauma')
+PROFILES = {'read-heavy': 0.3, 'mixed': 1.0, 'write-heavy': 3.0}
+
+
+class Endpoint:
+    """Samples and status counts of one endpoint"""
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+
+
+class Recorder:
+    def __init__(self):
+        self.endpoints = {}
+        self.lock = threading.Lock()
+        self.recording = False
+
+    def add(self, name, latency, status, error):
+        if not self.recording:
+            return
+        with self.lock:
+            endpoint = self.endpoints.setdefault(name, Endpoint())
+            endpoint.latencies.append(latency)
+            endpoint.statuses[status] = endpoint.statuses.get(status, 0) + 1
+            endpoint.errors += error
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Client:
+    """One simulated user: its random stream and the rows it created"""
+
+    def __init__(self, base_url, recorder, shared, index, seed):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.shared = shared
+        self.index = index
+        self.rng = random.Random(seed * 1000 + index)
+        self.professional = self.rng.choice(shared['professionals'])
+        self.trainees = []
+        self.trainings = []
+        self.users = []
+        self.serial = 0
+
+    def call(self, name, method, path, payload=None, params=None):
+        """(status, JSON body or None); every call is recorded under ``name``"""
+        url = self.base_url + path + ('?' + urllib.parse.urlencode(params) if params else '')
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = urllib.request.Request(url, data=data, method=method, headers={'Content-Type': 'application/json'})
+        started = time.perf_counter()
+        status, body = 0, None
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                status = response.status
+                raw = response.read()
+            if response.headers.get_content_type() == 'application/json':
+                body = json.loads(raw)
+        except urllib.error.HTTPError as e:
+            status = e.code
+            raw = e.read()
+            body = json.loads(raw) if raw.startswith(b'{') else None
+        except (urllib.error.URLError, OSError, ValueError):
+            status = 0
+        self.recorder.add(name, time.perf_counter() - started, status, status == 0 or status >= 500)
+        return status, body
+
+    def unique(self, kind):
+        self.serial += 1
+        return f"Load {self.shared['run']} {kind} {self.index}-{self.serial}"
+
+    def as_professional(self, **params):
+        return {'role': 'professional', 'user_id': self.professional, **params}
+
+    def find_id(self, path, key, search):
+        """Id of the row this client just created (the create endpoints do not return it)"""
+        name = f"GET {path}"
+        status, body = self.call(name, 'GET', path, params={'role': 'admin', 'search': search, 'limit': 1})
+        rows = body.get(key) if status == 200 and body else None
+        return rows[0]['id'] if rows else None
+
+    def trainee_payload(self, name):
+        return {'name': name, 'gender': self.rng.choice(('Female', 'Male')), 'age': self.rng.randint(18, 60),
+                'department': 'Emergency', 'address': LOAD_ADDRESS, 'block': self.rng.choice(BLOCKS),
+                'training_date': '2026-03-01', 'registered_by': self.professional, 'cpr_training': True}
+
+    def training_payload(self, title):
+        return {'title': title, 'training_topic': 'CPR', 'address': LOAD_ADDRESS, 'block': self.rng.choice(BLOCKS),
+                'training_date': '2026-04-01', 'training_time': '10:00:00', 'max_trainees': 30,
+                'conducted_by': self.professional}
+
+    # Reads
+
+    def list_trainees(self):
+        self.call('GET /api/get_trainees', 'GET', '/api/get_trainees', params=self.as_professional(limit=50))
+
+    def list_trainees_admin(self):
+        params = {'role': 'admin', 'limit': 50, 'block': self.rng.choice(BLOCKS), 'sort': 'training_date'}
+        status, body = self.call('GET /api/get_trainees', 'GET', '/api/get_trainees', params=params)
+        if status == 200 and body.get('next_cursor'):
+            self.call('GET /api/get_trainees', 'GET', '/api/get_trainees',
+                      params={**params, 'cursor': body['next_cursor']})
+
+    def list_trainings(self):
+        self.call('GET /api/get_trainings', 'GET', '/api/get_trainings', params=self.as_professional(limit=50))
+
+    def list_trainings_admin(self):
+        self.call('GET /api/get_trainings', 'GET', '/api/get_trainings',
+                  params={'role': 'admin', 'limit': 50, 'status': 'Planned'})
+
+    def list_professionals(self):
+        self.call('GET /api/get_professionals', 'GET', '/api/get_professionals', params={'role': 'admin', 'limit': 50})
+
+    def all_data(self):
+        self.call('GET /api/data', 'GET', '/api/data', params={'format': 'ndjson', 'table': 'users'})
+
+    def stats(self):
+        params = {'role': 'admin'} if self.rng.random() < 0.3 else self.as_professional()
+        self.call('GET /api/stats', 'GET', '/api/stats', params=params)
+
+    def report(self):
+        self.call('GET /api/reports', 'GET', '/api/reports',
+                  params={'role': 'admin', 'metric': self.rng.choice(('trainees', 'trainings')), 'bucket': 'month',
+                          'group_by': 'block', 'from': '2025-01-01'})
+
+    def search(self):
+        self.call('GET /api/search', 'GET', '/api/search', params=self.as_professional(q=self.rng.choice(SEARCH_TERMS)))
+
+    def changes(self):
+        status, body = self.call('GET /api/changes', 'GET', '/api/changes', params=self.as_professional())
+        if status == 200 and body.get('next_cursor'):
+            self.call('GET /api/changes', 'GET', '/api/changes', params=self.as_professional(since=body['next_cursor']))
+
+    def enrollments(self):
+        if not self.trainings:
+            return self.create_training()
+        self.call('GET /api/trainings/<id>/enrollments', 'GET',
+                  f"/api/trainings/{self.rng.choice(self.trainings)}/enrollments", params=self.as_professional())
+
+    def login(self):
+        username, password = self.rng.choice(self.shared['logins'])
+        self.call('POST /api/login', 'POST', '/api/login',
+                  {'username': username, 'password': password, 'role': 'professional'})
+
+    def health(self):
+        self.call('GET /api/health', 'GET', '/api/health')
+
+    def counters(self):
+        path = self.rng.choice(('/api/metrics', '/api/pool_stats', '/api/cache_stats', '/api/slow_queries',
+                                '/api/event_stats'))
+        self.call(f"GET {path}", 'GET', path, params={'role': 'admin'})
+
+    # Writes (on this client's own rows only)
+
+    def register_trainee(self):
+        name = self.unique('trainee')
+        status, _ = self.call('POST /api/register_trainee', 'POST', '/api/register_trainee', self.trainee_payload(name))
+        if status == 200:
+            trainee_id = self.find_id('/api/get_trainees', 'trainees', name)
+            if trainee_id:
+                self.trainees.append(trainee_id)
+
+    def bulk_import(self):
+        prefix = self.unique('bulk')
+        rows = [self.trainee_payload(f"{prefix} {n}") for n in range(10)]
+        status, _ = self.call('POST /api/trainees/bulk', 'POST', '/api/trainees/bulk', rows)
+        if status == 200:
+            _, body = self.call('GET /api/get_trainees', 'GET', '/api/get_trainees',
+                                params={'role': 'admin', 'search': prefix, 'limit': 10})
+            self.trainees += [row['id'] for row in (body or {}).get('trainees', [])]
+
+    def edit_trainee(self):
+        if not self.trainees:
+            return self.register_trainee()
+        trainee_id = self.rng.choice(self.trainees)
+        if self.rng.random() < 0.5:
+            self.call('PATCH /api/edit_trainee/<id>', 'PATCH', f"/api/edit_trainee/{trainee_id}",
+                      {'block': self.rng.choice(BLOCKS), 'life_saving_skills': self.rng.random() < 0.5})
+        else:
+            payload = self.trainee_payload(self.unique('trainee'))
+            self.call('PUT /api/edit_trainee/<id>', 'PUT', f"/api/edit_trainee/{trainee_id}", payload)
+
+    def delete_trainee(self):
+        if not self.trainees:
+            return self.register_trainee()
+        trainee_id = self.trainees.pop(self.rng.randrange(len(self.trainees)))
+        self.call('DELETE /api/delete_trainee/<id>', 'DELETE', f"/api/delete_trainee/{trainee_id}")
+
+    def create_training(self):
+        title = self.unique('training')
+        status, _ = self.call('POST /api/create_training', 'POST', '/api/create_training', self.training_payload(title))
+        if status == 200:
+            training_id = self.find_id('/api/get_trainings', 'trainings', title)
+            if training_id:
+                self.trainings.append(training_id)
+
+    def edit_training(self):
+        if not self.trainings:
+            return self.create_training()
+        training_id = self.rng.choice(self.trainings)
+        if self.rng.random() < 0.5:
+            self.call('PATCH /api/edit_training/<id>', 'PATCH', f"/api/edit_training/{training_id}",
+                      {'max_trainees': self.rng.choice((30, 40, 50))})
+        else:
+            payload = {**self.training_payload(self.unique('training')), 'status': 'Planned'}
+            self.call('PUT /api/edit_training/<id>', 'PUT', f"/api/edit_training/{training_id}", payload)
+
+    def delete_training(self):
+        if not self.trainings:
+            return self.create_training()
+        training_id = self.trainings.pop(self.rng.randrange(len(self.trainings)))
+        self.call('DELETE /api/delete_training/<id>', 'DELETE', f"/api/delete_training/{training_id}")
+
+    def enroll(self):
+        if not self.trainings or not self.trainees:
+            return self.register_trainee() if self.trainings else self.create_training()
+        training_id = self.rng.choice(self.trainings)
+        trainee_ids = self.rng.sample(self.trainees, min(len(self.trainees), 3))
+        method = 'DELETE' if self.rng.random() < 0.3 else 'POST'
+        self.call(f"{method} /api/trainings/<id>/enrollments", method, f"/api/trainings/{training_id}/enrollments",
+                  {'trainee_ids': trainee_ids})
+
+    def bulk_status(self):
+        if len(self.trainings) < 2:
+            return self.create_training()
+        ids = self.rng.sample(self.trainings, min(len(self.trainings), 5))
+        self.call('POST /api/trainings/bulk_status', 'POST', '/api/trainings/bulk_status',
+                  {'status': self.rng.choice(('Planned', 'Ongoing')), 'ids': ids}, params={'role': 'admin'})
+
+    def bulk_delete(self):
+        rows, path = (self.trainees, '/api/trainees/bulk_delete') if self.rng.random() < 0.5 \
+            else (self.trainings, '/api/trainings/bulk_delete')
+        if len(rows) < 5:
+            return self.bulk_import()
+        ids = [rows.pop(self.rng.randrange(len(rows))) for _ in range(3)]
+        self.call(f"POST {path}", 'POST', path, {'ids': ids}, params={'role': 'admin'})
+
+    def professional_lifecycle(self):
+        if not self.users:
+            username = f"load_{self.shared['run']}_{self.index}_{self.serial}"
+            self.serial += 1
+            status, _ = self.call('POST /api/register_professional', 'POST', '/api/register_professional', {
+                'name': f"Load Professional {self.index}", 'username': username, 'mobile_number': '9000000000',
+                'gender': 'Female', 'age': 40})
+            if status == 200:
+                _, body = self.call('GET /api/get_professionals', 'GET', '/api/get_professionals',
+                                    params={'role': 'admin', 'search': username, 'limit': 1})
+                self.users += [row['id'] for row in (body or {}).get('professionals', [])]
+            return
+        user_id = self.users[0]
+        roll = self.rng.random()
+        if roll < 0.4:
+            self.call('PATCH /api/edit_professional/<id>', 'PATCH', f"/api/edit_professional/{user_id}",
+                      {'experience_years': self.rng.randint(1, 30)})
+        elif roll < 0.7:
+            self.call('PUT /api/edit_professional/<id>', 'PUT', f"/api/edit_professional/{user_id}", {
+                'name': f"Load Professional {self.index}", 'username': f"load_{self.shared['run']}_{user_id}",
+                'mobile_number': '9000000001', 'gender': 'Female', 'age': 41})
+        else:
+            self.users.pop(0)
+            self.call('DELETE /api/delete_professional/<id>', 'DELETE', f"/api/delete_professional/{user_id}")
+
+    def cleanup(self):
+        for path, ids in (('/api/trainees/bulk_delete', self.trainees), ('/api/trainings/bulk_delete', self.trainings)):
+            for start in range(0, len(ids), 500):
+                self.call(f"POST {path}", 'POST', path, {'ids': ids[start:start + 500]}, params={'role': 'admin'})
+        for user_id in self.users:
+            self.call('DELETE /api/delete_professional/<id>', 'DELETE', f"/api/delete_professional/{user_id}")
+
+
+# (method name, weight in the mixed profile, is a write)
+OPERATIONS = (
+    ('list_trainees', 20, False), ('list_trainees_admin', 6, False), ('list_trainings', 10, False),
+    ('list_trainings_admin', 4, False), ('list_professionals', 3, False), ('all_data', 0.5, False),
+    ('stats', 6, False), ('report', 4, False), ('search', 6, False), ('changes', 4, False),
+    ('enrollments', 2, False), ('login', 3, False), ('health', 2, False), ('counters', 1, False),
+    ('register_trainee', 5, True), ('bulk_import', 1, True), ('edit_trainee', 5, True), ('delete_trainee', 2, True),
+    ('create_training', 2, True), ('edit_training', 2, True), ('delete_training', 1, True), ('enroll', 3, True),
+    ('bulk_status', 0.5, True), ('bulk_delete', 0.5, True), ('professional_lifecycle', 0.5, True),
+)
+
+
+def discover(base_url, run):
+    """Professionals to act as, and their logins (professionals log in with their mobile number)"""
+    request = urllib.request.Request(base_url + '/api/get_professionals?role=admin&limit=500')
+    with urllib.request.urlopen(request, timeout=120) as response:
+        professionals = json.loads(response.read())['professionals']
+    if not professionals:
+        raise SystemExit('No professionals found; seed data first (python manage.py seed)')
+    return {
+        'run': run,
+        'professionals': [row['id'] for row in professionals],
+        'logins': [(row['username'], row['mobile_number']) for row in professionals if row['mobile_number']],
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(recorder, elapsed):
+    endpoints = {}
+    for name, endpoint in sorted(recorder.endpoints.items()):
+        ordered = sorted(endpoint.latencies)
+        count = len(ordered)
+        endpoints[name] = {
+            'requests': count,
+            'throughput_rps': round(count / elapsed, 3),
+            'errors': endpoint.errors,
+            'error_rate': round(endpoint.errors / count, 5),
+            'client_errors': sum(n for status, n in endpoint.statuses.items() if 400 <= status < 500),
+            'statuses': {str(status): n for status, n in sorted(endpoint.statuses.items())},
+            'latency_ms': {
+                'p50': round(percentile(ordered, 0.5) * 1000, 3),
+                'p95': round(percentile(ordered, 0.95) * 1000, 3),
+                'p99': round(percentile(ordered, 0.99) * 1000, 3),
+                'max': round(ordered[-1] * 1000, 3),
+                'mean': round(sum(ordered) / count * 1000, 3),
+            },
+        }
+    requests = sum(endpoint['requests'] for endpoint in endpoints.values())
+    errors = sum(endpoint['errors'] for endpoint in endpoints.values())
+    totals = {'requests': requests, 'throughput_rps': round(requests / elapsed, 3), 'errors': errors,
+              'error_rate': round(errors / requests, 5) if requests else 0}
+    return totals, endpoints
+
+
+def compare(report, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nAgainst {baseline_path} (commit {baseline.get('commit')}):")
+    for name, current in report['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before:
+            continue
+        p95, old_p95 = current['latency_ms']['p95'], before['latency_ms']['p95']
+        change = (p95 - old_p95) / old_p95 * 100 if old_p95 else 0
+        print(f"  {name:<45} p95 {old_p95:>9.1f} -> {p95:>9.1f} ms ({change:+.0f}%)  "
+              f"{before['throughput_rps']:.1f} -> {current['throughput_rps']:.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:6970')
+    parser.add_argument('--concurrency', type=int, default=16, help='simulated users')
+    parser.add_argument('--duration', type=float, default=60, help='recorded seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='unrecorded seconds before that')
+    parser.add_argument('--profile', choices=PROFILES, default='mixed', help='scales the write weights')
+    parser.add_argument('--seed', type=int, default=1, help='operation sequence of every user')
+    parser.add_argument('--skip', default='', help='comma-separated operations to leave out, e.g. all_data')
+    parser.add_argument('--output', default=f"load-test-{datetime.now():%Y%m%d-%H%M%S}.json")
+    parser.add_argument('--baseline', help='earlier --output file to compare with')
+    args = parser.parse_args()
+
+    skip = {name.strip() for name in args.skip.split(',') if name.strip()}
+    unknown = skip - {name for name, _, _ in OPERATIONS}
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(sorted(unknown))}")
+    operations = [(name, weight * (PROFILES[args.profile] if write else 1))
+                  for name, weight, write in OPERATIONS if name not in skip]
+
+    shared = discover(args.url, int(time.time()))
+    recorder = Recorder()
+    clients = [Client(args.url, recorder, shared, index, args.seed) for index in range(args.concurrency)]
+    stop = threading.Event()
+
+    def run(client):
+        names = [name for name, _ in operations]
+        weights = [weight for _, weight in operations]
+        while not stop.is_set():
+            getattr(client, client.rng.choices(names, weights)[0])()
+
+    threads = [threading.Thread(target=run, args=(client,), daemon=True) for client in clients]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.warmup)
+    recorder.recording = True
+    started = time.perf_counter()
+    time.sleep(args.duration)
+    recorder.recording = False
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for thread in threads:
+        thread.join()
+    for client in clients:
+        client.cleanup()
+
+    totals, endpoints = summarize(recorder, elapsed)
+    report = {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'url': args.url,
+        'profile': args.profile,
+        'concurrency': args.concurrency,
+        'duration_seconds': round(elapsed, 3),
+        'seed': args.seed,
+        'skipped': sorted(skip),
+        'professionals': len(shared['professionals']),
+        'totals': totals,
+        'endpoints': endpoints,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{totals['requests']} requests in {elapsed:.1f}s ({totals['throughput_rps']:.1f} req/s), "
+          f"{totals['errors']} errors ({totals['error_rate']:.2%}); written to {args.output}")
+    for name, endpoint in endpoints.items():
+        latency = endpoint['latency_ms']
+        print(f"  {name:<45} {endpoint['requests']:>7} req  p50 {latency['p50']:>8.1f}  p95 {latency['p95']:>8.1f}  "
+              f"p99 {latency['p99']:>8.1f} ms  errors {endpoint['error_rate']:.2%}")
+    if args.baseline:
+        compare(report, args.baseline)
+    return 1 if totals['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Change log behind /api/changes (delta sync).
+
+Write handlers pass (table, row_id, op, owner_id) entries to commit_write(),
+which appends them to change_log just before committing. Appends are
+serialised on the 'change_log' row of table_versions, held until commit, so
+seq order equals commit order: once a reader has seen seq N it has seen every
+change below N, and the last seq it read is a safe cursor.
+"""
+UPSERT = 'upsert'
+DELETE = 'delete'
+CHANGE_TABLES = ('trainees', 'trainings', 'users')
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+INSERT_CHUNK = 1000
+DEFAULT_PRUNE_BATCH = 10000
+
+
+class CursorExpiredError(Exception):
+    """The cursor points before entries that have been pruned; the client must reload"""
+
+
+def record_changes(connection, changes):
+    """Append change entries; call after the data statements, right before commit"""
+    if not changes:
+        return
+    cursor = connection.cursor()
+    try:
+        cursor.execute("UPDATE table_versions SET version = version + 1 WHERE table_name = 'change_log'")
+        for start in range(0, len(changes), INSERT_CHUNK):
+            chunk = changes[start:start + INSERT_CHUNK]
+            placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(chunk))
+            cursor.execute(f"INSERT INTO change_log (table_name, row_id, op, owner_id) VALUES {placeholders}",
+                           [value for change in chunk for value in change])
+    finally:
+        cursor.close()
+
+
+def owned_row_deletes(cursor, owner_id):
+    """Delete entries for the trainees and trainings a professional's removal cascades to.
+
+    The rows are locked so nothing can be added for the owner before the delete.
+    """
+    changes = []
+    for table, owner_column in (('trainees', 'registered_by'), ('trainings', 'conducted_by')):
+        cursor.execute(f"SELECT id FROM {table} WHERE {owner_column} = %s FOR UPDATE", (owner_id,))
+        changes += [(table, row_id, DELETE, owner_id) for (row_id,) in cursor.fetchall()]
+    return changes
+
+
+def parse_cursor(value):
+    """Change cursor from the query string (None when absent)"""
+    if value in (None, ''):
+        return None
+    try:
+        seq = int(value)
+    except ValueError:
+        raise ValueError('Cursor must be a value returned as next_cursor')
+    if seq < 0:
+        raise ValueError('Cursor must be a value returned as next_cursor')
+    return seq
+
+
+def current_cursor(cursor):
+    cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log")
+    return cursor.fetchone()[0]
+
+
+def read_changes(cursor, since, owner_id=None, limit=DEFAULT_LIMIT):
+    """Collapsed changes after ``since``: ({table: {row_id: op}}, next_cursor, has_more).
+
+    ``owner_id`` limits the log to one professional's rows (None for everyone).
+    """
+    cursor.execute("SELECT version FROM table_versions WHERE table_name = 'change_log_pruned'")
+    row = cursor.fetchone()
+    if row and since < row[0]:
+        raise CursorExpiredError(f"Changes before {row[0]} have been pruned")
+
+    where = ['seq > %s']
+    params = [since]
+    if owner_id is not None:
+        where.append('owner_id = %s')
+        params.append(owner_id)
+    cursor.execute(f"SELECT seq, table_name, row_id, op FROM change_log WHERE {' AND '.join(where)} "
+                   f"ORDER BY seq LIMIT %s", params + [limit + 1])
+    entries = cursor.fetchall()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # The latest entry for a row wins: insert + edit = upsert, anything + delete = delete
+    latest = {table: {} for table in CHANGE_TABLES}
+    for _, table, row_id, op in entries:
+        latest.setdefault(table, {})[row_id] = op
+    next_cursor = entries[-1][0] if entries else since
+    return latest, next_cursor, has_more
+
+
+def prune(connection, days, batch=DEFAULT_PRUNE_BATCH, log=None):
+    """Delete entries older than ``days`` in batches; cursors before them then get CursorExpiredError"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT MAX(seq) FROM change_log WHERE changed_at < NOW() - INTERVAL %s DAY", (days,))
+        cutoff = cursor.fetchone()[0]
+        if cutoff is None:
+            return 0
+        # Publish the watermark first so readers never silently skip pruned entries
+        cursor.execute("UPDATE table_versions SET version = GREATEST(version, %s) "
+                       "WHERE table_name = 'change_log_pruned'", (cutoff,))
+        connection.commit()
+        removed = 0
+        while True:
+            cursor.execute("DELETE FROM change_log WHERE seq <= %s LIMIT %s", (cutoff, batch))
+            connection.commit()
+            removed += cursor.rowcount
+            if log:
+                log(f"Removed {removed} change log entries")
+            if cursor.rowcount < batch:
+                return removed
+    finally:
+        cursor.close()
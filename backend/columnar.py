@@ -0,0 +1,71 @@
+"""Columnar, dictionary-encoded layout for large list responses (?layout=columnar).
+
+A list of row objects becomes::
+
+    {"count": 3,
+     "columns": {
+        "id": [1, 2, 3],
+        "block": {"dict": ["Raipur", "Durg"], "codes": [0, 1, 0]},
+        "cpr_training": {"bits": "BQ=="}}}
+
+Low-cardinality string and date columns are dictionary encoded, boolean
+columns are packed into a base64 bitmap (bit i of byte i // 8, least
+significant bit first) with an optional "nulls" bitmap, and everything else
+stays a plain array.
+"""
+import base64
+from datetime import date
+
+LAYOUTS = ('rows', 'columnar')
+
+# Columns stored as MySQL BOOLEAN (TINYINT(1))
+BOOLEAN_COLUMNS = frozenset(('cpr_training', 'first_aid_kit_given', 'life_saving_skills'))
+
+
+def pack_bits(flags):
+    packed = bytearray((len(flags) + 7) // 8)
+    for i, flag in enumerate(flags):
+        if flag:
+            packed[i >> 3] |= 1 << (i & 7)
+    return base64.b64encode(bytes(packed)).decode('ascii')
+
+
+def _encode_booleans(values):
+    column = {'bits': pack_bits(values)}
+    if any(value is None for value in values):
+        column['nulls'] = pack_bits([value is None for value in values])
+    return column
+
+
+def _encode_dictionary(values):
+    """{'dict', 'codes'} when it is smaller than the plain array, else None"""
+    index = {}
+    codes = []
+    for value in values:
+        if value is None:
+            codes.append(None)
+            continue
+        if not isinstance(value, (str, date)):
+            return None
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(index)
+        codes.append(code)
+    if not index or len(index) * 2 > len(values):
+        return None
+    return {'dict': list(index), 'codes': codes}
+
+
+def to_columnar(rows, boolean_columns=BOOLEAN_COLUMNS):
+    """Convert a list of row dicts into the columnar layout"""
+    if not rows:
+        return {'count': 0, 'columns': {}}
+    columns = {}
+    for name in rows[0]:
+        values = [row[name] for row in rows]
+        if name in boolean_columns:
+            columns[name] = _encode_booleans(values)
+            continue
+        encoded = _encode_dictionary(values)
+        columns[name] = encoded if encoded is not None else values
+    return {'count': len(rows), 'columns': columns}
@@ -0,0 +1,410 @@
+"""Per-process database connection pool used behind get_db_connection()"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import mysql.connector
+
+STATEMENT_CACHE_SIZE = int(os.environ.get('DB_STATEMENT_CACHE_SIZE', 32))
+
+# Client errors meaning the connection itself is gone (server gone away, lost
+# connection, can't connect)
+CONNECTION_LOST_ERRNOS = frozenset((2002, 2003, 2006, 2013, 2055))
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection could be checked out within the pool timeout"""
+
+
+def is_connection_lost(error):
+    """Whether ``error`` means the connection can no longer be used"""
+    if isinstance(error, mysql.connector.InterfaceError) and not getattr(error, 'errno', None):
+        return True
+    return getattr(error, 'errno', None) in CONNECTION_LOST_ERRNOS
+
+
+class PreparedCursor:
+    """A prepared cursor kept open in a StatementCache; close() leaves the statement prepared"""
+
+    def __init__(self, connection, cursor, operation):
+        self._connection = connection
+        self._cursor = cursor
+        self.operation = operation
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def execute(self, operation, params=(), *args, **kwargs):
+        # mysql-connector only skips re-preparing when it gets the same string object again
+        return self._cursor.execute(self.operation, params, *args, **kwargs)
+
+    def close(self):
+        if self._connection.unread_result:
+            self._cursor.fetchall()
+
+    def discard(self):
+        try:
+            self._cursor.close()
+        except Exception:
+            pass
+
+
+class StatementCache:
+    """Prepared (server-side) statements of one connection, least recently used evicted first.
+
+    Keyed by the SQL text, so a statement is prepared once per connection and
+    then only executed. The cache lives as long as its connection does.
+    """
+
+    def __init__(self, connection, size=STATEMENT_CACHE_SIZE):
+        self._connection = connection
+        self.size = size
+        self._cursors = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def cursor(self, operation, dictionary=False):
+        key = (operation, dictionary)
+        cursor = self._cursors.get(key)
+        if cursor is not None:
+            self._cursors.move_to_end(key)
+            self.hits += 1
+            return cursor
+        self.misses += 1
+        cursor = PreparedCursor(self._connection, self._connection.cursor(prepared=True, dictionary=dictionary),
+                                operation)
+        self._cursors[key] = cursor
+        if len(self._cursors) > self.size:
+            _, evicted = self._cursors.popitem(last=False)
+            evicted.discard()
+        return cursor
+
+    def __len__(self):
+        return len(self._cursors)
+
+    def close(self):
+        for cursor in self._cursors.values():
+            cursor.discard()
+        self._cursors.clear()
+
+
+class PooledConnection:
+    """Thin proxy around a MySQL connection that returns it to the pool on close()"""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._closed = False
+        self._lost = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def prepared_cursor(self, operation, dictionary=False):
+        """Cursor with ``operation`` prepared on this connection, reused across checkouts.
+
+        Execute it with ``operation`` only. Its close() keeps the statement
+        prepared; the pool frees it with the connection. With
+        DB_STATEMENT_CACHE_SIZE=0 this is an ordinary cursor.
+        """
+        statements = self._pool.statements(self._raw)
+        if statements is None:
+            return self._raw.cursor(dictionary=dictionary)
+        return statements.cursor(operation, dictionary)
+
+    def note_error(self, error):
+        """Remember a failed statement; a lost connection is discarded on close()"""
+        if is_connection_lost(error):
+            self._lost = True
+
+    def close(self):
+        if self._lost:
+            self.invalidate()
+            return
+        if self._closed:
+            return
+        self._closed = True
+        self._pool.release(self._raw)
+
+    def invalidate(self):
+        """Discard the underlying connection instead of returning it to the pool"""
+        if self._closed:
+            return
+        self._closed = True
+        self._pool.discard(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Bounded pool with overflow, checkout timeout and stale-connection validation.
+
+    ``size`` connections are kept idle between requests; up to ``max_overflow``
+    extra connections may be opened under load and are closed again when
+    returned. Connections idle for longer than ``pre_ping_after`` seconds are
+    pinged on checkout, and connections older than ``recycle`` seconds are
+    replaced.
+    """
+
+    def __init__(self, config, size=5, max_overflow=10, timeout=10.0,
+                 recycle=3600, pre_ping_after=30.0, connect_kwargs=None, connect=None,
+                 statement_cache_size=STATEMENT_CACHE_SIZE):
+        self.config = dict(config)
+        self.connect_kwargs = dict(connect_kwargs or {})
+        self.connect = connect or mysql.connector.connect
+        self.statement_cache_size = statement_cache_size
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping_after = pre_ping_after
+        self.pid = os.getpid()
+
+        self._idle = deque()  # (connection, created_at, returned_at)
+        self._created_at = {}  # id(connection) -> created_at
+        self._statements = {}  # id(connection) -> StatementCache
+        self._open = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.exhausted = 0
+        self.connects = 0
+        self.connect_time = 0.0
+        self.invalidated = 0
+        self.statement_hits = 0
+        self.statement_misses = 0
+
+    def _connect(self):
+        started = time.perf_counter()
+        connection = self.connect(**self.config, **self.connect_kwargs)
+        elapsed = time.perf_counter() - started
+        with self._cond:
+            self.connects += 1
+            self.connect_time += elapsed
+            self._created_at[id(connection)] = time.monotonic()
+        return connection
+
+    def _is_usable(self, connection, created_at, returned_at):
+        now = time.monotonic()
+        if self.recycle and now - created_at > self.recycle:
+            return False
+        if now - returned_at > self.pre_ping_after:
+            try:
+                connection.ping(reconnect=False)
+            except mysql.connector.Error:
+                return False
+        return True
+
+    def statements(self, connection):
+        """StatementCache of a checked-out connection (None when caching is off)"""
+        if self.statement_cache_size <= 0:
+            return None
+        statements = self._statements.get(id(connection))
+        if statements is None:
+            statements = StatementCache(connection, self.statement_cache_size)
+            self._statements[id(connection)] = statements
+        return statements
+
+    def _drop_statements(self, connection):
+        # Prepared statements die with their connection; keep the counters
+        statements = self._statements.pop(id(connection), None)
+        if statements is not None:
+            self.statement_hits += statements.hits
+            self.statement_misses += statements.misses
+
+    def _close_quietly(self, connection):
+        statements = self._statements.get(id(connection))
+        if statements is not None:
+            statements.close()
+        with self._cond:
+            self._drop_statements(connection)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """Check out a connection, waiting up to ``timeout`` seconds if the pool is exhausted"""
+        started = time.perf_counter()
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    connection, created_at, returned_at = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._open < self.size + self.max_overflow:
+                    connection = None
+                    self._open += 1
+                    self._in_use += 1
+                    break
+                if not waited:
+                    waited = True
+                    self.waits += 1
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if self._idle or self._open < self.size + self.max_overflow:
+                        continue
+                    self.exhausted += 1
+                    self.wait_time += time.perf_counter() - started
+                    raise PoolExhaustedError(
+                        f"Connection pool exhausted ({self.size + self.max_overflow} connections in use)")
+            if waited:
+                self.wait_time += time.perf_counter() - started
+            self.checkouts += 1
+
+        try:
+            if connection is not None and not self._is_usable(connection, created_at, returned_at):
+                self._forget(connection)
+                self._close_quietly(connection)
+                with self._cond:
+                    self.invalidated += 1
+                connection = None
+            if connection is None:
+                connection = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, connection)
+
+    def warm(self, count=None):
+        """Open connections until ``count`` (default and at most ``size``) sit idle; returns how many were checked"""
+        count = self.size if count is None else min(count, self.size)
+        held = []
+        try:
+            while len(held) < count:
+                held.append(self.acquire())
+        finally:
+            for connection in held:
+                connection.close()
+        return len(held)
+
+    def _forget(self, connection):
+        with self._cond:
+            self._created_at.pop(id(connection), None)
+
+    def release(self, connection):
+        """Return a connection to the pool, closing it if the pool is over its idle size"""
+        # No ping here: stale connections are caught by the pre-ping on checkout,
+        # and callers invalidate() connections that failed mid-request
+        try:
+            if connection.unread_result:
+                connection.consume_results()
+            if connection.in_transaction:
+                connection.rollback()
+            keep = True
+        except mysql.connector.Error:
+            keep = False
+        with self._cond:
+            self._in_use -= 1
+            if keep and len(self._idle) < self.size:
+                created_at = self._created_at.get(id(connection), time.monotonic())
+                self._idle.append((connection, created_at, time.monotonic()))
+                self._cond.notify()
+                return
+            self._open -= 1
+            self._created_at.pop(id(connection), None)
+            self._cond.notify()
+        self._close_quietly(connection)
+
+    def discard(self, connection):
+        """Close a checked-out connection without returning it to the pool"""
+        with self._cond:
+            self._in_use -= 1
+            self._open -= 1
+            self._created_at.pop(id(connection), None)
+            self.invalidated += 1
+            self._cond.notify()
+        self._close_quietly(connection)
+
+    def dispose(self):
+        """Close every idle connection"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            for connection, _, _ in idle:
+                self._created_at.pop(id(connection), None)
+        for connection, _, _ in idle:
+            self._close_quietly(connection)
+
+    def stats(self):
+        with self._cond:
+            live = list(self._statements.values())
+            return {
+                'pid': self.pid,
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'timeout': self.timeout,
+                'open': self._open,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_time_seconds': round(self.wait_time, 6),
+                'exhausted': self.exhausted,
+                'connects': self.connects,
+                'connect_time_seconds': round(self.connect_time, 6),
+                'invalidated': self.invalidated,
+                'statement_cache_size': self.statement_cache_size,
+                'prepared_statements': sum(len(statements) for statements in live),
+                'statement_hits': self.statement_hits + sum(statements.hits for statements in live),
+                'statement_misses': self.statement_misses + sum(statements.misses for statements in live),
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_settings_from_env():
+    """Read pool sizing from the environment"""
+    return {
+        'size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10)),
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'recycle': int(os.environ.get('DB_POOL_RECYCLE', 3600)),
+        'pre_ping_after': float(os.environ.get('DB_POOL_PRE_PING_AFTER', 30)),
+        'statement_cache_size': STATEMENT_CACHE_SIZE,
+    }
+
+
+def get_pool(name, config, **settings):
+    """Return the pool called ``name`` for the current process.
+
+    Pools are keyed by PID so that a pool created before gunicorn forks its
+    workers is never shared with them: each worker lazily builds its own and
+    simply drops the inherited one (its sockets belong to the parent).
+    """
+    pid = os.getpid()
+    pool = _pools.get(name)
+    if pool is not None and pool.pid == pid:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None or pool.pid != pid:
+            merged = pool_settings_from_env()
+            merged.update(settings)
+            pool = ConnectionPool(config, **merged)
+            _pools[name] = pool
+        return pool
+
+
+def all_pool_stats():
+    """Stats for every pool owned by the current process"""
+    pid = os.getpid()
+    return {name: pool.stats() for name, pool in _pools.items() if pool.pid == pid}
@@ -0,0 +1,200 @@
+"""Per-request database timing.
+
+get_db_connection() wraps every pooled connection in TimedConnection, whose
+cursors measure how long execute* and fetch* calls take and how many rows
+they return. The numbers accumulate on the DbTimings of the current request
+(set by the metrics middleware through a context variable, so it works with
+threads and gevent greenlets alike); outside a request nothing is recorded.
+
+Statement listeners (see slow_queries.py) additionally receive every
+finished statement with its total execute + fetch time and row count. A
+statement finishes when its rows are exhausted, the cursor runs the next one
+or the cursor is closed.
+"""
+import time
+from contextvars import ContextVar
+
+_current = ContextVar('db_timings', default=None)
+_statement_listeners = []
+
+
+class DbTimings:
+    """Database time spent by one request, in seconds"""
+
+    def __init__(self, request_id=None):
+        self.request_id = request_id
+        self.connect = 0.0
+        self.execute = 0.0
+        self.fetch = 0.0
+        self.queries = 0
+        self.rows = 0
+
+    def as_dict(self):
+        return {
+            'connect_ms': round(self.connect * 1000, 3),
+            'execute_ms': round(self.execute * 1000, 3),
+            'fetch_ms': round(self.fetch * 1000, 3),
+            'queries': self.queries,
+            'rows': self.rows,
+        }
+
+
+def start_request(request_id=None):
+    """Begin collecting timings for the current request; returns (timings, token)"""
+    timings = DbTimings(request_id)
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def record_connect(seconds):
+    timings = _current.get()
+    if timings is not None:
+        timings.connect += seconds
+
+
+def add_statement_listener(listener):
+    """Call ``listener(statement, connection)`` for every finished statement"""
+    if listener not in _statement_listeners:
+        _statement_listeners.append(listener)
+
+
+def remove_statement_listener(listener):
+    if listener in _statement_listeners:
+        _statement_listeners.remove(listener)
+
+
+class Statement:
+    """One executed statement as seen by the listeners"""
+
+    __slots__ = ('operation', 'params', 'many', 'duration', 'rows', 'fetched')
+
+    def __init__(self, operation, params, many=False):
+        self.operation = operation
+        self.params = params
+        self.many = many
+        self.duration = 0.0
+        self.rows = 0
+        self.fetched = False
+
+
+def _row_count(result):
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    return 1
+
+
+class TimedCursor:
+    """Cursor proxy that times execute* and fetch* calls"""
+
+    def __init__(self, cursor, connection=None):
+        self._cursor = cursor
+        self._connection = connection
+        self._statement = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def _timed(self, phase, method, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except Exception as e:
+            # Lets the pool discard a connection that was lost mid-request
+            note_error = getattr(self._connection, 'note_error', None)
+            if note_error is not None:
+                note_error(e)
+            raise
+        elapsed = time.perf_counter() - started
+        rows = 0 if phase == 'execute' else _row_count(result)
+        timings = _current.get()
+        if timings is not None:
+            if phase == 'execute':
+                timings.execute += elapsed
+                timings.queries += 1
+            else:
+                timings.fetch += elapsed
+                timings.rows += rows
+        if self._statement is not None:
+            self._statement.duration += elapsed
+            if phase == 'fetch':
+                self._statement.rows += rows
+                self._statement.fetched = True
+        return result
+
+    def _begin(self, operation, params, many=False):
+        self._finish()
+        if _statement_listeners:
+            self._statement = Statement(operation, params, many)
+
+    def _finish(self):
+        statement, self._statement = self._statement, None
+        if statement is None:
+            return
+        if not statement.fetched:
+            statement.rows = max(self._cursor.rowcount or 0, 0)
+        for listener in list(_statement_listeners):
+            listener(statement, self._connection)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._begin(operation, params)
+        return self._timed('execute', self._cursor.execute, operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        self._begin(operation, seq_params, many=True)
+        return self._timed('execute', self._cursor.executemany, operation, seq_params, *args, **kwargs)
+
+    def fetchone(self):
+        row = self._timed('fetch', self._cursor.fetchone)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        return self._timed('fetch', self._cursor.fetchmany, *args, **kwargs)
+
+    def fetchall(self):
+        rows = self._timed('fetch', self._cursor.fetchall)
+        self._finish()
+        return rows
+
+    def close(self):
+        # Close first so unread rows are discarded before a listener reuses the connection
+        try:
+            return self._cursor.close()
+        finally:
+            self._finish()
+
+
+class TimedConnection:
+    """Connection proxy whose cursors are TimedCursors; everything else passes through"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._connection.cursor(*args, **kwargs), self._connection)
+
+    def prepared_cursor(self, operation, dictionary=False):
+        # close() on the timed cursor finishes the statement but keeps it prepared
+        return TimedCursor(self._connection.prepared_cursor(operation, dictionary), self._connection)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,197 @@
+"""Trainee enrollment in trainings with capacity enforced by the database.
+
+Seats are reserved with one conditional UPDATE on the training row
+(``current_trainees + n <= max_trainees``), so concurrent requests can never
+overbook: InnoDB serialises them on the row lock and re-evaluates the
+condition against the latest committed count. Only when a batch does not fit
+is the remaining capacity read (under the lock already held) and the seats
+that are left reserved with a second conditional UPDATE. The training row is
+locked from the reservation to the commit, with no client round trips in
+between, which keeps the queue on a popular session short.
+
+Every path locks trainees (shared) -> the training row -> enrollment rows,
+the same order as delete_trainee, so these writes cannot deadlock each other.
+"""
+OPEN_STATUSES = ('Planned', 'Ongoing')
+MAX_BATCH = 500
+
+ENROLLED = 'enrolled'
+ALREADY_ENROLLED = 'already_enrolled'
+FULL = 'full'
+UNENROLLED = 'unenrolled'
+NOT_ENROLLED = 'not_enrolled'
+TRAINEE_NOT_FOUND = 'trainee_not_found'
+
+
+class EnrollmentError(Exception):
+    """The training cannot be enrolled in; ``status`` is the HTTP status to answer with"""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_trainee_ids(data):
+    """Distinct trainee ids of a {"trainee_ids": [...]} payload in request order; raises ValueError"""
+    ids = data.get('trainee_ids') if isinstance(data, dict) else None
+    if not isinstance(ids, list) or not ids:
+        raise ValueError('trainee_ids must be a non-empty list')
+    if len(ids) > MAX_BATCH:
+        raise ValueError(f"At most {MAX_BATCH} trainee_ids per request")
+    parsed = []
+    for value in ids:
+        if isinstance(value, bool) or not str(value).isdigit() or int(value) == 0:
+            raise ValueError('trainee_ids must be positive integers')
+        parsed.append(int(value))
+    return list(dict.fromkeys(parsed))
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def _lock_trainees(cursor, trainee_ids):
+    """Share-lock the trainees that exist so they cannot be deleted under us"""
+    cursor.execute(f"SELECT id FROM trainees WHERE id IN ({_placeholders(trainee_ids)}) LOCK IN SHARE MODE",
+                   trainee_ids)
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _lock_training(cursor, training_id):
+    """(status, free seats, conducted_by) of the locked training row"""
+    cursor.execute("SELECT status, max_trainees - current_trainees, conducted_by FROM trainings "
+                   "WHERE id = %s FOR UPDATE", (training_id,))
+    row = cursor.fetchone()
+    if row is None:
+        raise EnrollmentError('Training not found', 404)
+    return row
+
+
+def capacity_error(cursor, training_id, max_trainees):
+    """Why ``max_trainees`` cannot be set on a training locked by the caller; None when it can.
+
+    Lowering the capacity below the trainees already enrolled would leave the
+    training overbooked, which the conditional reservations never allow.
+    """
+    try:
+        capacity = 0 if max_trainees is None else int(max_trainees)
+    except (TypeError, ValueError):
+        return None  # Not a number; left to the database to reject
+    cursor.execute("SELECT current_trainees FROM trainings WHERE id = %s", (training_id,))
+    row = cursor.fetchone()
+    enrolled = (row[0] or 0) if row else 0
+    if capacity < enrolled:
+        return f"max_trainees cannot be lower than the {enrolled} trainees already enrolled"
+    return None
+
+
+def _reserve(cursor, training_id, seats):
+    """Conditionally add ``seats`` enrollments; True when they fitted"""
+    cursor.execute(f"UPDATE trainings SET current_trainees = current_trainees + %s "
+                   f"WHERE id = %s AND status IN ({_placeholders(OPEN_STATUSES)}) "
+                   f"AND current_trainees + %s <= max_trainees",
+                   (seats, training_id, *OPEN_STATUSES, seats))
+    return cursor.rowcount == 1
+
+
+def enroll(cursor, training_id, trainee_ids):
+    """Enroll trainees (call inside a transaction).
+
+    Returns (per-trainee results, conducted_by, number of new enrollments);
+    trainees beyond the remaining capacity are reported as full.
+    """
+    existing = _lock_trainees(cursor, trainee_ids)
+    cursor.execute(f"SELECT trainee_id FROM training_enrollments WHERE training_id = %s "
+                   f"AND trainee_id IN ({_placeholders(trainee_ids)})", (training_id, *trainee_ids))
+    enrolled = {row[0] for row in cursor.fetchall()}
+    candidates = [trainee_id for trainee_id in trainee_ids
+                  if trainee_id in existing and trainee_id not in enrolled]
+
+    granted = []
+    if candidates and _reserve(cursor, training_id, len(candidates)):
+        granted = candidates
+        _, _, conducted_by = _lock_training(cursor, training_id)
+    else:
+        # The failed UPDATE still locked the row, so the free seats read here are exact
+        status, seats, conducted_by = _lock_training(cursor, training_id)
+        if candidates and status not in OPEN_STATUSES:
+            raise EnrollmentError(f"Training is {status}; enrollment is closed", 409)
+        seats = seats or 0  # max_trainees may be NULL, which admits nobody
+        if candidates and seats > 0 and _reserve(cursor, training_id, seats):
+            granted = candidates[:seats]
+
+    if granted:
+        cursor.execute(f"INSERT IGNORE INTO training_enrollments (training_id, trainee_id) VALUES "
+                       f"{', '.join(['(%s, %s)'] * len(granted))}",
+                       [value for trainee_id in granted for value in (training_id, trainee_id)])
+        duplicates = len(granted) - cursor.rowcount
+        if duplicates:
+            # A concurrent request enrolled some of them first; give their seats back
+            cursor.execute("UPDATE trainings SET current_trainees = current_trainees - %s WHERE id = %s",
+                           (duplicates, training_id))
+        new = len(granted) - duplicates
+    else:
+        new = 0
+
+    granted_ids = set(granted)
+    results = []
+    for trainee_id in trainee_ids:
+        if trainee_id not in existing:
+            status = TRAINEE_NOT_FOUND
+        elif trainee_id in enrolled:
+            status = ALREADY_ENROLLED
+        elif trainee_id in granted_ids:
+            status = ENROLLED
+        else:
+            status = FULL
+        results.append({'trainee_id': trainee_id, 'status': status})
+    return results, conducted_by, new
+
+
+def unenroll(cursor, training_id, trainee_ids):
+    """Remove enrollments (call inside a transaction); returns (per-trainee results, conducted_by, removed)"""
+    _lock_trainees(cursor, trainee_ids)
+    _, _, conducted_by = _lock_training(cursor, training_id)
+    placeholders = _placeholders(trainee_ids)
+    cursor.execute(f"SELECT trainee_id FROM training_enrollments WHERE training_id = %s "
+                   f"AND trainee_id IN ({placeholders}) FOR UPDATE", (training_id, *trainee_ids))
+    enrolled = {row[0] for row in cursor.fetchall()}
+    if enrolled:
+        cursor.execute(f"DELETE FROM training_enrollments WHERE training_id = %s "
+                       f"AND trainee_id IN ({_placeholders(enrolled)})", (training_id, *enrolled))
+        cursor.execute("UPDATE trainings SET current_trainees = GREATEST(current_trainees - %s, 0) "
+                       "WHERE id = %s", (len(enrolled), training_id))
+    results = [{'trainee_id': trainee_id, 'status': UNENROLLED if trainee_id in enrolled else NOT_ENROLLED}
+               for trainee_id in trainee_ids]
+    return results, conducted_by, len(enrolled)
+
+
+def _release(cursor, trainee_filter, params):
+    cursor.execute(f"SELECT training_id, COUNT(*) FROM training_enrollments "
+                   f"WHERE trainee_id IN ({trainee_filter}) GROUP BY training_id", params)
+    released = sorted(cursor.fetchall())
+    if not released:
+        return []
+    for training_id, count in released:
+        cursor.execute("UPDATE trainings SET current_trainees = GREATEST(current_trainees - %s, 0) "
+                       "WHERE id = %s", (count, training_id))
+    training_ids = [training_id for training_id, _ in released]
+    cursor.execute(f"SELECT id, conducted_by FROM trainings WHERE id IN ({_placeholders(training_ids)})",
+                   training_ids)
+    return sorted(cursor.fetchall())
+
+
+def trainees_removed(cursor, trainee_ids):
+    """Release the seats of trainees about to be deleted (their enrollments cascade).
+
+    Call with the trainee rows already locked, before the DELETE. Returns
+    [(training_id, conducted_by)] of the trainings whose count changed.
+    """
+    if not trainee_ids:
+        return []
+    return _release(cursor, _placeholders(trainee_ids), tuple(trainee_ids))
+
+
+def owner_trainees_removed(cursor, owner_id):
+    """trainees_removed() for every trainee a professional registered (their removal cascades)"""
+    return _release(cursor, "SELECT id FROM trainees WHERE registered_by = %s", (owner_id,))
@@ -0,0 +1,281 @@
+"""Server-Sent Events fan-out for /api/events.
+
+change_log (see changes.py) doubles as the event bus: one poller thread per
+worker process reads new entries and pushes them to the in-process
+subscribers whose scope matches, so subscribers on any worker see writes
+made by every worker, and the change seq is the SSE event id used for
+Last-Event-ID replay. A subscriber is only a small bounded deque plus a
+wakeup flag; run the stream under an async worker (gunicorn -k gevent) so an
+idle connection costs a greenlet instead of a worker thread.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from serialization import dumps
+
+EVENTS_POLL_INTERVAL = float(os.environ.get('EVENTS_POLL_INTERVAL', 1.0))
+EVENTS_HEARTBEAT = float(os.environ.get('EVENTS_HEARTBEAT', 15))
+EVENTS_BUFFER = int(os.environ.get('EVENTS_BUFFER', 256))
+EVENTS_REPLAY_MAX = int(os.environ.get('EVENTS_REPLAY_MAX', 1000))
+EVENTS_MAX_SUBSCRIBERS = int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', 10000))
+RETRY_MS = 3000
+FETCH_BATCH = 1000
+
+
+class TooManySubscribersError(Exception):
+    """This worker already serves EVENTS_MAX_SUBSCRIBERS streams"""
+
+
+def change_event(table, row_id, op):
+    """Compact payload for one change_log entry"""
+    return {'table': table, 'id': row_id, 'op': op}
+
+
+class Subscriber:
+    """One open stream: a bounded buffer of (seq, event) pairs and a wakeup flag"""
+
+    def __init__(self, owner_id, buffer_size=EVENTS_BUFFER):
+        self.owner_id = owner_id
+        self.buffer = deque()
+        self.buffer_size = buffer_size
+        self.overflowed = False
+        self.closed = False
+        self.ready = threading.Event()
+
+    def matches(self, owner_id):
+        return self.owner_id is None or self.owner_id == owner_id
+
+    def push(self, seq, event):
+        if len(self.buffer) >= self.buffer_size:
+            # A client this far behind has to resync anyway; drop what it has not read
+            self.buffer.clear()
+            self.overflowed = True
+        else:
+            self.buffer.append((seq, event))
+        self.ready.set()
+
+    def close(self):
+        """End the stream once it has sent what is buffered"""
+        self.closed = True
+        self.ready.set()
+
+    def drain(self, timeout):
+        """(buffered events, whether the buffer overflowed), waiting up to ``timeout`` seconds"""
+        self.ready.wait(timeout)
+        self.ready.clear()
+        events = []
+        while self.buffer:
+            events.append(self.buffer.popleft())
+        overflowed, self.overflowed = self.overflowed, False
+        return events, overflowed
+
+
+class EventBroker:
+    """Tails change_log and fans new entries out to this process's subscribers"""
+
+    def __init__(self, connect, poll_interval=EVENTS_POLL_INTERVAL, buffer_size=EVENTS_BUFFER,
+                 max_subscribers=EVENTS_MAX_SUBSCRIBERS, logger=None):
+        self.connect = connect
+        self.poll_interval = poll_interval
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.logger = logger
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.nudged = threading.Event()
+        self.last_seq = None
+        self.position_checked_at = float('-inf')
+        self.pid = None
+        self.polls = 0
+        self.published = 0
+        self.overflows = 0
+        self.errors = 0
+
+    def subscribe(self, owner_id):
+        """Register a stream; ``owner_id`` None receives every event"""
+        self._ensure_started()
+        subscriber = Subscriber(owner_id, self.buffer_size)
+        with self.lock:
+            if len(self.subscribers) >= self.max_subscribers:
+                raise TooManySubscribersError(f"{self.max_subscribers} event streams already open")
+            if self.last_seq is None and time.monotonic() - self.position_checked_at > self.poll_interval:
+                # Position the poller before the subscriber is added so a
+                # Last-Event-ID replay and the live feed leave no gap (throttled
+                # so a database outage does not cost every new stream a connect)
+                self.position_checked_at = time.monotonic()
+                try:
+                    self.last_seq = self._current_seq()
+                except Exception as e:
+                    self._log(f"Could not read the change log position: {e}")
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def close(self):
+        """End every open stream, e.g. when the worker is stopping; clients reconnect elsewhere"""
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.close()
+
+    def notify(self):
+        """Poll now instead of at the next interval (called after local commits)"""
+        if self.pid == os.getpid():
+            self.nudged.set()
+
+    def _ensure_started(self):
+        # Like the connection pools, the poller belongs to one process; a
+        # forked worker starts its own.
+        pid = os.getpid()
+        if self.pid == pid:
+            return
+        with self.lock:
+            if self.pid == pid:
+                return
+            self.subscribers = set()
+            self.last_seq = None
+            thread = threading.Thread(target=self._run, name='event-broker', daemon=True)
+            thread.start()
+            self.pid = pid
+
+    def _current_seq(self):
+        connection = self.connect()
+        if connection is None:
+            return None
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log")
+            seq = cursor.fetchone()[0]
+            cursor.close()
+            return seq
+        finally:
+            connection.close()
+
+    def _run(self):
+        while True:
+            self.nudged.wait(self.poll_interval)
+            self.nudged.clear()
+            with self.lock:
+                if not self.subscribers:
+                    # Nobody listening: forget the position, subscribe() takes a fresh one
+                    self.last_seq = None
+                    continue
+            try:
+                self.poll()
+            except Exception as e:
+                self.errors += 1
+                self._log(f"Event poll failed: {e}")
+                time.sleep(self.poll_interval)
+
+    def poll(self):
+        """Fetch entries after the last seen seq and publish them"""
+        self.polls += 1
+        if self.last_seq is None:
+            self.last_seq = self._current_seq()
+            return
+        connection = self.connect()
+        if connection is None:
+            return
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT seq, table_name, row_id, op, owner_id FROM change_log "
+                           "WHERE seq > %s ORDER BY seq LIMIT %s", (self.last_seq, FETCH_BATCH))
+            entries = cursor.fetchall()
+            cursor.close()
+        finally:
+            connection.close()
+        if entries:
+            self.publish(entries)
+            self.last_seq = entries[-1][0]
+            if len(entries) == FETCH_BATCH:
+                self.nudged.set()
+
+    def publish(self, entries):
+        """Push (seq, table, row_id, op, owner_id) entries to the matching subscribers"""
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for seq, table, row_id, op, owner_id in entries:
+            event = change_event(table, row_id, op)
+            for subscriber in subscribers:
+                if subscriber.matches(owner_id):
+                    if len(subscriber.buffer) >= subscriber.buffer_size:
+                        self.overflows += 1
+                    subscriber.push(seq, event)
+            self.published += 1
+
+    def info(self):
+        return {
+            'subscribers': len(self.subscribers),
+            'last_seq': self.last_seq,
+            'polls': self.polls,
+            'published': self.published,
+            'overflows': self.overflows,
+            'errors': self.errors,
+            'poll_interval': self.poll_interval,
+            'buffer_size': self.buffer_size,
+        }
+
+    def _log(self, message):
+        if self.logger is not None:
+            self.logger.warning(message)
+
+
+def replay(cursor, since, owner_id=None, limit=EVENTS_REPLAY_MAX):
+    """(seq, event) pairs logged after ``since``; None when the client has to resync instead"""
+    cursor.execute("SELECT version FROM table_versions WHERE table_name = 'change_log_pruned'")
+    row = cursor.fetchone()
+    if row and since < row[0]:
+        return None
+    where = ['seq > %s']
+    params = [since]
+    if owner_id is not None:
+        where.append('owner_id = %s')
+        params.append(owner_id)
+    cursor.execute(f"SELECT seq, table_name, row_id, op FROM change_log WHERE {' AND '.join(where)} "
+                   f"ORDER BY seq LIMIT %s", params + [limit + 1])
+    entries = cursor.fetchall()
+    if len(entries) > limit:
+        return None
+    return [(seq, change_event(table, row_id, op)) for seq, table, row_id, op in entries]
+
+
+def format_event(seq, event):
+    return f"id: {seq}\nevent: change\ndata: {dumps(event).decode('utf-8')}\n\n"
+
+
+RESYNC_EVENT = 'event: resync\ndata: {}\n\n'
+HEARTBEAT = ': ping\n\n'
+
+
+def event_stream(broker, subscriber, backlog=(), resync=False, heartbeat=EVENTS_HEARTBEAT):
+    """SSE body: optional resync notice, replayed backlog, then live events with heartbeats.
+
+    ``resync`` tells the client its Last-Event-ID could not be replayed and it
+    should refresh through /api/changes or the list endpoints.
+    """
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        if resync:
+            yield RESYNC_EVENT
+        last = 0
+        if backlog:
+            last = backlog[-1][0]
+            yield ''.join(format_event(seq, event) for seq, event in backlog)
+        while not subscriber.closed:
+            events, overflowed = subscriber.drain(heartbeat)
+            if overflowed:
+                yield RESYNC_EVENT
+            # The live feed may repeat entries the backlog already carried
+            fresh = [(seq, event) for seq, event in events if seq > last]
+            if fresh:
+                last = fresh[-1][0]
+                yield ''.join(format_event(seq, event) for seq, event in fresh)
+            elif not overflowed and not subscriber.closed:
+                yield HEARTBEAT
+    finally:
+        broker.unsubscribe(subscriber)
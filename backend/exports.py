@@ -0,0 +1,95 @@
+"""Streaming table exports (NDJSON / CSV) that never hold a whole table in memory"""
+import csv
+import io
+
+from serialization import dumps, format_value
+
+EXPORT_QUERIES = {
+    'users': "SELECT * FROM users ORDER BY created_at DESC",
+    'trainees': "SELECT * FROM trainees ORDER BY created_at DESC",
+    'trainings': "SELECT * FROM trainings ORDER BY created_at DESC",
+}
+EXPORT_FORMATS = ('ndjson', 'csv')
+DEFAULT_BATCH_SIZE = 1000
+
+
+def export_value(value):
+    """Format a column value for CSV the same way the JSON endpoints do"""
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return format_value(value)
+
+
+def iter_batches(connection, table, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield (column_names, rows) batches from an unbuffered server-side cursor"""
+    cursor = connection.cursor(buffered=False)
+    try:
+        cursor.execute(EXPORT_QUERIES[table])
+        columns = cursor.column_names
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield columns, rows
+    finally:
+        cursor.close()
+
+
+def iter_id_batches(connection, table, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield (column_names, rows) batches in id order with one short keyset query per batch.
+
+    Unlike iter_batches() no statement stays open between batches, so a slow
+    consumer (a background job pausing between chunks) holds no cursor or
+    read view on the server in the meantime.
+    """
+    cursor = connection.cursor()
+    try:
+        last_id = 0
+        while True:
+            cursor.execute(f"SELECT * FROM {table} WHERE id > %s ORDER BY id LIMIT %s", (last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            columns = cursor.column_names
+            yield columns, rows
+            last_id = rows[-1][columns.index('id')]
+    finally:
+        cursor.close()
+
+
+def ndjson_chunks(connection, tables, batch_size=DEFAULT_BATCH_SIZE, batches=iter_batches):
+    """One JSON object per line; rows are wrapped as {"table", "row"} when exporting several tables"""
+    wrap = len(tables) > 1
+    for table in tables:
+        for columns, rows in batches(connection, table, batch_size):
+            lines = []
+            for row in rows:
+                record = dict(zip(columns, row))
+                if wrap:
+                    record = {'table': table, 'row': record}
+                lines.append(dumps(record))
+            yield b'\n'.join(lines) + b'\n'
+
+
+def csv_chunks(connection, table, batch_size=DEFAULT_BATCH_SIZE, batches=iter_batches):
+    """Header row followed by one CSV line per row"""
+    header_written = False
+    for columns, rows in batches(connection, table, batch_size):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows([export_value(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+    if not header_written:
+        # Empty table: still emit the header so the file is well-formed
+        cursor = connection.cursor()
+        try:
+            cursor.execute(EXPORT_QUERIES[table] + ' LIMIT 0')
+            cursor.fetchall()
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(cursor.column_names)
+            yield buffer.getvalue()
+        finally:
+            cursor.close()
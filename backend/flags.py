@@ -0,0 +1,14 @@
+"""Boolean values as they arrive from JSON, CSV uploads and query strings.
+
+Writes, list filters, stats and reports all parse skill flags through here,
+so a value such as 'y' or 'on' counts the same everywhere.
+"""
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'on')
+FALSE_VALUES = ('0', 'false', 'no', 'n', 'off')
+
+
+def parse_flag(value):
+    """Skill flags arrive as JSON booleans or as CSV text such as 'yes' / '1'"""
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_VALUES
+    return bool(value)
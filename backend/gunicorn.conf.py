@@ -0,0 +1,18 @@
+"""gunicorn settings, read from the working directory (start-production.bat runs gunicorn in backend/)"""
+import signal
+
+
+def post_worker_init(worker):
+    """End the worker's /api/events streams as soon as it is told to stop.
+
+    A stream never finishes by itself, so a graceful stop (SIGTERM) would wait
+    out graceful_timeout and then cut them; closed streams let the clients
+    reconnect to another worker with Last-Event-ID straight away.
+    """
+    from app import event_broker
+
+    def handle_exit(sig, frame):
+        event_broker.close()
+        worker.handle_exit(sig, frame)
+
+    signal.signal(signal.SIGTERM, handle_exit)
@@ -0,0 +1,153 @@
+"""Cached database health behind the liveness and readiness probes.
+
+Orchestrators probe every worker every few seconds; answering each probe
+with a database round trip would cost a checkout and a ping per probe per
+worker. Instead one thread per worker process checks out a pooled
+connection every HEALTH_CHECK_INTERVAL seconds, pings it and caches the
+outcome, and the probe endpoints only read that cache.
+
+A worker is ready once it has been warmed up (see create_app() in app.py)
+and its latest check, no older than HEALTH_MAX_AGE seconds, succeeded.
+HEALTH_FAILURE_THRESHOLD failed checks in a row are needed to turn it not
+ready, so a single slow ping does not pull it out of the load balancer.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+HEALTH_CHECK_INTERVAL = float(os.environ.get('HEALTH_CHECK_INTERVAL', 5))
+HEALTH_MAX_AGE = float(os.environ.get('HEALTH_MAX_AGE', 3 * HEALTH_CHECK_INTERVAL))
+HEALTH_FAILURE_THRESHOLD = int(os.environ.get('HEALTH_FAILURE_THRESHOLD', 2))
+
+
+class HealthMonitor:
+    """Pings the database in the background and keeps the latest outcome"""
+
+    def __init__(self, connect, interval=HEALTH_CHECK_INTERVAL, max_age=HEALTH_MAX_AGE,
+                 failure_threshold=HEALTH_FAILURE_THRESHOLD, logger=None):
+        self.connect = connect
+        self.interval = interval
+        self.max_age = max_age
+        self.failure_threshold = failure_threshold
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.pid = None
+        self.warmed = False
+        self._reset()
+
+    def _reset(self):
+        self.started_at = time.monotonic()
+        self.last_ok = None
+        self.latency = None
+        self.error = None
+        self.checked_at = None
+        self.checked_monotonic = None
+        self.last_success = None
+        self.consecutive_failures = 0
+        self.checks = 0
+        self.failures = 0
+
+    def start(self):
+        """Start this process's checker thread (a forked worker starts its own)"""
+        pid = os.getpid()
+        if self.pid == pid:
+            return
+        with self.lock:
+            if self.pid == pid:
+                return
+            if self.pid is not None:
+                # Inherited from the parent process, whose checks say nothing about this one
+                self._reset()
+            thread = threading.Thread(target=self._run, name='health-monitor', daemon=True)
+            thread.start()
+            self.pid = pid
+
+    def mark_warmed(self):
+        self.start()
+        self.warmed = True
+
+    def _run(self):
+        while True:
+            if self.checked_monotonic is not None:
+                # The first wait is shorter when the warm-up has just checked
+                time.sleep(max(0.0, self.interval - (time.monotonic() - self.checked_monotonic)))
+            self.check()
+
+    def check(self):
+        """Ping through a pooled connection and record the outcome; True when it succeeded"""
+        started = time.perf_counter()
+        error = None
+        try:
+            connection = self.connect()
+            try:
+                connection.ping(reconnect=False)
+            except Exception:
+                # A connection that failed its ping is not returned to the pool
+                connection.invalidate()
+                raise
+            connection.close()
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        latency = time.perf_counter() - started
+
+        with self.lock:
+            was_ok = self.last_ok
+            self.checks += 1
+            self.latency = latency
+            self.checked_at = datetime.now()
+            self.checked_monotonic = time.monotonic()
+            self.last_ok = error is None
+            self.error = error
+            if error is None:
+                self.consecutive_failures = 0
+                self.last_success = self.checked_monotonic
+            else:
+                self.consecutive_failures += 1
+                self.failures += 1
+        if self.logger and was_ok is not None and was_ok != (error is None):
+            if error is None:
+                self.logger.warning('Database health check recovered')
+            else:
+                self.logger.error(f"Database health check failed: {error}")
+        return error is None
+
+    def database_ok(self):
+        """Whether the cached status counts as healthy (fresh enough and not failing repeatedly)"""
+        if self.last_success is None:
+            return False
+        if self.consecutive_failures >= self.failure_threshold:
+            return False
+        return time.monotonic() - self.checked_monotonic <= self.max_age
+
+    def readiness(self):
+        """(ready, reason) for the readiness probe"""
+        self.start()
+        if not self.warmed:
+            return False, 'Warming up'
+        if self.checked_monotonic is None:
+            return False, 'Database not checked yet'
+        if not self.database_ok():
+            if time.monotonic() - self.checked_monotonic > self.max_age:
+                return False, 'Database status is stale'
+            return False, f"Database check failed: {self.error}"
+        return True, 'Server and database are running'
+
+    def info(self):
+        """Cached database status for the probe responses"""
+        with self.lock:
+            age = None if self.checked_monotonic is None else time.monotonic() - self.checked_monotonic
+            return {
+                'ok': self.database_ok(),
+                'latency_ms': None if self.latency is None else round(self.latency * 1000, 3),
+                'checked_at': self.checked_at.isoformat(timespec='seconds') if self.checked_at else None,
+                'age_seconds': None if age is None else round(age, 3),
+                'error': self.error,
+                'consecutive_failures': self.consecutive_failures,
+                'checks': self.checks,
+                'failures': self.failures,
+                'interval_seconds': self.interval,
+            }
+
+    def uptime(self):
+        return time.monotonic() - self.started_at
@@ -0,0 +1,471 @@
+"""Background jobs for full exports and report builds (/api/jobs).
+
+A request only inserts a row into the jobs table. The work runs in a pool of
+worker processes started with ``python manage.py worker``, so a full export
+never ties up a web worker or runs into the request timeout. Workers claim
+queued jobs with a conditional UPDATE (two workers can never both claim
+one), read in chunks of JOB_CHUNK_ROWS with short keyset queries, and sleep
+JOB_CHUNK_PAUSE seconds between chunks so the database keeps serving
+interactive traffic. After every chunk a worker records progress, refreshes
+its heartbeat and checks whether the job was cancelled. The result is
+written gzip-compressed (CSV or NDJSON) to JOB_DIR and renamed into place
+when complete.
+
+JOB_WORKERS processes bound how many jobs run at once; JOB_MAX_PENDING bounds
+how many each user may have queued or running. A job whose worker stops
+heartbeating for JOB_STALE_SECONDS is queued again, up to JOB_MAX_ATTEMPTS
+runs.
+"""
+import csv
+import gzip
+import io
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from datetime import date, datetime, timedelta
+
+from exports import EXPORT_QUERIES, EXPORT_FORMATS, export_value, iter_id_batches, csv_chunks, ndjson_chunks
+from reports import REPORTS, GRAIN_FOR_BUCKET, ReportParamError, bucket_start, build_report_query
+from serialization import dumps
+
+JOB_DIR = os.environ.get('JOB_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'job_artifacts'))
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING', 3))
+JOB_CHUNK_ROWS = int(os.environ.get('JOB_CHUNK_ROWS', 5000))
+JOB_CHUNK_PAUSE = float(os.environ.get('JOB_CHUNK_PAUSE', 0.05))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))
+JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', 300))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+JOB_GZIP_LEVEL = int(os.environ.get('JOB_GZIP_LEVEL', 6))
+CLAIM_CANDIDATES = 10
+DEFAULT_LIST_LIMIT = 50
+
+EXPORT = 'export'
+REPORT = 'report'
+KINDS = (EXPORT, REPORT)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+ACTIVE = (QUEUED, RUNNING)
+
+JOB_COLUMNS = ('id', 'kind', 'params', 'owner_id', 'status', 'cancel_requested', 'attempts', 'rows_written',
+               'progress', 'artifact', 'artifact_bytes', 'error', 'worker', 'created_at', 'started_at',
+               'heartbeat_at', 'finished_at')
+
+
+class JobParamError(ValueError):
+    """Raised for malformed job submissions"""
+
+
+class TooManyJobsError(Exception):
+    """The user already has JOB_MAX_PENDING jobs queued or running"""
+
+
+class JobCancelled(Exception):
+    """The job was cancelled while it ran"""
+
+
+class JobInterrupted(Exception):
+    """The worker is shutting down; the job goes back to the queue"""
+
+
+def _now():
+    return datetime.now().replace(microsecond=0)
+
+
+def parse_params(kind, data, owner_id):
+    """Validated parameters of a job submission; raises JobParamError.
+
+    Export jobs dump whole tables and are for admins (``owner_id`` None).
+    Report jobs take the /api/reports parameters and are scoped like it.
+    """
+    if kind not in KINDS:
+        raise JobParamError(f"kind must be one of: {', '.join(KINDS)}")
+    if not isinstance(data, dict):
+        raise JobParamError('params must be an object')
+    export_format = data.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        raise JobParamError(f"Format must be one of: {', '.join(EXPORT_FORMATS)}")
+
+    if kind == EXPORT:
+        if owner_id is not None:
+            raise JobParamError('Export jobs require admin access')
+        table = data.get('table')
+        if table and table not in EXPORT_QUERIES:
+            raise JobParamError(f"Table must be one of: {', '.join(EXPORT_QUERIES)}")
+        if export_format == 'csv' and not table:
+            raise JobParamError('CSV export needs a table parameter')
+        return {'format': export_format, 'table': table}
+
+    args = {name: str(value) for name, value in data.items() if name != 'format' and value not in (None, '')}
+    try:
+        build_report_query(args, owner_id=owner_id)
+    except ReportParamError as e:
+        raise JobParamError(str(e))
+    return {'format': export_format, **args}
+
+
+def submit(connection, kind, params, owner_id):
+    """Queue a job; returns its id.
+
+    The pending check and the insert share a transaction that locks the
+    submitting user's row, so parallel submissions cannot exceed the limit.
+    """
+    cursor = connection.cursor()
+    try:
+        connection.start_transaction()
+        if owner_id is None:
+            cursor.execute(f"SELECT COUNT(*) FROM jobs WHERE owner_id IS NULL "
+                           f"AND status IN ({', '.join(['%s'] * len(ACTIVE))})", ACTIVE)
+        else:
+            cursor.execute("SELECT id FROM users WHERE id = %s FOR UPDATE", (owner_id,))
+            cursor.fetchall()
+            cursor.execute(f"SELECT COUNT(*) FROM jobs WHERE owner_id = %s "
+                           f"AND status IN ({', '.join(['%s'] * len(ACTIVE))})", (owner_id, *ACTIVE))
+        if cursor.fetchone()[0] >= JOB_MAX_PENDING:
+            connection.rollback()
+            raise TooManyJobsError(f"At most {JOB_MAX_PENDING} jobs can be queued or running at once")
+        cursor.execute("INSERT INTO jobs (kind, params, owner_id, status, created_at) VALUES (%s, %s, %s, %s, %s)",
+                       (kind, json.dumps(params), owner_id, QUEUED, _now()))
+        job_id = cursor.lastrowid
+        connection.commit()
+        return job_id
+    except Exception:
+        if connection.in_transaction:
+            connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _job(row):
+    job = dict(zip(JOB_COLUMNS, row))
+    job['params'] = json.loads(job['params'])
+    return job
+
+
+def get_job(connection, job_id):
+    """The job as a dict, or None"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = %s", (job_id,))
+        row = cursor.fetchone()
+        return _job(row) if row else None
+    finally:
+        cursor.close()
+
+
+def list_jobs(connection, owner_id=None, limit=DEFAULT_LIST_LIMIT):
+    """Newest jobs first; ``owner_id`` None lists everyone's"""
+    cursor = connection.cursor()
+    try:
+        if owner_id is None:
+            cursor.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs ORDER BY id DESC LIMIT %s", (limit,))
+        else:
+            cursor.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE owner_id = %s "
+                           f"ORDER BY id DESC LIMIT %s", (owner_id, limit))
+        return [_job(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def describe(job):
+    """Public view of a job for the API"""
+    described = {column: job[column] for column in ('id', 'kind', 'params', 'status', 'rows_written', 'error',
+                                                    'created_at', 'started_at', 'finished_at')}
+    described['progress'] = round(float(job['progress'] or 0), 4)
+    described['cancel_requested'] = bool(job['cancel_requested'])
+    if job['status'] == DONE:
+        described['artifact_bytes'] = job['artifact_bytes']
+    return described
+
+
+def cancel(connection, job_id):
+    """Cancel a queued job at once, or ask the worker running it to stop; returns the job"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("UPDATE jobs SET status = %s, cancel_requested = TRUE, finished_at = %s "
+                       "WHERE id = %s AND status = %s", (CANCELLED, _now(), job_id, QUEUED))
+        if cursor.rowcount == 0:
+            cursor.execute("UPDATE jobs SET cancel_requested = TRUE WHERE id = %s AND status = %s",
+                           (job_id, RUNNING))
+    finally:
+        cursor.close()
+    return get_job(connection, job_id)
+
+
+def artifact_name(job):
+    params = job['params']
+    if job['kind'] == EXPORT:
+        subject = params.get('table') or 'all'
+    else:
+        subject = f"{params.get('metric', 'trainees')}-report"
+    return f"suraksha-{subject}-job{job['id']}.{params['format']}.gz"
+
+
+def artifact_path(job):
+    return os.path.join(JOB_DIR, artifact_name(job))
+
+
+def claim(connection, worker):
+    """Mark the oldest queued job as running on ``worker`` and return it (None when there is none)"""
+    cursor = connection.cursor()
+    try:
+        now = _now()
+        # Jobs of a worker that died go back to the queue, or fail after JOB_MAX_ATTEMPTS runs
+        stale = now - timedelta(seconds=JOB_STALE_SECONDS)
+        cursor.execute("UPDATE jobs SET status = %s, error = 'Worker stopped responding', finished_at = %s "
+                       "WHERE status = %s AND heartbeat_at < %s AND attempts >= %s",
+                       (FAILED, now, RUNNING, stale, JOB_MAX_ATTEMPTS))
+        cursor.execute("UPDATE jobs SET status = %s, worker = NULL WHERE status = %s AND heartbeat_at < %s",
+                       (QUEUED, RUNNING, stale))
+        cursor.execute("SELECT id FROM jobs WHERE status = %s ORDER BY id LIMIT %s", (QUEUED, CLAIM_CANDIDATES))
+        for (job_id,) in cursor.fetchall():
+            cursor.execute("UPDATE jobs SET status = %s, worker = %s, attempts = attempts + 1, rows_written = 0, "
+                           "progress = 0, started_at = %s, heartbeat_at = %s WHERE id = %s AND status = %s",
+                           (RUNNING, worker, now, now, job_id, QUEUED))
+            if cursor.rowcount == 1:
+                return get_job(connection, job_id)
+        return None
+    finally:
+        cursor.close()
+
+
+def _finish(connection, job_id, status, **fields):
+    fields.update(status=status, finished_at=_now())
+    if status == QUEUED:
+        fields.update(worker=None, finished_at=None)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"UPDATE jobs SET {', '.join(f'{column} = %s' for column in fields)} WHERE id = %s",
+                       (*fields.values(), job_id))
+    finally:
+        cursor.close()
+
+
+class Progress:
+    """Per-chunk bookkeeping of a running job: progress, heartbeat, cancellation and pacing"""
+
+    def __init__(self, connection, job, stop=None, pause=JOB_CHUNK_PAUSE):
+        self.connection = connection
+        self.job_id = job['id']
+        self.stop = stop
+        self.pause = pause
+        self.rows = 0
+        self.total = 0
+
+    def checkpoint(self, rows=0, done=None):
+        """Record ``rows`` more rows (and ``done`` as the fraction finished, when known)"""
+        self.rows += rows
+        if done is None:
+            done = self.rows / self.total if self.total else 0
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("UPDATE jobs SET rows_written = %s, progress = %s, heartbeat_at = %s WHERE id = %s",
+                           (self.rows, min(done, 1.0), _now(), self.job_id))
+            cursor.execute("SELECT cancel_requested FROM jobs WHERE id = %s", (self.job_id,))
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        if row is None or row[0]:
+            raise JobCancelled()
+        if self.stop is not None and self.stop.is_set():
+            raise JobInterrupted()
+        if self.pause:
+            time.sleep(self.pause)
+
+    def batches(self, connection, table, batch_size):
+        """exports.iter_id_batches() with a checkpoint after every batch"""
+        for columns, rows in iter_id_batches(connection, table, batch_size):
+            yield columns, rows
+            self.checkpoint(len(rows))
+
+
+def _export_chunks(connection, job, progress):
+    params = job['params']
+    tables = [params['table']] if params.get('table') else list(EXPORT_QUERIES)
+    cursor = connection.cursor()
+    try:
+        for table in tables:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            progress.total += cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    if params['format'] == 'csv':
+        return csv_chunks(connection, params['table'], JOB_CHUNK_ROWS, batches=progress.batches)
+    return ndjson_chunks(connection, tables, JOB_CHUNK_ROWS, batches=progress.batches)
+
+
+def report_ranges(connection, args):
+    """(from, to) date ranges of one year each covering the report, split on bucket boundaries"""
+    spec = REPORTS[args.get('metric', 'trainees')]
+    bucket = args.get('bucket', 'month')
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT MIN(period_start), MAX(period_start) FROM {spec.table} WHERE grain = %s",
+                       (GRAIN_FOR_BUCKET[bucket],))
+        first, last = cursor.fetchone()
+    finally:
+        cursor.close()
+    if first is None:
+        return []
+    first, last = date.fromisoformat(str(first)[:10]), date.fromisoformat(str(last)[:10])
+    if args.get('from'):
+        first = max(first, date.fromisoformat(args['from']))
+    if args.get('to'):
+        last = min(last, date.fromisoformat(args['to']))
+    ranges = []
+    for year in range(first.year, last.year + 1):
+        start = max(first, bucket_start(bucket, date(year, 1, 1)))
+        end = min(last, bucket_start(bucket, date(year + 1, 1, 1)) - timedelta(days=1))
+        if start <= end:
+            ranges.append((start, end))
+    return ranges
+
+
+def _report_chunks(connection, job, progress):
+    """One report query per year, so no single statement aggregates the whole history"""
+    params = job['params']
+    args = {name: value for name, value in params.items() if name != 'format'}
+    ranges = report_ranges(connection, args)
+    header_written = False
+    for index, (start, end) in enumerate(ranges):
+        query, query_params, *_ = build_report_query({**args, 'from': start.isoformat(), 'to': end.isoformat()},
+                                                     owner_id=job['owner_id'],
+                                                     dialect=getattr(connection, 'dialect', 'mysql'))
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query, query_params)
+            columns = cursor.column_names
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        if params['format'] == 'csv':
+            lines = [] if header_written else [columns]
+            header_written = True
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows(lines + [[export_value(value) for value in row] for row in rows])
+            yield buffer.getvalue()
+        elif rows:
+            yield b'\n'.join(dumps(dict(zip(columns, row))) for row in rows) + b'\n'
+        progress.checkpoint(len(rows), done=(index + 1) / len(ranges))
+
+
+def run(connection, job, stop=None):
+    """Run a claimed job to completion, cancellation or failure and record the outcome"""
+    os.makedirs(JOB_DIR, exist_ok=True)
+    path = artifact_path(job)
+    partial = f"{path}.part"
+    progress = Progress(connection, job, stop)
+    try:
+        chunks = _export_chunks(connection, job, progress) if job['kind'] == EXPORT else \
+            _report_chunks(connection, job, progress)
+        with gzip.open(partial, 'wb', compresslevel=JOB_GZIP_LEVEL) as out:
+            for chunk in chunks:
+                out.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        os.replace(partial, path)
+    except JobCancelled:
+        _remove(partial)
+        _finish(connection, job['id'], CANCELLED)
+        return CANCELLED
+    except JobInterrupted:
+        _remove(partial)
+        _finish(connection, job['id'], QUEUED, attempts=max(job['attempts'] - 1, 0))
+        return QUEUED
+    except Exception as e:
+        _remove(partial)
+        _finish(connection, job['id'], FAILED, error=str(e))
+        return FAILED
+    _finish(connection, job['id'], DONE, progress=1.0, rows_written=progress.rows,
+            artifact=os.path.basename(path), artifact_bytes=os.path.getsize(path))
+    return DONE
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def work(connect, name, stop, poll_interval=JOB_POLL_INTERVAL, log=print):
+    """Claim and run jobs until ``stop`` is set (the loop of one worker process)"""
+    connection = None
+    while not stop.is_set():
+        try:
+            if connection is None:
+                connection = connect()
+            job = claim(connection, name)
+            if job is None:
+                stop.wait(poll_interval)
+                continue
+            log(f"{name}: job {job['id']} ({job['kind']}) started")
+            log(f"{name}: job {job['id']} {run(connection, job, stop)}")
+        except Exception as e:
+            log(f"{name}: {e}")
+            if connection is not None:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+                connection = None
+            stop.wait(poll_interval)
+    if connection is not None:
+        connection.close()
+
+
+def _work_process(connect, name, stop, poll_interval):
+    # The supervisor handles Ctrl-C and sets ``stop``; a job stops at its next chunk
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    work(connect, name, stop, poll_interval)
+
+
+def run_workers(connect, processes=JOB_WORKERS, poll_interval=JOB_POLL_INTERVAL, log=print):
+    """Supervise ``processes`` worker processes, restarting any that exit, until SIGINT/SIGTERM"""
+    stop = multiprocessing.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    workers = {}
+    try:
+        while not stop.is_set():
+            for slot in range(processes):
+                process = workers.get(slot)
+                if process is None or not process.is_alive():
+                    if process is not None:
+                        log(f"Worker {slot} exited with {process.exitcode}; restarting")
+                    process = multiprocessing.Process(target=_work_process, name=f"job-worker-{slot}",
+                                                      args=(connect, f"{prefix}/{slot}", stop, poll_interval))
+                    process.start()
+                    workers[slot] = process
+            stop.wait(1)
+    except KeyboardInterrupt:
+        stop.set()
+    log('Stopping workers after their current chunk ...')
+    for process in workers.values():
+        process.join()
+
+
+def prune(connection, days, log=None):
+    """Delete finished jobs older than ``days`` together with their artifacts"""
+    cursor = connection.cursor()
+    try:
+        cutoff = _now() - timedelta(days=days)
+        cursor.execute(f"SELECT id, artifact FROM jobs WHERE status NOT IN ({', '.join(['%s'] * len(ACTIVE))}) "
+                       f"AND created_at < %s", (*ACTIVE, cutoff))
+        finished = cursor.fetchall()
+        for job_id, artifact in finished:
+            if artifact:
+                _remove(os.path.join(JOB_DIR, artifact))
+            cursor.execute("DELETE FROM jobs WHERE id = %s", (job_id,))
+        if log:
+            log(f"Removed {len(finished)} jobs")
+        return len(finished)
+    finally:
+        cursor.close()
@@ -0,0 +1,221 @@
+"""Filtering, sorting and keyset pagination shared by the list endpoints"""
+import base64
+import json
+from datetime import timedelta
+
+from flags import TRUE_VALUES, FALSE_VALUES
+from serialization import format_value
+
+MAX_PAGE_SIZE = 500
+DEFAULT_PAGE_SIZE = 50
+
+# Passed as owner_id when the caller may see every owner's rows (admin)
+ALL_OWNERS = object()
+
+
+class ListParamError(ValueError):
+    """Raised for malformed filter, sort or cursor parameters"""
+
+
+class ListSpec:
+    """Describes how one list endpoint selects, filters and sorts its rows.
+
+    ``select_sql`` and ``from_sql`` are the column list and FROM clause of the
+    page query; ``base_where`` holds conditions that always apply and
+    ``owner_column`` is the column non-admin callers are scoped by.
+    ``sort_keys`` maps a public sort name to the ordered list of
+    ``(sql_expression, row_key)`` pairs it sorts by; the id column is always
+    appended as the final tie-breaker so the keyset is unique.
+    ``filters`` maps a query parameter to ``(kind, sql_expression)`` where kind
+    is one of ``eq``, ``bool``, ``date_from``, ``date_to`` or ``search`` (for
+    ``search`` the expression is a list of columns matched with LIKE).
+    """
+
+    def __init__(self, select_sql, from_sql, id_column, sort_keys, default_sort, filters,
+                 base_where=(), owner_column=None, default_desc=True):
+        self.select_sql = select_sql
+        self.from_sql = from_sql
+        self.base_where = list(base_where)
+        self.owner_column = owner_column
+        self.id_column = id_column
+        self.sort_keys = sort_keys
+        self.default_sort = default_sort
+        self.default_desc = default_desc
+        self.filters = filters
+
+
+class ListRequest:
+    """Parsed list parameters for one request"""
+
+    def __init__(self, sort, desc, limit, after, include_total, paginate):
+        self.sort = sort
+        self.desc = desc
+        self.limit = limit
+        self.after = after
+        self.include_total = include_total
+        self.paginate = paginate
+
+
+def _parse_bool(name, value):
+    value = value.strip().lower()
+    if value in TRUE_VALUES:
+        return 1
+    if value in FALSE_VALUES:
+        return 0
+    raise ListParamError(f"Invalid boolean for '{name}': {value}")
+
+
+def _cursor_value(value):
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, timedelta):
+        # TIME as zero-padded HH:MM:SS: str() gives '9:00:00', which sorts after
+        # '14:00:00' wherever the column is compared as text (SQLite backend)
+        seconds = int(value.total_seconds())
+        return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    return format_value(value)
+
+
+def encode_cursor(sort, desc, values):
+    payload = json.dumps({'s': sort, 'd': desc, 'v': [_cursor_value(v) for v in values]},
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return payload['s'], bool(payload['d']), list(payload['v'])
+    except (ValueError, KeyError, TypeError):
+        raise ListParamError('Invalid cursor')
+
+
+def parse_list_args(args, spec):
+    """Read sort/order/limit/cursor/include_total from the query string.
+
+    Pagination only kicks in when ``limit`` or ``cursor`` is given, so existing
+    callers that expect the whole list keep working.
+    """
+    sort = args.get('sort', spec.default_sort)
+    if sort not in spec.sort_keys:
+        raise ListParamError(f"Invalid sort key '{sort}'. Allowed: {', '.join(spec.sort_keys)}")
+
+    order = args.get('order')
+    if order is None:
+        desc = spec.default_desc
+    elif order.lower() in ('asc', 'desc'):
+        desc = order.lower() == 'desc'
+    else:
+        raise ListParamError("Order must be 'asc' or 'desc'")
+
+    paginate = 'limit' in args or 'cursor' in args
+    limit = None
+    if paginate:
+        try:
+            limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise ListParamError('Limit must be an integer')
+        if limit < 1:
+            raise ListParamError('Limit must be at least 1')
+        limit = min(limit, MAX_PAGE_SIZE)
+
+    after = None
+    if args.get('cursor'):
+        cursor_sort, cursor_desc, after = decode_cursor(args['cursor'])
+        if cursor_sort != sort or cursor_desc != desc:
+            raise ListParamError('Cursor does not match the requested sort order')
+        if len(after) != len(spec.sort_keys[sort]) + 1:
+            raise ListParamError('Invalid cursor')
+
+    include_total = args.get('include_total', '').lower() in TRUE_VALUES
+    return ListRequest(sort, desc, limit, after, include_total, paginate)
+
+
+def build_filters(args, spec, owner_id=ALL_OWNERS):
+    """Translate filter query parameters into WHERE clauses and parameters.
+
+    Unless ``owner_id`` is ALL_OWNERS the rows are scoped to ``spec.owner_column``.
+    """
+    clauses = list(spec.base_where)
+    params = []
+    if owner_id is not ALL_OWNERS:
+        clauses.append(f"{spec.owner_column} = %s")
+        params.append(owner_id)
+    for name, (kind, column) in spec.filters.items():
+        value = args.get(name)
+        if value is None or value == '':
+            continue
+        if kind == 'eq':
+            clauses.append(f"{column} = %s")
+            params.append(value)
+        elif kind == 'bool':
+            clauses.append(f"{column} = %s")
+            params.append(_parse_bool(name, value))
+        elif kind == 'date_from':
+            clauses.append(f"{column} >= %s")
+            params.append(value)
+        elif kind == 'date_to':
+            clauses.append(f"{column} <= %s")
+            params.append(value)
+        elif kind == 'search':
+            clauses.append('(' + ' OR '.join(f"{col} LIKE %s" for col in column) + ')')
+            params.extend([f"%{value}%"] * len(column))
+    return clauses, params
+
+
+def _keyset_clause(columns, values, desc):
+    """Expand (a, b, id) < (x, y, z) into an index-friendly OR chain"""
+    op = '<' if desc else '>'
+    parts = []
+    params = []
+    for i, column in enumerate(columns):
+        equal = [f"{c} = %s" for c in columns[:i]]
+        parts.append('(' + ' AND '.join(equal + [f"{column} {op} %s"]) + ')')
+        params.extend(values[:i] + [values[i]])
+    return '(' + ' OR '.join(parts) + ')', params
+
+
+def build_list_query(spec, where, params, list_request):
+    """Assemble the page query (and optional count query) for a list endpoint.
+
+    Returns ``(sql, params, count_sql, count_params)``; ``count_sql`` is None
+    unless the caller asked for ``include_total``.
+    """
+    where = list(where)
+    params = list(params)
+
+    count_sql = None
+    count_params = None
+    if list_request.include_total:
+        count_where = f" WHERE {' AND '.join(where)}" if where else ''
+        count_sql = f"SELECT COUNT(*) AS total FROM {spec.from_sql}{count_where}"
+        count_params = list(params)
+
+    columns = [expr for expr, _ in spec.sort_keys[list_request.sort]] + [spec.id_column]
+    if list_request.after is not None:
+        clause, keyset_params = _keyset_clause(columns, list_request.after, list_request.desc)
+        where.append(clause)
+        params.extend(keyset_params)
+
+    sql = f"SELECT {spec.select_sql} FROM {spec.from_sql}"
+    if where:
+        sql += f" WHERE {' AND '.join(where)}"
+    direction = 'DESC' if list_request.desc else 'ASC'
+    sql += ' ORDER BY ' + ', '.join(f"{c} {direction}" for c in columns)
+    if list_request.limit is not None:
+        # Fetch one extra row to learn whether another page exists
+        sql += ' LIMIT %s'
+        params.append(list_request.limit + 1)
+    return sql, params, count_sql, count_params
+
+
+def page_rows(rows, spec, list_request):
+    """Trim the look-ahead row and compute the next cursor"""
+    if list_request.limit is None or len(rows) <= list_request.limit:
+        return rows, None
+    rows = rows[:list_request.limit]
+    last = rows[-1]
+    id_key = spec.id_column.split('.')[-1]
+    values = [last[key] for _, key in spec.sort_keys[list_request.sort]] + [last[id_key]]
+    return rows, encode_cursor(list_request.sort, list_request.desc, values)
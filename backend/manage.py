@@ -0,0 +1,228 @@
+"""Command line maintenance tasks for the Suraksha backend.
+
+    python manage.py upgrade [--target VERSION]
+    python manage.py status
+    python manage.py check-plans [--seed N] [--keep-seed]
+    python manage.py rebuild-stats
+    python manage.py backfill-reports [--chunk-size N]
+    python manage.py prune-changes [--days N]
+    python manage.py prune-sync-keys
+    python manage.py worker [--processes N]
+    python manage.py prune-jobs [--days N]
+    python manage.py replicas
+    python manage.py seed [--professionals N] [--trainees N] [--trainings N] [--method insert|load-data] [--clear]
+"""
+import argparse
+import sys
+
+import mysql.connector
+
+from app import DB_CONFIG, DB_CONNECT, db_router, TRAINEE_LIST_SPEC, TRAINING_LIST_SPEC, PROFESSIONAL_LIST_SPEC
+import changes
+import jobs
+import migrations
+import query_plans
+import reports
+import rollups
+import seeder
+import sync
+
+
+def connect():
+    return DB_CONNECT(**DB_CONFIG, autocommit=True)
+
+
+def cmd_upgrade(args):
+    connection = connect()
+    try:
+        applied = migrations.upgrade(connection, target=args.target)
+        print(f"Applied {len(applied)} migration(s)" if applied else 'Database is up to date')
+    finally:
+        connection.close()
+    return 0
+
+
+def cmd_status(args):
+    connection = connect()
+    try:
+        for migration, applied in migrations.status(connection):
+            print(f"{'applied' if applied else 'pending':<8} {migration.version:04d}_{migration.name}")
+    finally:
+        connection.close()
+    return 0
+
+
+def cmd_check_plans(args):
+    connection = connect()
+    cursor = connection.cursor(dictionary=True)
+    try:
+        if args.seed:
+            print(f"Seeding {args.seed} trainees and {max(1, args.seed // 10)} trainings ...")
+            query_plans.seed(cursor, args.seed)
+        trainees = query_plans.table_size(cursor, 'trainees')
+        if trainees < 10000:
+            print(f"WARNING: only {trainees} trainees; plans on small tables are not representative "
+                  f"(use --seed)")
+        failures = query_plans.check(cursor, {
+            'get_trainees': TRAINEE_LIST_SPEC,
+            'get_trainings': TRAINING_LIST_SPEC,
+            'get_professionals': PROFESSIONAL_LIST_SPEC,
+        })
+        print(f"{failures} quer{'y' if failures == 1 else 'ies'} with full scans or filesorts")
+        return 1 if failures else 0
+    finally:
+        if args.seed and not args.keep_seed:
+            query_plans.remove_seed(cursor)
+        elif args.seed:
+            print('Seeded rows bypass the stat rollups and report summaries; run "manage.py rebuild-stats" '
+                  'and "manage.py backfill-reports" to include them')
+        cursor.close()
+        connection.close()
+
+
+def cmd_rebuild_stats(args):
+    connection = connect()
+    try:
+        rollups.rebuild(connection)
+        print('Rebuilt stat_rollups from trainees, trainings and users')
+    finally:
+        connection.close()
+    return 0
+
+
+def cmd_backfill_reports(args):
+    connection = connect()
+    try:
+        reports.backfill(connection, chunk_size=args.chunk_size, log=print)
+    finally:
+        connection.close()
+    return 0
+
+
+def cmd_prune_changes(args):
+    connection = connect()
+    try:
+        removed = changes.prune(connection, args.days, log=print)
+        print(f"Pruned {removed} change log entries older than {args.days} days")
+    finally:
+        connection.close()
+    return 0
+
+
+def cmd_prune_sync_keys(args):
+    connection = connect()
+    try:
+        removed = sync.prune(connection, log=print)
+        print(f"Pruned {removed} expired sync keys")
+    finally:
+        connection.close()
+    return 0
+
+
+def cmd_worker(args):
+    print(f"Running {args.processes} job worker process(es); Ctrl-C stops them after their current chunk")
+    jobs.run_workers(connect, processes=args.processes)
+    return 0
+
+
+def cmd_prune_jobs(args):
+    connection = connect()
+    try:
+        removed = jobs.prune(connection, args.days, log=print)
+        print(f"Pruned {removed} finished jobs older than {args.days} days")
+    finally:
+        connection.close()
+    return 0
+
+
+def cmd_replicas(args):
+    if not db_router.enabled:
+        print('No replicas configured (set DB_REPLICAS)')
+        return 0
+    usable = 0
+    for replica in db_router.replicas:
+        db_router.check(replica)
+        stats = replica.stats(db_router.max_lag)
+        usable += stats['usable']
+        state = 'usable' if stats['usable'] else 'skipped'
+        detail = stats['error'] or f"lag {stats['lag_seconds']}s (max {db_router.max_lag:g}s)"
+        print(f"{state:<8} {replica.name} {stats['host']}:{stats['port']}  {detail}")
+    return 0 if usable else 1
+
+
+def cmd_seed(args):
+    connection = mysql.connector.connect(**DB_CONFIG, autocommit=True,
+                                         allow_local_infile=args.method == seeder.LOAD_DATA)
+    try:
+        if args.clear:
+            seeder.clear(connection, log=print)
+            return 0
+        trainings = args.trainings if args.trainings is not None else args.trainees // 20
+        seeder.seed(connection, args.professionals, args.trainees, trainings, chunk_size=args.chunk_size,
+                    method=args.method, random_seed=args.random_seed, skew=args.skew, log=print)
+        print(f"Seeded {args.professionals} professionals, {args.trainees} trainees and {trainings} trainings")
+    finally:
+        connection.close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Suraksha maintenance tasks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    upgrade = subparsers.add_parser('upgrade', help='apply pending schema migrations')
+    upgrade.add_argument('--target', type=int, help='stop after this migration version')
+    upgrade.set_defaults(func=cmd_upgrade)
+
+    status = subparsers.add_parser('status', help='list applied and pending migrations')
+    status.set_defaults(func=cmd_status)
+
+    check_plans = subparsers.add_parser('check-plans', help='EXPLAIN every query and fail on full scans/filesorts')
+    check_plans.add_argument('--seed', type=int, default=0, help='insert this many trainees before checking')
+    check_plans.add_argument('--keep-seed', action='store_true', help='leave the seeded rows in place')
+    check_plans.set_defaults(func=cmd_check_plans)
+
+    rebuild_stats = subparsers.add_parser('rebuild-stats', help='recompute the /api/stats rollups from the base tables')
+    rebuild_stats.set_defaults(func=cmd_rebuild_stats)
+
+    backfill_reports = subparsers.add_parser('backfill-reports', help='rebuild the /api/reports summary tables')
+    backfill_reports.add_argument('--chunk-size', type=int, default=reports.DEFAULT_BACKFILL_CHUNK,
+                                  help='base-table ids per committed chunk')
+    backfill_reports.set_defaults(func=cmd_backfill_reports)
+
+    prune_changes = subparsers.add_parser('prune-changes', help='drop old /api/changes log entries')
+    prune_changes.add_argument('--days', type=int, default=30, help='keep entries newer than this')
+    prune_changes.set_defaults(func=cmd_prune_changes)
+
+    prune_sync_keys = subparsers.add_parser('prune-sync-keys', help='drop expired /api/sync idempotency keys')
+    prune_sync_keys.set_defaults(func=cmd_prune_sync_keys)
+
+    worker = subparsers.add_parser('worker', help='run the background export/report job workers')
+    worker.add_argument('--processes', type=int, default=jobs.JOB_WORKERS, help='jobs run at the same time')
+    worker.set_defaults(func=cmd_worker)
+
+    prune_jobs = subparsers.add_parser('prune-jobs', help='drop finished /api/jobs jobs and their files')
+    prune_jobs.add_argument('--days', type=int, default=7, help='keep jobs newer than this')
+    prune_jobs.set_defaults(func=cmd_prune_jobs)
+
+    replicas = subparsers.add_parser('replicas', help='check the health and lag of the DB_REPLICAS read replicas')
+    replicas.set_defaults(func=cmd_replicas)
+
+    seed = subparsers.add_parser('seed', help='insert synthetic professionals, trainees and trainings at scale')
+    seed.add_argument('--professionals', type=int, default=200)
+    seed.add_argument('--trainees', type=int, default=100000)
+    seed.add_argument('--trainings', type=int, help='default: one per 20 trainees')
+    seed.add_argument('--method', choices=seeder.METHODS, default=seeder.INSERT,
+                      help='multi-row INSERTs, or LOAD DATA LOCAL INFILE (needs local_infile=ON)')
+    seed.add_argument('--chunk-size', type=int, help='rows per statement (default 1000, 100000 for load-data)')
+    seed.add_argument('--random-seed', type=int, default=42, help='same seed, same rows')
+    seed.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of rows per professional')
+    seed.add_argument('--clear', action='store_true', help='delete previously seeded rows instead')
+    seed.set_defaults(func=cmd_seed)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""Per-route request metrics exported in the Prometheus text format.
+
+init_app() installs before/after request hooks that time every request,
+collect the database timings gathered by db_timing.TimedCursor and count
+responses, bytes and errors per route. /api/metrics renders the registry.
+
+Each gunicorn worker has its own registry. With METRICS_DIR set, workers
+also write snapshots there (at most every METRICS_FLUSH_INTERVAL seconds) and
+a scrape merges the snapshots of every live worker, so whichever worker
+answers reports the whole server. METRICS_REQUEST_LOG=1 additionally logs
+one JSON line per request with its request ID.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from flask import g, request
+
+import db_timing
+from serialization import dumps
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+METRICS_REQUEST_LOG = os.environ.get('METRICS_REQUEST_LOG', '').lower() in ('1', 'true', 'yes')
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+COUNTERS = {
+    'suraksha_http_requests_total': ('counter', 'Requests by route, method and status'),
+    'suraksha_http_request_errors_total': ('counter', 'Requests answered with a 5xx status'),
+    'suraksha_http_response_bytes_total': ('counter', 'Response body bytes sent (after compression)'),
+    'suraksha_db_connect_seconds_total': ('counter', 'Time spent checking out database connections'),
+    'suraksha_db_execute_seconds_total': ('counter', 'Time spent in cursor.execute / executemany'),
+    'suraksha_db_fetch_seconds_total': ('counter', 'Time spent fetching result rows'),
+    'suraksha_db_queries_total': ('counter', 'Statements executed'),
+    'suraksha_db_rows_total': ('counter', 'Rows fetched'),
+}
+HISTOGRAMS = {
+    'suraksha_http_request_duration_seconds': 'Request latency (time to response headers for streams)',
+    'suraksha_db_request_seconds': 'Database time (connect + execute + fetch) per request',
+}
+
+request_logger = logging.getLogger('suraksha.requests')
+
+
+class Registry:
+    """Counters and histograms keyed by (metric name, label tuple)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counters = {}    # name -> {labels: value}
+        self.histograms = {}  # name -> {labels: [bucket counts..., sum, count]}
+        self.lock = threading.Lock()
+
+    def inc(self, name, labels, value=1):
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + value
+
+    def observe(self, name, labels, value):
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            state = series.get(labels)
+            if state is None:
+                state = series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': {name: [[list(labels), value] for labels, value in series.items()]
+                             for name, series in self.counters.items()},
+                'histograms': {name: [[list(labels), list(state)] for labels, state in series.items()]
+                               for name, series in self.histograms.items()},
+            }
+
+    def merge(self, snapshot):
+        with self.lock:
+            for name, series in snapshot.get('counters', {}).items():
+                target = self.counters.setdefault(name, {})
+                for labels, value in series:
+                    labels = tuple(map(tuple, labels))
+                    target[labels] = target.get(labels, 0) + value
+            for name, series in snapshot.get('histograms', {}).items():
+                target = self.histograms.setdefault(name, {})
+                for labels, state in series:
+                    labels = tuple(map(tuple, labels))
+                    current = target.setdefault(labels, [0] * len(state))
+                    for i, value in enumerate(state):
+                        current[i] += value
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(registry):
+    """Prometheus text exposition (format 0.0.4) of ``registry``"""
+    lines = []
+    for name, (kind, help_text) in COUNTERS.items():
+        series = registry.counters.get(name)
+        if not series:
+            continue
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for labels, value in sorted(series.items()):
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+    for name, help_text in HISTOGRAMS.items():
+        series = registry.histograms.get(name)
+        if not series:
+            continue
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for labels, state in sorted(series.items()):
+            for bound, count in zip(registry.buckets, state):
+                lines.append(f"{name}_bucket{_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {state[-1]}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(state[-2])}")
+            lines.append(f"{name}_count{_labels(labels)} {state[-1]}")
+    return '\n'.join(lines) + '\n'
+
+
+class Metrics:
+    """Request instrumentation for one Flask app (one registry per worker process)"""
+
+    def __init__(self, metrics_dir=METRICS_DIR, flush_interval=METRICS_FLUSH_INTERVAL,
+                 request_log=METRICS_REQUEST_LOG):
+        self.metrics_dir = metrics_dir
+        self.flush_interval = flush_interval
+        self.request_log = request_log
+        self.registry = Registry()
+        self.pid = os.getpid()
+        self.flushed_at = 0.0
+
+    def init_app(self, app):
+        """Register the hooks; call before other after_request hooks (e.g. compression) are registered"""
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+
+    def _registry(self):
+        # A registry inherited from the gunicorn master belongs to another process
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.registry = Registry()
+            self.flushed_at = 0.0
+        return self.registry
+
+    def before_request(self):
+        g.request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+        g.db_timings, g.db_timings_token = db_timing.start_request(g.request_id)
+
+    def after_request(self, response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        duration = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        labels = (('route', route), ('method', request.method))
+        registry = self._registry()
+        registry.inc('suraksha_http_requests_total', labels + (('status', str(response.status_code)),))
+        if response.status_code >= 500:
+            registry.inc('suraksha_http_request_errors_total', labels)
+        registry.observe('suraksha_http_request_duration_seconds', labels, duration)
+
+        timings = g.db_timings
+        registry.observe('suraksha_db_request_seconds', labels, timings.connect + timings.execute + timings.fetch)
+        registry.inc('suraksha_db_connect_seconds_total', labels, timings.connect)
+        registry.inc('suraksha_db_execute_seconds_total', labels, timings.execute)
+        registry.inc('suraksha_db_fetch_seconds_total', labels, timings.fetch)
+        registry.inc('suraksha_db_queries_total', labels, timings.queries)
+        registry.inc('suraksha_db_rows_total', labels, timings.rows)
+
+        size = None
+        if response.is_streamed:
+            # Count streamed bodies as they are sent
+            response.response = self._count_stream(response.response, labels)
+        else:
+            size = response.calculate_content_length() or 0
+            registry.inc('suraksha_http_response_bytes_total', labels, size)
+
+        response.headers[REQUEST_ID_HEADER] = g.request_id
+        if self.request_log:
+            request_logger.info(dumps({
+                'request_id': g.request_id,
+                'method': request.method,
+                'route': route,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 3),
+                'bytes': size,
+                'db': timings.as_dict(),
+            }).decode('utf-8'))
+        self._maybe_flush()
+        return response
+
+    def teardown_request(self, exc):
+        token = g.pop('db_timings_token', None)
+        if token is not None:
+            db_timing.end_request(token)
+
+    def _count_stream(self, chunks, labels):
+        sent = 0
+        try:
+            for chunk in chunks:
+                sent += len(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+                yield chunk
+        finally:
+            self._registry().inc('suraksha_http_response_bytes_total', labels, sent)
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+    def _snapshot_path(self, pid):
+        return os.path.join(self.metrics_dir, f"metrics-{pid}.json")
+
+    def _maybe_flush(self, force=False):
+        if not self.metrics_dir:
+            return
+        now = time.monotonic()
+        if not force and now - self.flushed_at < self.flush_interval:
+            return
+        self.flushed_at = now
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        path = self._snapshot_path(os.getpid())
+        with open(path + '.tmp', 'wb') as f:
+            f.write(dumps(self._registry().snapshot()))
+        os.replace(path + '.tmp', path)
+
+    def exposition(self):
+        """Prometheus text for this worker, or for every live worker when METRICS_DIR is set"""
+        if not self.metrics_dir:
+            return render(self._registry())
+        self._maybe_flush(force=True)
+        merged = Registry()
+        for filename in os.listdir(self.metrics_dir):
+            if not (filename.startswith('metrics-') and filename.endswith('.json')):
+                continue
+            pid = int(filename[len('metrics-'):-len('.json')])
+            path = os.path.join(self.metrics_dir, filename)
+            if not _alive(pid):
+                # A restarted worker's counters are gone; Prometheus handles the reset
+                os.remove(path)
+                continue
+            with open(path, 'rb') as f:
+                merged.merge(json.load(f))
+        return render(merged)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,107 @@
+"""Versioned schema migrations stored as ordered SQL files in database/migrations"""
+import os
+import re
+
+import reports
+import rollups
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'database', 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d+)_([\w-]+)\.sql$')
+
+TRACKING_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name VARCHAR(200) NOT NULL,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Migrations that add tables derived from existing rows, with the function
+# (taking the connection) that fills them. It runs right after the
+# migration's statements and before the migration is recorded, so a failed
+# fill is retried by the next upgrade.
+BACKFILLS = {
+    3: rollups.rebuild,
+    4: reports.backfill,
+}
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    def statements(self):
+        """Split the file into statements, dropping full-line comments"""
+        with open(self.path, encoding='utf-8') as f:
+            lines = [line for line in f if not line.strip().startswith('--')]
+        return [stmt.strip() for stmt in ''.join(lines).split(';') if stmt.strip()]
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """All migration files in version order"""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError('Duplicate migration version numbers in ' + directory)
+    return migrations
+
+
+def applied_versions(cursor):
+    cursor.execute(TRACKING_TABLE)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def pending(cursor, directory=MIGRATIONS_DIR):
+    done = applied_versions(cursor)
+    return [m for m in discover(directory) if m.version not in done]
+
+
+def upgrade(connection, target=None, directory=MIGRATIONS_DIR, log=print, backfills=None):
+    """Apply pending migrations in order, up to and including ``target``.
+
+    MySQL commits DDL implicitly, so each migration is recorded in
+    schema_migrations right after its statements (and its BACKFILLS entry)
+    succeed; a failure leaves earlier migrations applied and stops before
+    recording the failing one.
+    """
+    backfills = BACKFILLS if backfills is None else backfills
+    cursor = connection.cursor()
+    try:
+        applied = []
+        for migration in pending(cursor, directory):
+            if target is not None and migration.version > target:
+                break
+            log(f"Applying {migration.version:04d}_{migration.name}")
+            for statement in migration.statements():
+                cursor.execute(statement)
+                if cursor.with_rows:
+                    cursor.fetchall()
+            backfill = backfills.get(migration.version)
+            if backfill:
+                log(f"Filling {migration.name} from the existing rows")
+                backfill(connection)
+            cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                           (migration.version, migration.name))
+            connection.commit()
+            applied.append(migration)
+        return applied
+    finally:
+        cursor.close()
+
+
+def status(connection, directory=MIGRATIONS_DIR):
+    """(migration, applied) pairs for every known migration"""
+    cursor = connection.cursor()
+    try:
+        done = applied_versions(cursor)
+        return [(m, m.version in done) for m in discover(directory)]
+    finally:
+        cursor.close()
@@ -0,0 +1,175 @@
+"""EXPLAIN every query the handlers run and flag full scans and filesorts"""
+import ast
+import os
+import random
+import re
+from datetime import datetime, timedelta
+
+from werkzeug.datastructures import MultiDict
+
+from app import BLOCKS
+from listing import ALL_OWNERS, parse_list_args, build_filters, build_list_query
+from search import build_search_queries
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+# Modules whose SQL literals are served by request handlers
+SOURCE_FILES = ('app.py', 'repository.py', 'exports.py', 'rollups.py', 'changes.py', 'events.py', 'enrollments.py', 'sync.py', 'jobs.py')
+SQL_START = re.compile(r'^\s*(SELECT\b.*\bFROM\b|UPDATE\s+\w+\s+SET\b|DELETE\s+FROM\b)', re.DOTALL)
+PLACEHOLDER_CONTEXT = re.compile(r'([\w.]+)\s*(?:=|<=|>=|<|>|LIKE)\s*$', re.IGNORECASE)
+
+# Representative values for %s placeholders, keyed by the column they are compared with
+SAMPLE_VALUES = {
+    'username': 'admin',
+    'password': 'admin123',
+    'role': 'admin',
+    'registered_by': 2,
+    'conducted_by': 2,
+    'block': 'Raipur',
+    'status': 'Planned',
+    'department': 'Emergency',
+}
+
+SEED_MARKER = 'Plan check seed'
+
+
+def app_queries(files=SOURCE_FILES):
+    """Every literal SQL statement (SELECT/UPDATE/DELETE) in the handler modules"""
+    queries = []
+    for filename in files:
+        with open(os.path.join(BACKEND_DIR, filename), encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and SQL_START.match(node.value):
+                queries.append((f"{filename}:{node.lineno}", node.value))
+    return queries
+
+
+def list_queries(specs):
+    """The paged page query of each list endpoint, for admin and owner-scoped callers"""
+    queries = []
+    for name, spec in specs.items():
+        list_request = parse_list_args(MultiDict({'limit': '50'}), spec)
+        owners = [('admin', ALL_OWNERS)]
+        if spec.owner_column:
+            owners.append(('owner', SAMPLE_VALUES['registered_by']))
+        for label, owner_id in owners:
+            where, params = build_filters(MultiDict(), spec, owner_id=owner_id)
+            sql, params, _, _ = build_list_query(spec, where, params, list_request)
+            queries.append((f"{name} ({label}, paged)", sql, params))
+    return queries
+
+
+def search_queries():
+    """/api/search statements for a text and a mobile number query, admin and owner-scoped"""
+    queries = []
+    for q in ('raj', '98765'):
+        for label, owner_id in (('admin', None), ('owner', SAMPLE_VALUES['registered_by'])):
+            for name, sql, params in build_search_queries(MultiDict({'q': q}), owner_id=owner_id):
+                queries.append((f"search {name} ({label}, q={q})", sql, params))
+    return queries
+
+
+def sample_params(sql):
+    """Guess a plausible parameter for every %s from the column it is compared with"""
+    params = []
+    for match in re.finditer(r'%s', sql):
+        before = sql[:match.start()]
+        if re.search(r'LIMIT\s*$', before, re.IGNORECASE):
+            params.append(51)
+            continue
+        context = PLACEHOLDER_CONTEXT.search(before)
+        column = context.group(1).split('.')[-1] if context else None
+        params.append(SAMPLE_VALUES.get(column, 1))
+    return params
+
+
+def is_full_table_read(sql):
+    """Unbounded reads with no WHERE (exports) scan the whole table by design"""
+    normalized = ' '.join(sql.split()).upper()
+    return ' WHERE ' not in normalized and ' LIMIT ' not in normalized
+
+
+def is_ranked_search(sql, problems):
+    """Full-text searches sort their (few) matches by relevance; only that filesort is expected"""
+    return 'MATCH(' in sql and all(problem.startswith('filesort') for problem in problems)
+
+
+def explain(cursor, sql, params):
+    cursor.execute('EXPLAIN ' + sql, params)
+    return cursor.fetchall()
+
+
+def plan_problems(plan):
+    problems = []
+    for row in plan:
+        table = row.get('table') or ''
+        extra = row.get('Extra') or ''
+        if row.get('type') == 'ALL' and not table.startswith('<'):
+            problems.append(f"full scan on {table} (~{row.get('rows')} rows)")
+        if 'filesort' in extra:
+            problems.append(f"filesort on {table}")
+    return problems
+
+
+def check(cursor, specs, log=print):
+    """EXPLAIN every query; returns the number of queries with problems"""
+    failures = 0
+    queries = [(label, sql, sample_params(sql)) for label, sql in app_queries()]
+    queries += list_queries(specs)
+    queries += search_queries()
+    for label, sql, params in queries:
+        plan = explain(cursor, sql, params)
+        problems = plan_problems(plan)
+        summary = ' '.join(sql.split())
+        if problems and is_full_table_read(sql):
+            log(f"  info  {label}: whole-table read ({'; '.join(problems)})")
+        elif problems and is_ranked_search(sql, problems):
+            log(f"  info  {label}: matches sorted by relevance")
+        elif problems:
+            failures += 1
+            log(f"  FAIL  {label}: {'; '.join(problems)}\n        {summary}")
+        else:
+            log(f"  ok    {label}")
+    return failures
+
+
+def table_size(cursor, table):
+    cursor.execute(f"SELECT COUNT(*) AS n FROM {table}")
+    return cursor.fetchone()['n']
+
+
+def seed(cursor, trainees, chunk=1000):
+    """Insert ``trainees`` trainees and a tenth as many trainings across the existing professionals"""
+    cursor.execute("SELECT id FROM users WHERE role = 'professional'")
+    professionals = [row['id'] for row in cursor.fetchall()]
+    if not professionals:
+        raise RuntimeError('Seeding needs at least one professional in users')
+    rng = random.Random(42)
+    start = datetime(2022, 1, 1)
+
+    trainee_sql = """INSERT INTO trainees (name, gender, age, department, address, block, training_date,
+                     cpr_training, registered_by, created_at)
+                     VALUES (%s, 'Female', 30, 'Emergency', %s, %s, %s, %s, %s, %s)"""
+    training_sql = """INSERT INTO trainings (title, training_topic, address, block, training_date, training_time,
+                      conducted_by, created_at)
+                      VALUES (%s, 'Seed', %s, %s, %s, %s, %s, %s)"""
+    for table_sql, total, make in (
+        (trainee_sql, trainees, lambda n, at: (f"Seed trainee {n}", SEED_MARKER, rng.choice(BLOCKS), at.date(),
+                                               rng.random() < 0.5, rng.choice(professionals), at)),
+        (training_sql, max(1, trainees // 10), lambda n, at: (f"Seed training {n}", SEED_MARKER, rng.choice(BLOCKS),
+                                                              at.date(), f"{rng.randint(8, 17)}:00:00",
+                                                              rng.choice(professionals), at)),
+    ):
+        for offset in range(0, total, chunk):
+            rows = []
+            for n in range(offset, min(total, offset + chunk)):
+                at = start + timedelta(minutes=rng.randint(0, 60 * 24 * 365 * 3))
+                rows.append(make(n, at))
+            cursor.executemany(table_sql, rows)
+    cursor.execute("ANALYZE TABLE users, trainees, trainings")
+    cursor.fetchall()
+
+
+def remove_seed(cursor):
+    cursor.execute("DELETE FROM trainees WHERE address = %s", (SEED_MARKER,))
+    cursor.execute("DELETE FROM trainings WHERE address = %s", (SEED_MARKER,))
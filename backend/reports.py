@@ -0,0 +1,254 @@
+"""Time-bucketed summary tables behind /api/reports.
+
+report_trainees and report_trainings hold one row per (grain, period_start,
+dimensions) with summed measures. Write paths apply +/- deltas through
+rollups.py in the same transaction as the base-table change; backfill()
+rebuilds them from the base tables in id-range chunks. Day and week reports
+read the 'day' grain, month and quarter reports the much smaller 'month'
+grain, so multi-year queries never touch the base tables.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from flags import parse_flag
+
+GRAINS = ('day', 'month')
+BUCKETS = ('day', 'week', 'month', 'quarter')
+DEFAULT_BACKFILL_CHUNK = 10000
+
+
+class ReportParamError(ValueError):
+    """Raised for malformed report parameters"""
+
+
+class ReportSpec:
+    """One summary table: its base table, dimensions and measures.
+
+    ``dimensions`` maps a public group_by name to the summary column (and the
+    base-table column it is copied from). ``measures`` maps a summary column to
+    ``(base_sql_expression, row_function)``: the expression is summed by
+    backfill(), the function gives one row's contribution for the deltas.
+    """
+
+    def __init__(self, table, base_table, owner_column, dimensions, measures, filters):
+        self.table = table
+        self.base_table = base_table
+        self.owner_column = owner_column
+        self.dimensions = dimensions
+        self.measures = measures
+        self.filters = filters
+
+    @property
+    def key_columns(self):
+        return list(self.dimensions.values())
+
+
+TRAINEE_REPORT = ReportSpec(
+    table='report_trainees',
+    base_table='trainees',
+    owner_column='registered_by',
+    dimensions={'block': 'block', 'department': 'department', 'professional': 'registered_by'},
+    measures={
+        'trainees': ('1', lambda row: 1),
+        'cpr_training': ('cpr_training', lambda row: int(parse_flag(row.get('cpr_training')))),
+        'first_aid_kit_given': ('first_aid_kit_given', lambda row: int(parse_flag(row.get('first_aid_kit_given')))),
+        'life_saving_skills': ('life_saving_skills', lambda row: int(parse_flag(row.get('life_saving_skills')))),
+    },
+    filters=('block', 'department'),
+)
+
+TRAINING_REPORT = ReportSpec(
+    table='report_trainings',
+    base_table='trainings',
+    owner_column='conducted_by',
+    dimensions={'block': 'block', 'status': 'status', 'professional': 'conducted_by'},
+    measures={
+        'trainings': ('1', lambda row: 1),
+        'hours': ('duration_hours', lambda row: Decimal(str(row.get('duration_hours') or 0))),
+    },
+    filters=('block', 'status'),
+)
+
+REPORTS = {'trainees': TRAINEE_REPORT, 'trainings': TRAINING_REPORT}
+
+
+def _as_date(value):
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def bucket_start(bucket, day):
+    """First day of the day/week/month/quarter bucket containing ``day``"""
+    if bucket == 'day':
+        return day
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+
+
+def report_deltas(spec, old=None, new=None):
+    """{(grain, period_start, *dimension values): [measure deltas]} for replacing ``old`` by ``new``"""
+    deltas = {}
+    for row, sign in ((old, -1), (new, 1)):
+        if not row:
+            continue
+        day = _as_date(row['training_date'])
+        dimensions = tuple(int(row[column]) if column == spec.owner_column else str(row.get(column) or '')
+                           for column in spec.key_columns)
+        values = [sign * measure(row) for _, measure in spec.measures.values()]
+        for grain in GRAINS:
+            key = (grain, bucket_start(grain, day)) + dimensions
+            totals = deltas.setdefault(key, [0] * len(values))
+            for i, value in enumerate(values):
+                totals[i] += value
+    return deltas
+
+
+def merge_deltas(target, deltas):
+    for key, values in deltas.items():
+        totals = target.setdefault(key, [0] * len(values))
+        for i, value in enumerate(values):
+            totals[i] += value
+    return target
+
+
+def apply_report_deltas(cursor, spec, deltas):
+    """Add the non-zero deltas to the summary table in key order"""
+    rows = [key + tuple(values) for key, values in sorted(deltas.items()) if any(values)]
+    if not rows:
+        return
+    columns = ['grain', 'period_start'] + spec.key_columns + list(spec.measures)
+    placeholders = ', '.join(['(' + ', '.join(['%s'] * len(columns)) + ')'] * len(rows))
+    updates = ', '.join(f"{measure} = {measure} + VALUES({measure})" for measure in spec.measures)
+    cursor.execute(f"INSERT INTO {spec.table} ({', '.join(columns)}) VALUES {placeholders} "
+                   f"ON DUPLICATE KEY UPDATE {updates}", [value for row in rows for value in row])
+
+
+def remove_owner(cursor, owner_id):
+    """Drop a deleted professional's rows (their trainees and trainings cascade away)"""
+    for spec in REPORTS.values():
+        cursor.execute(f"DELETE FROM {spec.table} WHERE {spec.owner_column} = %s", (owner_id,))
+
+
+PERIOD_SQL = {
+    'day': 'r.period_start',
+    'week': 'DATE_SUB(r.period_start, INTERVAL WEEKDAY(r.period_start) DAY)',
+    'month': 'r.period_start',
+    'quarter': 'MAKEDATE(YEAR(r.period_start), 1) + INTERVAL (QUARTER(r.period_start) - 1) QUARTER',
+}
+# The same buckets on SQLite (DB_BACKEND=sqlite): Monday of the week, first month of the quarter
+SQLITE_PERIOD_SQL = {
+    'day': 'r.period_start',
+    'week': "date(r.period_start, 'weekday 0', '-6 days')",
+    'month': 'r.period_start',
+    'quarter': ("date(r.period_start, 'start of month', "
+                "'-' || ((CAST(strftime('%%m', r.period_start) AS INTEGER) - 1) %% 3) || ' months')"),
+}
+GRAIN_FOR_BUCKET = {'day': 'day', 'week': 'day', 'month': 'month', 'quarter': 'month'}
+
+
+def build_report_query(args, owner_id=None, dialect='mysql'):
+    """(sql, params, metric, bucket, group_by) for a /api/reports request.
+
+    ``owner_id`` restricts the report to one professional (None for everyone).
+    ``from`` and ``to`` are widened to whole buckets. ``dialect`` is the SQL
+    dialect of the connection the query will run on ('mysql' or 'sqlite').
+    """
+    metric = args.get('metric', 'trainees')
+    spec = REPORTS.get(metric)
+    if spec is None:
+        raise ReportParamError(f"Metric must be one of: {', '.join(REPORTS)}")
+    bucket = args.get('bucket', 'month')
+    if bucket not in BUCKETS:
+        raise ReportParamError(f"Bucket must be one of: {', '.join(BUCKETS)}")
+    group_by = [name for name in args.get('group_by', '').split(',') if name]
+    unknown = [name for name in group_by if name not in spec.dimensions]
+    if unknown or len(set(group_by)) != len(group_by):
+        raise ReportParamError(f"group_by must be a comma separated subset of: {', '.join(spec.dimensions)}")
+
+    where = ['r.grain = %s']
+    params = [GRAIN_FOR_BUCKET[bucket]]
+    for name, operator in (('from', '>='), ('to', '<=')):
+        if args.get(name):
+            try:
+                day = date.fromisoformat(args[name])
+            except ValueError:
+                raise ReportParamError(f"'{name}' must be a YYYY-MM-DD date")
+            where.append(f"r.period_start {operator} %s")
+            params.append(bucket_start(bucket, day) if name == 'from' else day)
+    if owner_id is not None:
+        where.append(f"r.{spec.owner_column} = %s")
+        params.append(owner_id)
+    for name in spec.filters:
+        if args.get(name):
+            where.append(f"r.{spec.dimensions[name]} = %s")
+            params.append(args[name])
+
+    period = (SQLITE_PERIOD_SQL if dialect == 'sqlite' else PERIOD_SQL)[bucket]
+    select = [f"{period} AS period"]
+    group = [period]
+    joins = ''
+    for name in group_by:
+        column = f"r.{spec.dimensions[name]}"
+        if name == 'professional':
+            joins = f" LEFT JOIN users u ON u.id = {column}"
+            select += [f"{column} AS professional_id", 'u.name AS professional_name']
+            group += [column, 'u.name']
+        else:
+            select.append(f"{column} AS {name}")
+            group.append(column)
+    for measure in spec.measures:
+        total = f"SUM(r.{measure})"
+        select.append(f"{total} AS {measure}" if measure == 'hours' else f"CAST({total} AS SIGNED) AS {measure}")
+
+    sql = (f"SELECT {', '.join(select)} FROM {spec.table} r{joins} WHERE {' AND '.join(where)} "
+           f"GROUP BY {', '.join(group)} ORDER BY {', '.join(group)}")
+    return sql, params, metric, bucket, group_by
+
+
+def _backfill_sql(spec, grain):
+    # %% because the statement also carries %s placeholders
+    period = 'training_date' if grain == 'day' else "DATE_FORMAT(training_date, '%%Y-%%m-01')"
+    key_columns = spec.key_columns
+    measures = list(spec.measures)
+    sums = ', '.join(f"COALESCE(SUM({expression}), 0) AS {measure}" for measure, (expression, _) in spec.measures.items())
+    dimensions = ', '.join(column if column == spec.owner_column else f"COALESCE({column}, '') AS {column}"
+                           for column in key_columns)
+    updates = ', '.join(f"{measure} = {spec.table}.{measure} + chunk.{measure}" for measure in measures)
+    columns = ', '.join(['grain', 'period_start'] + key_columns + measures)
+    return (f"INSERT INTO {spec.table} ({columns}) "
+            f"SELECT * FROM (SELECT '{grain}' AS grain, {period} AS period_start, {dimensions}, {sums} "
+            f"FROM {spec.base_table} WHERE id > %s AND id <= %s "
+            f"GROUP BY period_start, {', '.join(key_columns)}) AS chunk "
+            f"ON DUPLICATE KEY UPDATE {updates}")
+
+
+def backfill(connection, chunk_size=DEFAULT_BACKFILL_CHUNK, log=None):
+    """Rebuild both summary tables from the base tables, one committed id range at a time.
+
+    Rows written by the handlers while a backfill runs can be counted twice,
+    so run it while writes are paused (or right after creating the tables).
+    """
+    cursor = connection.cursor()
+    try:
+        for spec in REPORTS.values():
+            connection.start_transaction()
+            cursor.execute(f"DELETE FROM {spec.table}")
+            connection.commit()
+            cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {spec.base_table}")
+            max_id = cursor.fetchone()[0]
+            for low in range(0, max_id, chunk_size):
+                connection.start_transaction()
+                for grain in GRAINS:
+                    cursor.execute(_backfill_sql(spec, grain), (low, low + chunk_size))
+                connection.commit()
+                if log:
+                    log(f"{spec.table}: ids up to {min(low + chunk_size, max_id)} of {max_id}")
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
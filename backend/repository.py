@@ -0,0 +1,255 @@
+"""The statements the handlers run against users, trainees and trainings.
+
+Fixed statements go through the connection's statement cache (see
+db_pool.StatementCache). On MySQL each one is then prepared once per pooled
+connection and afterwards only executed with new parameters. Statements
+whose text varies with the request (PATCH column sets, id lists) would
+rarely be reused, so they use ordinary cursors; preparing them would cost
+an extra round trip. On SQLite, sqlite3 caches the compiled statements
+itself.
+
+Methods take a connection and leave transactions to the caller. The
+backend is whatever get_db_connection() returned (see sqlite_backend.py).
+"""
+
+TRAINEE_INSERT_COLUMNS = ('name', 'mobile_number', 'gender', 'age', 'department', 'designation', 'address', 'block',
+                          'training_date', 'cpr_training', 'first_aid_kit_given', 'life_saving_skills', 'registered_by')
+TRAINING_INSERT_COLUMNS = ('title', 'description', 'training_topic', 'address', 'block', 'training_date',
+                           'training_time', 'duration_hours', 'max_trainees', 'conducted_by')
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def _assignments(values):
+    """SET clause for the columns in ``values`` (names come from the *_PATCH_COLUMNS whitelists in app.py)"""
+    return ', '.join(f"{column} = %s" for column in values)
+
+
+class Repository:
+    """Cursor handling shared by the repositories"""
+
+    def _cursor(self, connection, sql, dictionary=False, prepare=True):
+        prepared_cursor = getattr(connection, 'prepared_cursor', None)
+        if prepare and prepared_cursor is not None:
+            return prepared_cursor(sql, dictionary)
+        return connection.cursor(dictionary=dictionary)
+
+    def _write(self, connection, sql, params, prepare=True):
+        """(rowcount, lastrowid) of one statement"""
+        cursor = self._cursor(connection, sql, prepare=prepare)
+        try:
+            cursor.execute(sql, params)
+            return cursor.rowcount, cursor.lastrowid
+        finally:
+            cursor.close()
+
+    def _fetchall(self, connection, sql, params, dictionary=False, prepare=True):
+        cursor = self._cursor(connection, sql, dictionary, prepare)
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _fetchone(self, connection, sql, params, dictionary=False):
+        # fetchall so a cached cursor is left without unread rows
+        rows = self._fetchall(connection, sql, params, dictionary)
+        return rows[0] if rows else None
+
+
+class UserRepository(Repository):
+    LOGIN = "SELECT * FROM users WHERE username = %s AND password = %s AND role = %s"
+    USERNAME_TAKEN = "SELECT id FROM users WHERE username = %s"
+    ROLE = "SELECT role FROM users WHERE id = %s"
+    ROLE_FOR_UPDATE = "SELECT role FROM users WHERE id = %s FOR UPDATE"
+    INSERT_PROFESSIONAL = """INSERT INTO users (name, username, password, mobile_number, gender, age, role, designation,
+                         department, specialization, experience_years)
+                         VALUES (%s, %s, %s, %s, %s, %s, 'professional', %s, %s, %s, %s)"""
+    UPDATE_PROFESSIONAL = """
+        UPDATE users SET
+            name = %s,
+            username = %s,
+            mobile_number = %s,
+            gender = %s,
+            age = %s,
+            designation = %s,
+            department = %s,
+            specialization = %s,
+            experience_years = %s
+        WHERE id = %s AND role = 'professional'
+    """
+    DELETE_PROFESSIONAL = "DELETE FROM users WHERE id = %s AND role = 'professional'"
+
+    def find_login(self, connection, username, password, role):
+        """The user row matching the credentials, or None"""
+        return self._fetchone(connection, self.LOGIN, (username, password, role), dictionary=True)
+
+    def username_taken(self, connection, username):
+        return self._fetchone(connection, self.USERNAME_TAKEN, (username,)) is not None
+
+    def role(self, connection, user_id, for_update=False):
+        """Role of a user (None when missing), optionally locking the row"""
+        row = self._fetchone(connection, self.ROLE_FOR_UPDATE if for_update else self.ROLE, (user_id,))
+        return row[0] if row else None
+
+    def insert_professional(self, connection, values):
+        """Id of the new professional; ``values`` follow INSERT_PROFESSIONAL"""
+        return self._write(connection, self.INSERT_PROFESSIONAL, values)[1]
+
+    def update_professional(self, connection, user_id, values):
+        """Rows changed; ``values`` follow UPDATE_PROFESSIONAL"""
+        return self._write(connection, self.UPDATE_PROFESSIONAL, (*values, user_id))[0]
+
+    def patch_professional(self, connection, user_id, values):
+        """Set the columns in ``values`` ({column: value}); rows changed"""
+        return self._write(connection, f"UPDATE users SET {_assignments(values)} WHERE id = %s AND role = 'professional'",
+                           (*values.values(), user_id), prepare=False)[0]
+
+    def delete_professional(self, connection, user_id):
+        """Rows deleted (admins are never deleted)"""
+        return self._write(connection, self.DELETE_PROFESSIONAL, (user_id,))[0]
+
+
+class TraineeRepository(Repository):
+    INSERT = f"""
+    INSERT INTO trainees ({', '.join(TRAINEE_INSERT_COLUMNS)})
+    VALUES ({_placeholders(TRAINEE_INSERT_COLUMNS)})
+"""
+    UPDATE = """
+            UPDATE trainees
+            SET name = %s, mobile_number = %s, gender = %s, age = %s, department = %s, designation = %s, address = %s, block = %s, training_date = %s,
+                cpr_training = %s, first_aid_kit_given = %s, life_saving_skills = %s
+            WHERE id = %s
+        """
+    DELETE = "DELETE FROM trainees WHERE id = %s"
+
+    def insert(self, connection, values):
+        """Id of the new trainee; ``values`` follow TRAINEE_INSERT_COLUMNS"""
+        return self._write(connection, self.INSERT, values)[1]
+
+    def insert_many(self, connection, rows):
+        """Id of the first of ``rows``; the others follow consecutively.
+
+        mysql-connector's executemany rewrites the INSERT into one multi-row
+        statement on a plain cursor, whereas a prepared one would run it row
+        by row.
+        """
+        cursor = connection.cursor()
+        try:
+            cursor.executemany(self.INSERT, rows)
+            return cursor.lastrowid
+        finally:
+            cursor.close()
+
+    def update(self, connection, trainee_id, values):
+        """Rows changed; ``values`` follow UPDATE"""
+        return self._write(connection, self.UPDATE, (*values, trainee_id))[0]
+
+    def patch(self, connection, trainee_id, values):
+        """Set the columns in ``values`` ({column: value}); rows changed"""
+        return self._write(connection, f"UPDATE trainees SET {_assignments(values)} WHERE id = %s",
+                           (*values.values(), trainee_id), prepare=False)[0]
+
+    def delete(self, connection, trainee_id):
+        return self._write(connection, self.DELETE, (trainee_id,))[0]
+
+    def delete_many(self, connection, trainee_ids):
+        return self._write(connection, f"DELETE FROM trainees WHERE id IN ({_placeholders(trainee_ids)})",
+                           tuple(trainee_ids), prepare=False)[0]
+
+
+class TrainingRepository(Repository):
+    INSERT = f"""
+            INSERT INTO trainings ({', '.join(TRAINING_INSERT_COLUMNS)})
+            VALUES ({_placeholders(TRAINING_INSERT_COLUMNS)})
+        """
+    UPDATE = """
+            UPDATE trainings
+            SET title = %s, description = %s, training_topic = %s, address = %s, block = %s,
+                training_date = %s, training_time = %s, duration_hours = %s, max_trainees = %s, status = %s
+            WHERE id = %s
+        """
+    DELETE = "DELETE FROM trainings WHERE id = %s"
+    FIND = ("SELECT id, title, status, max_trainees, current_trainees, conducted_by FROM trainings "
+            "WHERE id = %s")
+    SEATS = "SELECT current_trainees, max_trainees FROM trainings WHERE id = %s"
+    ENROLLED_TRAINEES = """
+            SELECT tr.id, tr.name, tr.mobile_number, tr.department, tr.block, tr.registered_by, e.enrolled_at
+            FROM training_enrollments e
+            JOIN trainees tr ON tr.id = e.trainee_id
+            WHERE e.training_id = %s
+            ORDER BY e.trainee_id
+        """
+
+    def insert(self, connection, values):
+        """Id of the new training; ``values`` follow TRAINING_INSERT_COLUMNS"""
+        return self._write(connection, self.INSERT, values)[1]
+
+    def update(self, connection, training_id, values):
+        """Rows changed; ``values`` follow UPDATE"""
+        return self._write(connection, self.UPDATE, (*values, training_id))[0]
+
+    def patch(self, connection, training_id, values):
+        """Set the columns in ``values`` ({column: value}); rows changed"""
+        return self._write(connection, f"UPDATE trainings SET {_assignments(values)} WHERE id = %s",
+                           (*values.values(), training_id), prepare=False)[0]
+
+    def set_status(self, connection, training_ids, status):
+        return self._write(connection, f"UPDATE trainings SET status = %s WHERE id IN ({_placeholders(training_ids)})",
+                           (status, *training_ids), prepare=False)[0]
+
+    def delete(self, connection, training_id):
+        """Rows deleted (enrollments cascade)"""
+        return self._write(connection, self.DELETE, (training_id,))[0]
+
+    def delete_many(self, connection, training_ids):
+        """Rows deleted (enrollments cascade)"""
+        return self._write(connection, f"DELETE FROM trainings WHERE id IN ({_placeholders(training_ids)})",
+                           tuple(training_ids), prepare=False)[0]
+
+    def find(self, connection, training_id):
+        """Capacity and owner of a training as a dict, or None"""
+        return self._fetchone(connection, self.FIND, (training_id,), dictionary=True)
+
+    def seats(self, connection, training_id):
+        """(current_trainees, max_trainees), or (None, None) when the training is gone"""
+        return self._fetchone(connection, self.SEATS, (training_id,)) or (None, None)
+
+    def enrolled_trainees(self, connection, training_id):
+        return self._fetchall(connection, self.ENROLLED_TRAINEES, (training_id,), dictionary=True)
+
+
+class ListRepository(Repository):
+    """Reads built from a listing.ListSpec, and the search and report queries.
+
+    Their text depends on the filters, sort and ids of each request, so none
+    of them is prepared.
+    """
+
+    def rows(self, connection, sql, params):
+        """All rows of a built query, as dicts"""
+        return self._fetchall(connection, sql, params, dictionary=True, prepare=False)
+
+    def total(self, connection, sql, params):
+        """The ``total`` of a count query from listing.build_list_query"""
+        return self.rows(connection, sql, params)[0]['total']
+
+    def ids_matching(self, connection, spec, where, params, limit):
+        """Ids of the first ``limit`` rows matching the ``where`` conditions, in id order"""
+        sql = (f"SELECT {spec.id_column} FROM {spec.from_sql} WHERE {' AND '.join(where)} "
+               f"ORDER BY {spec.id_column} LIMIT %s")
+        return [row[0] for row in self._fetchall(connection, sql, (*params, limit), prepare=False)]
+
+    def find_many(self, connection, spec, ids):
+        """Rows (``spec.select_sql``) with the given ids that pass the spec's base conditions"""
+        where = spec.base_where + [f"{spec.id_column} IN ({_placeholders(ids)})"]
+        return self.rows(connection, f"SELECT {spec.select_sql} FROM {spec.from_sql} WHERE {' AND '.join(where)}",
+                         tuple(ids))
+
+
+users = UserRepository()
+trainees = TraineeRepository()
+trainings = TrainingRepository()
+lists = ListRepository()
@@ -0,0 +1,215 @@
+"""Read-through cache for serialized list responses.
+
+Entries are tagged with the tables they were built from; mutating handlers
+call invalidate() with the tables they touched so dependent entries are
+dropped as soon as the write commits. The in-process MemoryCache is the
+default; RedisCache lets every gunicorn worker share entries and
+invalidations.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+
+class NullCache:
+    """Cache that never stores anything (RESULT_CACHE_BACKEND=none)"""
+
+    name = 'none'
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key):
+        self.stats.misses += 1
+        return None
+
+    def set(self, key, value, tags, ttl=None):
+        pass
+
+    def invalidate(self, tables):
+        pass
+
+    def clear(self):
+        pass
+
+    def info(self):
+        return {'backend': self.name, **self.stats.as_dict()}
+
+
+class MemoryCache:
+    """Per-process LRU cache bounded by entry count and total bytes, with a TTL"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=1000, max_bytes=64 * 1024 * 1024, ttl=60):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries = OrderedDict()  # key -> (value, tags, expires_at, size)
+        self._tags = {}  # table -> set of keys
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _remove(self, key):
+        value, tags, expires_at, size = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            if entry[2] <= time.monotonic():
+                self._remove(key)
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[0]
+
+    def set(self, key, value, tags, ttl=None):
+        size = len(value[0]) + len(key)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, tuple(tags), time.monotonic() + (ttl or self.ttl), size)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            self.stats.stores += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def invalidate(self, tables):
+        with self._lock:
+            for table in tables:
+                for key in list(self._tags.get(table, ())):
+                    self._remove(key)
+                    self.stats.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def info(self):
+        with self._lock:
+            return {
+                'backend': self.name,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                **self.stats.as_dict(),
+            }
+
+
+class RedisCache:
+    """Cache shared by every worker through Redis (needs the optional ``redis`` package).
+
+    Entry count and memory bounds are enforced by Redis itself
+    (maxmemory with an LRU eviction policy); entries carry the TTL.
+    """
+
+    name = 'redis'
+    prefix = 'suraksha:cache:'
+
+    def __init__(self, url, ttl=60):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('RESULT_CACHE_BACKEND=redis needs the redis package (pip install redis)')
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.stats = CacheStats()
+
+    def get(self, key):
+        raw = self.client.hgetall(self.prefix + key)
+        if not raw:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return raw[b'body'], raw[b'mimetype'].decode('ascii')
+
+    def set(self, key, value, tags, ttl=None):
+        body, mimetype = value
+        pipe = self.client.pipeline()
+        pipe.hset(self.prefix + key, mapping={'body': body, 'mimetype': mimetype})
+        pipe.expire(self.prefix + key, ttl or self.ttl)
+        for tag in tags:
+            pipe.sadd(f"{self.prefix}tag:{tag}", key)
+            pipe.expire(f"{self.prefix}tag:{tag}", (ttl or self.ttl) * 2)
+        pipe.execute()
+        self.stats.stores += 1
+
+    def invalidate(self, tables):
+        for table in tables:
+            tag = f"{self.prefix}tag:{table}"
+            keys = self.client.smembers(tag)
+            pipe = self.client.pipeline()
+            for key in keys:
+                pipe.delete(self.prefix + key.decode('utf-8'))
+            pipe.delete(tag)
+            pipe.execute()
+            self.stats.invalidations += len(keys)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+    def info(self):
+        return {'backend': self.name, 'ttl': self.ttl, **self.stats.as_dict()}
+
+
+def cache_from_env():
+    """Build the cache configured by RESULT_CACHE_* environment variables"""
+    backend = os.environ.get('RESULT_CACHE_BACKEND', 'memory')
+    ttl = int(os.environ.get('RESULT_CACHE_TTL', 60))
+    if backend == 'none':
+        return NullCache()
+    if backend == 'redis':
+        return RedisCache(os.environ.get('RESULT_CACHE_URL', 'redis://localhost:6379/0'), ttl=ttl)
+    if backend != 'memory':
+        raise ValueError(f"Unknown RESULT_CACHE_BACKEND '{backend}'")
+    return MemoryCache(
+        max_entries=int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 1000)),
+        max_bytes=int(os.environ.get('RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+        ttl=ttl,
+    )
@@ -0,0 +1,216 @@
+"""Incrementally maintained counters behind /api/stats and /api/reports.
+
+Write handlers call trainee_changed / training_changed / professional_added /
+professional_removed inside their transaction with the row before and after
+the change; the resulting +/- deltas are applied to stat_rollups for the
+system-wide owner (0) and for the owning professional, and to the report
+summary tables (see reports.py). rebuild() recomputes stat_rollups from the
+base tables for repair.
+"""
+from collections import Counter
+
+from flags import parse_flag
+from reports import (TRAINEE_REPORT, TRAINING_REPORT, report_deltas, merge_deltas, apply_report_deltas,
+                     remove_owner)
+
+ALL_OWNERS_ID = 0
+SKILL_FLAGS = ('cpr_training', 'first_aid_kit_given', 'life_saving_skills')
+
+# (metric, bucket column or None for a plain total, flag column that must be true or None)
+TRAINEE_METRICS = [('trainees', None, None)]
+TRAINEE_METRICS += [(f"trainees.{flag}", None, flag) for flag in SKILL_FLAGS]
+TRAINEE_METRICS += [('trainees.block', 'block', None), ('trainees.department', 'department', None)]
+TRAINING_METRICS = [
+    ('trainings', None, None),
+    ('trainings.status', 'status', None),
+    ('trainings.block', 'block', None),
+]
+
+
+def _row_keys(row, metrics):
+    for metric, bucket_column, flag in metrics:
+        if flag and not parse_flag(row.get(flag)):
+            continue
+        bucket = '' if bucket_column is None else str(row.get(bucket_column) or '')
+        yield metric, bucket
+
+
+def _deltas(old, new, metrics, owner_column):
+    """Counter of (owner_id, metric, bucket) -> delta for replacing ``old`` by ``new``"""
+    deltas = Counter()
+    for row, sign in ((old, -1), (new, 1)):
+        if not row:
+            continue
+        owner = int(row[owner_column])
+        for metric, bucket in _row_keys(row, metrics):
+            deltas[(ALL_OWNERS_ID, metric, bucket)] += sign
+            deltas[(owner, metric, bucket)] += sign
+    return deltas
+
+
+def apply_deltas(cursor, deltas):
+    """Add the non-zero deltas to stat_rollups, in key order so concurrent writers lock rows consistently"""
+    rows = [(owner, metric, bucket, delta) for (owner, metric, bucket), delta in sorted(deltas.items()) if delta]
+    if not rows:
+        return
+    placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(rows))
+    params = [value for row in rows for value in row]
+    cursor.execute(f"""
+        INSERT INTO stat_rollups (owner_id, metric, bucket, value) VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE value = value + VALUES(value)
+    """, params)
+
+
+def _lock_row(cursor, query, columns, row_id):
+    cursor.execute(query, (row_id,))
+    row = cursor.fetchone()
+    return dict(zip(columns, row)) if row else None
+
+
+TRAINEE_STAT_COLUMNS = ('block', 'department') + SKILL_FLAGS + ('registered_by', 'training_date')
+TRAINING_STAT_COLUMNS = ('status', 'block', 'conducted_by', 'training_date', 'duration_hours')
+
+
+def lock_trainee(cursor, trainee_id):
+    """Counted columns of a trainee, locked until the transaction ends (None when missing)"""
+    return _lock_row(cursor, f"SELECT {', '.join(TRAINEE_STAT_COLUMNS)} FROM trainees WHERE id = %s FOR UPDATE",
+                     TRAINEE_STAT_COLUMNS, trainee_id)
+
+
+def lock_training(cursor, training_id):
+    """Counted columns of a training, locked until the transaction ends (None when missing)"""
+    return _lock_row(cursor, f"SELECT {', '.join(TRAINING_STAT_COLUMNS)} FROM trainings WHERE id = %s FOR UPDATE",
+                     TRAINING_STAT_COLUMNS, training_id)
+
+
+def _lock_rows(cursor, table, columns, row_ids):
+    cursor.execute(f"SELECT id, {', '.join(columns)} FROM {table} "
+                   f"WHERE id IN ({', '.join(['%s'] * len(row_ids))}) ORDER BY id FOR UPDATE", tuple(row_ids))
+    return {row[0]: dict(zip(columns, row[1:])) for row in cursor.fetchall()}
+
+
+def lock_trainees(cursor, trainee_ids):
+    """{id: counted columns} of the trainees that exist, locked in id order"""
+    return _lock_rows(cursor, 'trainees', TRAINEE_STAT_COLUMNS, trainee_ids)
+
+
+def lock_trainings(cursor, training_ids):
+    """{id: counted columns} of the trainings that exist, locked in id order"""
+    return _lock_rows(cursor, 'trainings', TRAINING_STAT_COLUMNS, training_ids)
+
+
+def trainee_deltas(old=None, new=None):
+    return _deltas(old, new, TRAINEE_METRICS, 'registered_by')
+
+
+def training_deltas(old=None, new=None):
+    return _deltas(old, new, TRAINING_METRICS, 'conducted_by')
+
+
+def trainee_changed(cursor, old=None, new=None):
+    """Record an inserted (old=None), edited or deleted (new=None) trainee"""
+    apply_deltas(cursor, trainee_deltas(old, new))
+    apply_report_deltas(cursor, TRAINEE_REPORT, report_deltas(TRAINEE_REPORT, old, new))
+
+
+def _batch_changed(cursor, changes, deltas_for, report):
+    deltas = Counter()
+    summaries = {}
+    for old, new in changes:
+        deltas.update(deltas_for(old, new))
+        merge_deltas(summaries, report_deltas(report, old, new))
+    apply_deltas(cursor, deltas)
+    apply_report_deltas(cursor, report, summaries)
+
+
+def trainees_inserted(cursor, rows):
+    """Record a batch of inserted trainees with one statement per table"""
+    trainees_changed(cursor, [(None, row) for row in rows])
+
+
+def trainees_changed(cursor, changes):
+    """Record a batch of (old, new) trainee changes with one statement per table"""
+    _batch_changed(cursor, changes, trainee_deltas, TRAINEE_REPORT)
+
+
+def trainings_changed(cursor, changes):
+    """Record a batch of (old, new) training changes with one statement per table"""
+    _batch_changed(cursor, changes, training_deltas, TRAINING_REPORT)
+
+
+def training_changed(cursor, old=None, new=None):
+    """Record an inserted (old=None), edited or deleted (new=None) training"""
+    apply_deltas(cursor, training_deltas(old, new))
+    apply_report_deltas(cursor, TRAINING_REPORT, report_deltas(TRAINING_REPORT, old, new))
+
+
+def professional_added(cursor):
+    apply_deltas(cursor, Counter({(ALL_OWNERS_ID, 'professionals', ''): 1}))
+
+
+def professional_removed(cursor, user_id):
+    """Remove a professional and everything their delete cascades to (their trainees and trainings)"""
+    # Subtracted through apply_deltas rather than a multi-table UPDATE, which SQLite lacks
+    cursor.execute("SELECT metric, bucket, value FROM stat_rollups WHERE owner_id = %s FOR UPDATE", (user_id,))
+    deltas = Counter({(ALL_OWNERS_ID, metric, bucket): -value for metric, bucket, value in cursor.fetchall()})
+    cursor.execute("DELETE FROM stat_rollups WHERE owner_id = %s", (user_id,))
+    remove_owner(cursor, user_id)
+    deltas[(ALL_OWNERS_ID, 'professionals', '')] -= 1
+    apply_deltas(cursor, deltas)
+
+
+def _rebuild_selects(table, owner_column, metrics):
+    selects = []
+    for metric, bucket_column, flag in metrics:
+        bucket = "''" if bucket_column is None else f"COALESCE({bucket_column}, '')"
+        where = f" WHERE {flag}" if flag else ''
+        for owner in (None, owner_column):
+            group_by = [column for column in (owner, bucket_column and bucket) if column]
+            group_sql = f" GROUP BY {', '.join(group_by)}" if group_by else ''
+            selects.append(f"SELECT {owner or ALL_OWNERS_ID}, '{metric}', {bucket}, COUNT(*) "
+                           f"FROM {table}{where}{group_sql}")
+    return selects
+
+
+def rebuild(connection):
+    """Recompute stat_rollups from the base tables in one transaction"""
+    selects = _rebuild_selects('trainees', 'registered_by', TRAINEE_METRICS)
+    selects += _rebuild_selects('trainings', 'conducted_by', TRAINING_METRICS)
+    selects.append(f"SELECT {ALL_OWNERS_ID}, 'professionals', '', COUNT(*) FROM users WHERE role = 'professional'")
+    cursor = connection.cursor()
+    try:
+        connection.start_transaction()
+        cursor.execute("DELETE FROM stat_rollups")
+        cursor.execute("INSERT INTO stat_rollups (owner_id, metric, bucket, value) " + ' UNION ALL '.join(selects))
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def read_stats(cursor, owner_id=ALL_OWNERS_ID):
+    """Stats document for /api/stats from the rollup rows of one owner"""
+    cursor.execute("SELECT metric, bucket, value FROM stat_rollups WHERE owner_id = %s", (owner_id,))
+    values = {(metric, bucket): int(value) for metric, bucket, value in cursor.fetchall()}
+
+    def breakdown(metric):
+        return {bucket: value for (m, bucket), value in sorted(values.items()) if m == metric and value}
+
+    stats = {
+        'trainees': {
+            'total': values.get(('trainees', ''), 0),
+            **{flag: values.get((f"trainees.{flag}", ''), 0) for flag in SKILL_FLAGS},
+            'by_block': breakdown('trainees.block'),
+            'by_department': breakdown('trainees.department'),
+        },
+        'trainings': {
+            'total': values.get(('trainings', ''), 0),
+            'by_status': breakdown('trainings.status'),
+            'by_block': breakdown('trainings.block'),
+        },
+    }
+    if owner_id == ALL_OWNERS_ID:
+        stats['professionals'] = {'total': values.get(('professionals', ''), 0)}
+    return stats
@@ -0,0 +1,180 @@
+"""Ranked search behind /api/search.
+
+Text is matched through the FULLTEXT indexes added in migration 0006 in
+boolean mode, every word of the query becoming a required prefix term
+(``+word*``), so "raj kum" finds "Rajesh Kumar". Rows whose name starts with
+the query rank above other matches. A query made only of digits is treated
+as a mobile number prefix and served by the mobile_number B-tree index.
+On SQLite (DB_BACKEND=sqlite), which has no MATCH ... AGAINST, every word
+must instead start a word of one of the text columns (LIKE 'word%' or
+'% word%'), and only the name prefix ranks.
+Trainees and trainings are scoped to their owner for professionals;
+professionals are only searched for admins.
+"""
+import re
+
+SEARCH_TYPES = ('trainees', 'trainings', 'professionals')
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MAX_TERMS = 8
+MIN_QUERY_LENGTH = 2
+MIN_MOBILE_PREFIX = 3
+# Characters with a meaning in boolean-mode MATCH ... AGAINST
+BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+
+
+class SearchParamError(ValueError):
+    """Raised for malformed search parameters"""
+
+
+class SearchSpec:
+    """One searchable table: its FULLTEXT columns, the columns returned and the owner column"""
+
+    def __init__(self, table, alias, text_columns, name_column, select, owner_column, mobile_column=None):
+        self.table = table
+        self.alias = alias
+        self.text_columns = text_columns
+        self.name_column = name_column
+        self.select = select
+        self.owner_column = owner_column
+        self.mobile_column = mobile_column
+
+
+SEARCH_SPECS = {
+    'trainees': SearchSpec(
+        table='trainees', alias='t',
+        text_columns=('t.name', 't.address', 't.department'),
+        name_column='t.name',
+        select=('t.id, t.name, t.mobile_number, t.department, t.address, t.block, t.training_date, '
+                't.registered_by'),
+        owner_column='t.registered_by',
+        mobile_column='t.mobile_number',
+    ),
+    'trainings': SearchSpec(
+        table='trainings', alias='t',
+        text_columns=('t.title', 't.training_topic', 't.description'),
+        name_column='t.title',
+        select=('t.id, t.title, t.training_topic, t.block, t.training_date, t.training_time, t.status, '
+                't.conducted_by'),
+        owner_column='t.conducted_by',
+    ),
+    'professionals': SearchSpec(
+        table='users', alias='u',
+        text_columns=('u.name', 'u.specialization'),
+        name_column='u.name',
+        select='u.id, u.name, u.designation, u.department, u.specialization, u.mobile_number',
+        owner_column=None,
+        mobile_column='u.mobile_number',
+    ),
+}
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_words(q):
+    """Words of ``q`` with boolean operators stripped"""
+    words = [BOOLEAN_OPERATORS.sub('', word) for word in q.split()]
+    return [word for word in words if word]
+
+
+def boolean_query(q):
+    """``+word*`` for every word of ``q`` with boolean operators stripped; '' if nothing is left"""
+    return ' '.join(f"+{word}*" for word in search_words(q))
+
+
+def _like_match(spec, words):
+    # Without a FULLTEXT index: each word has to start a word of some text column
+    terms = []
+    params = []
+    for word in words:
+        pattern = _escape_like(word)
+        terms.append('(' + ' OR '.join(f"{column} LIKE %s ESCAPE '\\' OR {column} LIKE %s ESCAPE '\\'"
+                                       for column in spec.text_columns) + ')')
+        params += [pattern + '%', '% ' + pattern + '%'] * len(spec.text_columns)
+    return ' AND '.join(terms), params
+
+
+def parse_search_args(args):
+    """(q, types, limit) from the request arguments"""
+    q = ' '.join((args.get('q') or '').split())
+    if len(q) < MIN_QUERY_LENGTH:
+        raise SearchParamError(f"q must be at least {MIN_QUERY_LENGTH} characters")
+    if len(q.split()) > MAX_TERMS:
+        raise SearchParamError(f"q may contain at most {MAX_TERMS} words")
+
+    types = args.get('types')
+    if types:
+        types = [name.strip() for name in types.split(',') if name.strip()]
+        unknown = [name for name in types if name not in SEARCH_TYPES]
+        if unknown:
+            raise SearchParamError(f"types must be a subset of: {', '.join(SEARCH_TYPES)}")
+    else:
+        types = list(SEARCH_TYPES)
+
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise SearchParamError('Limit must be an integer')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise SearchParamError(f"Limit must be between 1 and {MAX_LIMIT}")
+    return q, types, limit
+
+
+def _search_query(spec, q, owner_id, limit, dialect='mysql'):
+    alias = spec.alias
+    where = []
+    params = []
+    if q.isdigit() and spec.mobile_column:
+        if len(q) < MIN_MOBILE_PREFIX:
+            return None
+        score = '1'
+        score_params = []
+        where.append(f"{spec.mobile_column} LIKE %s")
+        params.append(q + '%')
+        order = f"{spec.mobile_column}, {alias}.id"
+    elif dialect == 'sqlite':
+        words = search_words(q)
+        if not words:
+            return None
+        match, match_params = _like_match(spec, words)
+        score = f"({spec.name_column} LIKE %s ESCAPE '\\')"
+        score_params = [_escape_like(q) + '%']
+        where.append(match)
+        params += match_params
+        order = f"score DESC, {alias}.id DESC"
+    else:
+        against = boolean_query(q)
+        if not against:
+            return None
+        match = f"MATCH({', '.join(spec.text_columns)}) AGAINST (%s IN BOOLEAN MODE)"
+        score = f"{match} + ({spec.name_column} LIKE %s)"
+        score_params = [against, _escape_like(q) + '%']
+        where.append(match)
+        params.append(against)
+        order = f"score DESC, {alias}.id DESC"
+    if spec.table == 'users':
+        where.append("u.role = 'professional'")
+    if owner_id is not None:
+        where.append(f"{spec.owner_column} = %s")
+        params.append(owner_id)
+    sql = (f"SELECT {spec.select}, {score} AS score FROM {spec.table} {alias} "
+           f"WHERE {' AND '.join(where)} ORDER BY {order} LIMIT %s")
+    return sql, score_params + params + [limit]
+
+
+def build_search_queries(args, owner_id=None, dialect='mysql'):
+    """(type, sql, params) for every table to search; ``owner_id`` None searches everything (admin).
+
+    ``dialect`` is the SQL dialect of the connection they will run on ('mysql' or 'sqlite').
+    """
+    q, types, limit = parse_search_args(args)
+    queries = []
+    for name in types:
+        if name == 'professionals' and owner_id is not None:
+            continue
+        query = _search_query(SEARCH_SPECS[name], q, owner_id, limit, dialect)
+        if query:
+            queries.append((name, *query))
+    return queries
@@ -0,0 +1,257 @@
+"""Synthetic professionals, trainees and trainings at production scale.
+
+Values follow skewed distributions rather than uniform ones. A few blocks
+and departments hold most trainees. Professional activity follows a Zipf
+law, so a handful of professionals own large shares of the rows. Training
+dates lean towards recent months. For a given random seed the generated
+rows are always the same, so runs on different commits see identical data.
+
+Rows go in with multi-row INSERTs of ``chunk_size`` rows, each committed on
+its own. With method 'load-data' every chunk is written to a tab-separated
+file and loaded with LOAD DATA LOCAL INFILE. That needs local_infile=ON on
+the server and a connection opened with allow_local_infile=True.
+Foreign-key and unique checks are switched off for the session while
+loading, because the generator only uses ids it has just read back.
+
+Seeded professionals have usernames starting with SEED_USERNAME_PREFIX and,
+like real ones, log in with their mobile number. clear() deletes them and
+everything they own. Seeding bypasses the handlers, so afterwards the stat
+rollups and report summaries are rebuilt and the table versions bumped.
+"""
+import bisect
+import itertools
+import os
+import random
+import tempfile
+from datetime import date, datetime, timedelta
+
+import reports
+import rollups
+from table_versions import touch_tables
+
+SEED_USERNAME_PREFIX = 'seed_'
+SEED_USERNAME_LIKE = 'seed\\_%'
+INSERT = 'insert'
+LOAD_DATA = 'load-data'
+METHODS = (INSERT, LOAD_DATA)
+DEFAULT_CHUNK = {INSERT: 1000, LOAD_DATA: 100000}
+DELETE_BATCH = 10000
+
+# Fixed so that the same seed always produces the same rows
+FIRST_DATE = date(2022, 1, 1)
+LAST_DATE = date(2026, 6, 30)
+STATUS_CUTOFF = date(2026, 1, 1)
+
+BLOCK_WEIGHTS = (('Raipur', 34), ('Bilaspur', 21), ('Durg', 18), ('Raigarh', 12), ('Bastar', 9), ('Surguja', 6))
+DEPARTMENT_WEIGHTS = (
+    ('Emergency', 28), ('General Medicine', 17), ('Nursing', 14), ('Pediatrics', 9), ('Surgery', 8),
+    ('Cardiology', 6), ('Gynecology', 5), ('Orthopedics', 4), ('Community Health', 4), ('Police', 2),
+    ('Education', 2), ('Administration', 1),
+)
+GENDER_WEIGHTS = (('Female', 50), ('Male', 48), ('Other', 2))
+DESIGNATIONS = ('Staff Nurse', 'Paramedic', 'Ward Assistant', 'ASHA Worker', 'Lab Technician', 'Pharmacist',
+                'Emergency Responder', 'Constable', 'Teacher', 'Volunteer')
+TOPICS = ('CPR & Life Support', 'First Aid', 'Emergency Response', 'Trauma Care', 'Cardiac Care',
+          'Pediatric Care', 'Disaster Management', 'Basic Life Support')
+SPECIALIZATIONS = ('Trauma & Critical Care', 'Interventional Cardiology', 'Neonatal Care', 'Public Health',
+                   'Emergency Medicine', 'Joint Replacement', 'Hospital Management')
+PLACES = ('District Hospital', 'Community Health Center', 'Primary Health Center', 'Medical College',
+          'Police Lines', 'Government School', 'Panchayat Bhawan', 'Railway Hospital')
+FIRST_NAMES = ('Aarav', 'Aditi', 'Amit', 'Anjali', 'Arjun', 'Deepak', 'Divya', 'Gaurav', 'Kavita', 'Kiran',
+               'Manoj', 'Meena', 'Neha', 'Pooja', 'Priya', 'Rahul', 'Rajesh', 'Ramesh', 'Ritu', 'Rohit',
+               'Sanjay', 'Seema', 'Sunil', 'Sunita', 'Suresh', 'Swati', 'Vikram', 'Vinod')
+LAST_NAMES = ('Agrawal', 'Baghel', 'Chandrakar', 'Dewangan', 'Gupta', 'Kumar', 'Netam', 'Patel', 'Sahu',
+              'Sharma', 'Singh', 'Sinha', 'Soni', 'Tiwari', 'Verma', 'Yadav')
+
+PROFESSIONAL_COLUMNS = ('name', 'username', 'password', 'mobile_number', 'gender', 'age', 'role', 'designation',
+                        'department', 'specialization', 'experience_years', 'created_at')
+TRAINEE_COLUMNS = ('name', 'mobile_number', 'gender', 'age', 'department', 'designation', 'address', 'block',
+                   'training_date', 'cpr_training', 'first_aid_kit_given', 'life_saving_skills', 'registered_by',
+                   'created_at')
+TRAINING_COLUMNS = ('title', 'description', 'training_topic', 'address', 'block', 'training_date', 'training_time',
+                    'duration_hours', 'max_trainees', 'current_trainees', 'status', 'conducted_by', 'created_at')
+
+
+class Weighted:
+    """Repeated weighted choice in O(log n) per draw"""
+
+    def __init__(self, pairs):
+        pairs = list(pairs)
+        self.values = [value for value, _ in pairs]
+        self.cumulative = list(itertools.accumulate(weight for _, weight in pairs))
+
+    def __call__(self, rng):
+        return self.values[bisect.bisect_right(self.cumulative, rng.random() * self.cumulative[-1])]
+
+
+def zipf(values, exponent, rng):
+    """Weighted choice over ``values`` in random rank order, rank r weighing 1 / r ** exponent"""
+    ranked = list(values)
+    rng.shuffle(ranked)
+    return Weighted((value, 1 / rank ** exponent) for rank, value in enumerate(ranked, 1))
+
+
+class Generator:
+    """Deterministic row factories for one seeding run"""
+
+    def __init__(self, random_seed=42):
+        self.rng = random.Random(random_seed)
+        self.block = Weighted(BLOCK_WEIGHTS)
+        self.department = Weighted(DEPARTMENT_WEIGHTS)
+        self.gender = Weighted(GENDER_WEIGHTS)
+        self.span = (LAST_DATE - FIRST_DATE).days
+
+    def name(self):
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+    def mobile(self):
+        return str(self.rng.randint(6000000000, 9999999999))
+
+    def age(self, mean, low, high):
+        return min(high, max(low, int(self.rng.gauss(mean, 9))))
+
+    def day(self):
+        # sqrt skews towards the end of the range: recent months hold more rows
+        return FIRST_DATE + timedelta(days=int(self.span * self.rng.random() ** 0.5))
+
+    def created_at(self, day):
+        return datetime(day.year, day.month, day.day) - timedelta(seconds=self.rng.randint(0, 14 * 86400))
+
+    def professional(self, n):
+        mobile = self.mobile()
+        return (f"Dr. {self.name()}", f"{SEED_USERNAME_PREFIX}{n}", mobile, mobile, self.gender(self.rng),
+                self.age(42, 27, 65), 'professional', 'Consultant', self.department(self.rng),
+                self.rng.choice(SPECIALIZATIONS), self.rng.randint(1, 30),
+                self.created_at(FIRST_DATE + timedelta(days=self.rng.randint(0, 365))))
+
+    def trainee(self, owner):
+        day = self.day()
+        rng = self.rng
+        return (self.name(), self.mobile(), self.gender(rng), self.age(32, 18, 65), self.department(rng),
+                rng.choice(DESIGNATIONS), f"{rng.choice(PLACES)}, Ward {rng.randint(1, 40)}", self.block(rng),
+                day, rng.random() < 0.6, rng.random() < 0.45, rng.random() < 0.35, owner(rng), self.created_at(day))
+
+    def training(self, owner):
+        day = self.day()
+        rng = self.rng
+        topic = rng.choice(TOPICS)
+        if day < STATUS_CUTOFF:
+            status = 'Cancelled' if rng.random() < 0.08 else 'Completed'
+        else:
+            status = 'Ongoing' if day < STATUS_CUTOFF + timedelta(days=30) else 'Planned'
+        return (f"{topic} Session", f"{topic} training for frontline staff", topic,
+                f"{rng.choice(PLACES)}, Hall {rng.randint(1, 5)}", self.block(rng), day,
+                f"{rng.randint(8, 16):02d}:{rng.choice(('00', '30'))}:00", rng.choice((2, 3, 4, 6, 8)),
+                rng.choice((20, 25, 30, 40, 50)), 0, status, owner(rng), self.created_at(day))
+
+
+def _tsv_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    text = value.isoformat(sep=' ') if isinstance(value, datetime) else str(value)
+    return text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+
+def insert_rows(cursor, table, columns, rows, method=INSERT):
+    """Write ``rows`` with one multi-row INSERT or one LOAD DATA LOCAL INFILE"""
+    if method == LOAD_DATA:
+        handle, path = tempfile.mkstemp(prefix=f"seed-{table}-", suffix='.tsv')
+        try:
+            with os.fdopen(handle, 'w', encoding='utf-8') as f:
+                for row in rows:
+                    f.write('\t'.join(_tsv_value(value) for value in row) + '\n')
+            cursor.execute(f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+                           f"({', '.join(columns)})", (path,))
+        finally:
+            os.remove(path)
+    else:
+        placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        cursor.execute(f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([placeholders] * len(rows))}",
+                       [value for row in rows for value in row])
+
+
+def _insert_generated(cursor, table, columns, total, make, chunk_size, method, log):
+    for start in range(0, total, chunk_size):
+        count = min(chunk_size, total - start)
+        insert_rows(cursor, table, columns, [make() for _ in range(count)], method)
+        if log:
+            log(f"{table}: {start + count} of {total}")
+
+
+def seed_professional_ids(cursor):
+    cursor.execute("SELECT id FROM users WHERE username LIKE %s ORDER BY id", (SEED_USERNAME_LIKE,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def seed(connection, professionals, trainees, trainings, chunk_size=None, method=INSERT, random_seed=42,
+         skew=1.1, log=None):
+    """Append seeded rows (the connection must be in autocommit mode), then refresh the derived tables"""
+    if method not in METHODS:
+        raise ValueError(f"Method must be one of: {', '.join(METHODS)}")
+    chunk_size = chunk_size or DEFAULT_CHUNK[method]
+    generator = Generator(random_seed)
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+        existing = seed_professional_ids(cursor)
+        # Number usernames after earlier runs so repeated runs append instead of colliding
+        cursor.execute("SELECT COALESCE(MAX(CAST(SUBSTRING(username, %s) AS UNSIGNED)), -1) + 1 FROM users "
+                       "WHERE username LIKE %s", (len(SEED_USERNAME_PREFIX) + 1, SEED_USERNAME_LIKE))
+        numbers = itertools.count(cursor.fetchone()[0])
+        _insert_generated(cursor, 'users', PROFESSIONAL_COLUMNS, professionals,
+                          lambda: generator.professional(next(numbers)), chunk_size, method, log)
+        owners = seed_professional_ids(cursor)
+        if (trainees or trainings) and not owners:
+            raise RuntimeError('Seeding trainees or trainings needs at least one professional')
+        if log and existing:
+            log(f"{len(existing)} professionals were already seeded; new rows are spread over all {len(owners)}")
+
+        owner = zipf(owners, skew, generator.rng) if owners else None
+        _insert_generated(cursor, 'trainees', TRAINEE_COLUMNS, trainees,
+                          lambda: generator.trainee(owner), chunk_size, method, log)
+        _insert_generated(cursor, 'trainings', TRAINING_COLUMNS, trainings,
+                          lambda: generator.training(owner), chunk_size, method, log)
+    finally:
+        cursor.execute("SET SESSION foreign_key_checks = 1, unique_checks = 1")
+        cursor.close()
+    refresh_derived(connection, log)
+
+
+def clear(connection, log=None):
+    """Delete the seeded professionals with their trainees and trainings, in batches"""
+    cursor = connection.cursor()
+    try:
+        owners = seed_professional_ids(cursor)
+        for start in range(0, len(owners), 1000):
+            batch = owners[start:start + 1000]
+            placeholders = ', '.join(['%s'] * len(batch))
+            for table, owner_column in (('trainees', 'registered_by'), ('trainings', 'conducted_by')):
+                while True:
+                    cursor.execute(f"DELETE FROM {table} WHERE {owner_column} IN ({placeholders}) "
+                                   f"LIMIT {DELETE_BATCH}", batch)
+                    if cursor.rowcount < DELETE_BATCH:
+                        break
+                    if log:
+                        log(f"{table}: deleted {DELETE_BATCH} more rows")
+            cursor.execute(f"DELETE FROM users WHERE id IN ({placeholders})", batch)
+        if log:
+            log(f"Removed {len(owners)} seeded professionals and their rows")
+    finally:
+        cursor.close()
+    refresh_derived(connection, log)
+
+
+def refresh_derived(connection, log=None):
+    """Rebuild rollups and report summaries, refresh optimizer statistics and bump the table versions"""
+    rollups.rebuild(connection)
+    reports.backfill(connection, log=log)
+    cursor = connection.cursor()
+    try:
+        cursor.execute("ANALYZE TABLE users, trainees, trainings")
+        cursor.fetchall()
+    finally:
+        cursor.close()
+    # Cached responses and ETags built before the seeding must not be served again
+    touch_tables(connection, 'users', 'trainees', 'trainings', 'training_enrollments')
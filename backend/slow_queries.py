@@ -0,0 +1,225 @@
+"""Slow-query log with sampled EXPLAIN capture.
+
+SlowQueryLog listens to every statement run through a TimedCursor (see
+db_timing.py). A statement whose execute + fetch time reaches
+SLOW_QUERY_MS is written as one JSON line to a rotating log file. The line
+holds the normalized SQL (literals and placeholders replaced by ?), the
+parameter types (never their values, which hold names and mobile numbers),
+the duration and the row count. A SLOW_QUERY_EXPLAIN_RATE share of them
+also carries the EXPLAIN FORMAT=JSON plan, taken on the same connection,
+and the full scans and filesorts found in it (MySQL connections only).
+
+Per-fingerprint totals are kept in memory for /api/slow_queries. Like the
+pool and cache counters they cover one worker process.
+"""
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+import db_timing
+from serialization import dumps
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+SLOW_QUERY_EXPLAIN_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_RATE', 0.1))
+SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', os.path.join(BACKEND_DIR, 'logs', 'slow_queries.log'))
+SLOW_QUERY_LOG_BYTES = int(os.environ.get('SLOW_QUERY_LOG_BYTES', 10 * 1024 * 1024))
+SLOW_QUERY_LOG_BACKUPS = int(os.environ.get('SLOW_QUERY_LOG_BACKUPS', 5))
+MAX_FINGERPRINTS = 1000
+
+EXPLAINABLE = re.compile(r'^\s*(SELECT|UPDATE|DELETE|INSERT|REPLACE)\b', re.IGNORECASE)
+STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+NUMBER_LITERAL = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+PLACEHOLDER = re.compile(r'%s|%\(\w+\)s')
+VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+REPEATED_TUPLES = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+
+
+def normalize(sql):
+    """Statement fingerprint: literals and placeholders become ?, IN lists and VALUES rows collapse"""
+    text = ' '.join(sql.split())
+    text = STRING_LITERAL.sub('?', text)
+    text = PLACEHOLDER.sub('?', text)
+    text = NUMBER_LITERAL.sub('?', text)
+    text = VALUE_LIST.sub('(...)', text)
+    return REPEATED_TUPLES.sub('(...), ...', text)
+
+
+def params_shape(params, many=False):
+    """Parameter types with runs collapsed, e.g. "int, str x3"; values are never logged"""
+    if params is None:
+        return None
+    if many:
+        params = list(params)
+        return f"{len(params)} x [{params_shape(params[0]) if params else ''}]"
+    if isinstance(params, dict):
+        return ', '.join(f"{key}: {type(value).__name__}" for key, value in sorted(params.items()))
+    runs = []
+    for value in params:
+        name = type(value).__name__
+        if runs and runs[-1][0] == name:
+            runs[-1][1] += 1
+        else:
+            runs.append([name, 1])
+    return ', '.join(name if count == 1 else f"{name} x{count}" for name, count in runs)
+
+
+def plan_problems(plan):
+    """Full scans and filesorts anywhere in an EXPLAIN FORMAT=JSON document"""
+    problems = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            table = node.get('table_name')
+            if table and node.get('access_type') == 'ALL' and not table.startswith('<'):
+                problems.append(f"full scan on {table} (~{node.get('rows_examined_per_scan')} rows)")
+            if node.get('using_filesort'):
+                problems.append('filesort')
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(plan)
+    return problems
+
+
+def explain(connection, sql, params):
+    """EXPLAIN FORMAT=JSON of ``sql`` on ``connection`` (untimed, so it is not logged itself)"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute('EXPLAIN FORMAT=JSON ' + sql, params)
+        row = cursor.fetchone()
+        cursor.fetchall()
+    finally:
+        cursor.close()
+    return json.loads(row[0]) if row else None
+
+
+class SlowQueryLog:
+    """Statement listener that logs slow statements and aggregates them by fingerprint"""
+
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, explain_rate=SLOW_QUERY_EXPLAIN_RATE,
+                 path=SLOW_QUERY_LOG, max_bytes=SLOW_QUERY_LOG_BYTES, backups=SLOW_QUERY_LOG_BACKUPS,
+                 app_logger=None):
+        self.threshold = threshold_ms / 1000
+        self.explain_rate = explain_rate
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.app_logger = app_logger
+        self.logger = None
+        self.pid = None
+        self.offenders = {}
+        self.lock = threading.Lock()
+        self.logged = 0
+        self.explained = 0
+        self.errors = 0
+
+    def install(self):
+        """Start listening to statements; a negative threshold disables the log"""
+        if self.threshold >= 0:
+            db_timing.add_statement_listener(self)
+
+    def _file_logger(self):
+        # One handler per worker process, and a file per process when the path
+        # contains {pid} (rotating one shared file from several processes can lose lines)
+        pid = os.getpid()
+        if self.pid != pid:
+            with self.lock:
+                if self.pid != pid:
+                    path = self.path.format(pid=pid)
+                    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                    logger = logging.getLogger(f"suraksha.slow_queries.{pid}")
+                    logger.propagate = False
+                    logger.setLevel(logging.INFO)
+                    for handler in list(logger.handlers):
+                        logger.removeHandler(handler)
+                    logger.addHandler(RotatingFileHandler(path, maxBytes=self.max_bytes,
+                                                          backupCount=self.backups, encoding='utf-8'))
+                    self.logger = logger
+                    self.offenders = {}
+                    self.pid = pid
+        return self.logger
+
+    def __call__(self, statement, connection):
+        if statement.duration < self.threshold:
+            return
+        try:
+            self.record(statement, connection)
+        except Exception as e:
+            # Never fail the request that ran the statement
+            self.errors += 1
+            if self.app_logger is not None:
+                self.app_logger.warning(f"Slow query log failed: {e}")
+
+    def record(self, statement, connection):
+        sql = normalize(statement.operation)
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'pid': os.getpid(),
+            'duration_ms': round(statement.duration * 1000, 3),
+            'rows': statement.rows,
+            'sql': sql,
+            'params': params_shape(statement.params, statement.many),
+        }
+        timings = db_timing.current()
+        if timings is not None and timings.request_id:
+            entry['request_id'] = timings.request_id
+
+        problems = None
+        if (connection is not None and not statement.many and EXPLAINABLE.match(statement.operation)
+                and random.random() < self.explain_rate and not getattr(connection, 'unread_result', False)
+                and getattr(connection, 'dialect', 'mysql') == 'mysql'):
+            plan = explain(connection, statement.operation, statement.params)
+            problems = plan_problems(plan)
+            entry['plan'] = plan
+            entry['problems'] = problems
+            self.explained += 1
+
+        logger = self._file_logger()
+        logger.info(dumps(entry).decode('utf-8'))
+        with self.lock:
+            self.logged += 1
+            offender = self.offenders.get(sql)
+            if offender is None:
+                if len(self.offenders) >= MAX_FINGERPRINTS:
+                    return
+                offender = self.offenders[sql] = {
+                    'sql': sql, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                    'params': entry['params'], 'problems': None, 'last_seen': None,
+                }
+            offender['count'] += 1
+            offender['total_ms'] += entry['duration_ms']
+            offender['max_ms'] = max(offender['max_ms'], entry['duration_ms'])
+            offender['rows'] += statement.rows
+            offender['last_seen'] = entry['ts']
+            if problems is not None:
+                offender['problems'] = problems
+
+    def top(self, limit=20):
+        """Fingerprints ordered by total time spent in them"""
+        with self.lock:
+            offenders = [dict(offender) for offender in self.offenders.values()]
+        offenders.sort(key=lambda offender: offender['total_ms'], reverse=True)
+        for offender in offenders:
+            offender['total_ms'] = round(offender['total_ms'], 3)
+            offender['avg_ms'] = round(offender['total_ms'] / offender['count'], 3)
+        return offenders[:limit]
+
+    def info(self):
+        return {
+            'threshold_ms': self.threshold * 1000,
+            'explain_rate': self.explain_rate,
+            'log': self.path.format(pid=os.getpid()),
+            'logged': self.logged,
+            'explained': self.explained,
+            'errors': self.errors,
+            'fingerprints': len(self.offenders),
+        }
@@ -0,0 +1,318 @@
+"""Embedded SQLite backend (DB_BACKEND=sqlite) for tests and in-process benchmarks.
+
+connect() returns a connection that behaves like a mysql.connector one as far
+as the handlers, the repository layer and the pool are concerned: cursor()
+with dictionary=True, start_transaction(), lastrowid of the first row of a
+multi-row INSERT, and mysql.connector errors (a duplicate key is still errno
+1062). The MySQL dialect used by this code base is translated once per
+statement text:
+
+- ``%s`` placeholders become ``?`` (and ``%%`` a literal ``%``)
+- FOR UPDATE / LOCK IN SHARE MODE are dropped; start_transaction() runs
+  BEGIN IMMEDIATE instead, so writers are serialized on the database lock
+- INSERT IGNORE becomes INSERT OR IGNORE, and ON DUPLICATE KEY UPDATE an
+  ON CONFLICT upsert
+- GREATEST, LEAST and DATE_FORMAT are provided as functions
+
+Connections carry ``dialect = 'sqlite'`` for the few queries that cannot be
+translated: search.py and reports.py build SQLite variants of full-text
+search (word-prefix LIKE matches) and of the week and quarter report buckets.
+EXPLAIN plans and the manage.py maintenance commands still need MySQL.
+
+The schema in database/sqlite_schema.sql, demo data included, is created on
+the first connect to an empty database. SQLITE_PATH=:memory: keeps the
+database in memory for the life of the process.
+"""
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+
+from mysql.connector import errors
+
+import reports
+import rollups
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'suraksha.sqlite3')
+SQLITE_PATH = os.environ.get('SQLITE_PATH', DEFAULT_PATH)
+SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 10))
+# sqlite3 keeps this many compiled statements per connection, keyed by SQL text
+SQLITE_STATEMENT_CACHE = int(os.environ.get('SQLITE_STATEMENT_CACHE', 256))
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'database', 'sqlite_schema.sql')
+
+PLACEHOLDER = re.compile(r'%([s%])')
+ROW_LOCK = re.compile(r'\s+(?:FOR UPDATE|LOCK IN SHARE MODE)\b', re.IGNORECASE)
+INSERT_IGNORE = re.compile(r'\bINSERT\s+IGNORE\b', re.IGNORECASE)
+ON_DUPLICATE = re.compile(r'\bON DUPLICATE KEY UPDATE\b', re.IGNORECASE)
+INSERTED_VALUE = re.compile(r'\bVALUES\((\w+)\)', re.IGNORECASE)
+QUALIFIED_TARGET = re.compile(r'(^|,)(\s*)\w+\.(\w+)(\s*=)')
+DERIVED_ALIAS = re.compile(r'\)\s+AS\s+(\w+)\s*$', re.IGNORECASE)
+IS_INSERT = re.compile(r'^\s*INSERT\b', re.IGNORECASE)
+IS_INSERT_SELECT = re.compile(r'^\s*INSERT\b[^(]*\([^)]*\)\s*SELECT\b', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def translate(operation, substitute):
+    """SQLite text of a MySQL statement; ``substitute`` when it is executed with parameters"""
+    sql = operation
+    if substitute:
+        sql = PLACEHOLDER.sub(lambda m: '?' if m.group(1) == 's' else '%', sql)
+    sql = ROW_LOCK.sub('', sql)
+    sql = INSERT_IGNORE.sub('INSERT OR IGNORE', sql)
+    match = ON_DUPLICATE.search(sql)
+    if match:
+        head, updates = sql[:match.start()].rstrip(), sql[match.end():]
+        updates = INSERTED_VALUE.sub(r'excluded.\1', updates)
+        # SET targets cannot be qualified in SQLite
+        updates = QUALIFIED_TARGET.sub(r'\1\2\3\4', updates)
+        alias = DERIVED_ALIAS.search(head)
+        if alias:
+            # INSERT ... SELECT * FROM (...) AS chunk: chunk's columns are the inserted row
+            updates = re.sub(rf'\b{alias.group(1)}\.', 'excluded.', updates)
+        if IS_INSERT_SELECT.search(head):
+            # Without a WHERE, SQLite would read ON CONFLICT as a join constraint
+            head += ' WHERE true'
+        sql = f"{head} ON CONFLICT DO UPDATE SET{updates}"
+    return sql
+
+
+def _error(e):
+    """mysql.connector error equivalent to a sqlite3 error"""
+    message = str(e)
+    if isinstance(e, sqlite3.IntegrityError):
+        if message.startswith('UNIQUE') or message.startswith('PRIMARY KEY'):
+            return errors.IntegrityError(msg=f"Duplicate entry: {message}", errno=1062)
+        if message.startswith('FOREIGN KEY'):
+            return errors.IntegrityError(msg=f"Cannot add or update a child row: {message}", errno=1452)
+        if message.startswith('NOT NULL'):
+            return errors.IntegrityError(msg=f"Column cannot be null: {message}", errno=1048)
+        if message.startswith('CHECK'):
+            return errors.DataError(msg=f"Data truncated: {message}", errno=1265)
+        return errors.IntegrityError(msg=message)
+    if isinstance(e, sqlite3.OperationalError):
+        if 'locked' in message or 'busy' in message:
+            return errors.OperationalError(msg=f"Lock wait timeout exceeded: {message}", errno=1205)
+        return errors.ProgrammingError(msg=message, errno=1064)
+    return errors.DatabaseError(msg=message)
+
+
+def _call(function, *args, **kwargs):
+    try:
+        return function(*args, **kwargs)
+    except sqlite3.Error as e:
+        raise _error(e) from e
+
+
+def _greatest(*values):
+    return None if any(value is None for value in values) else max(values)
+
+
+def _least(*values):
+    return None if any(value is None for value in values) else min(values)
+
+
+def _date_format(value, pattern):
+    # MySQL's %Y, %m and %d mean the same to strftime
+    if value is None:
+        return None
+    return datetime.fromisoformat(str(value)).strftime(pattern)
+
+
+def _time(value):
+    hours, minutes, seconds = (value.decode().split(':') + ['0', '0'])[:3]
+    return timedelta(hours=int(hours), minutes=int(minutes), seconds=float(seconds))
+
+
+def _format_time(value):
+    seconds = int(value.total_seconds())
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+# Column values come back as the types mysql.connector returns
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()[:10]))
+sqlite3.register_converter('DATETIME', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('TIME', _time)
+sqlite3.register_converter('DECIMAL', lambda value: Decimal(value.decode()))
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(timedelta, _format_time)
+sqlite3.register_adapter(Decimal, str)
+
+
+class SQLiteCursor:
+    """mysql.connector-style cursor over a sqlite3 cursor"""
+
+    def __init__(self, connection, dictionary=False):
+        self._connection = connection
+        self._cursor = connection.raw.cursor()
+        self._dictionary = dictionary
+        self.lastrowid = 0
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def with_rows(self):
+        return self._cursor.description is not None
+
+    def _first_insert_id(self, sql, last_id):
+        # MySQL reports the id of the first row a multi-row INSERT added
+        if not IS_INSERT.match(sql) or self._cursor.rowcount <= 0:
+            return 0
+        return last_id - self._cursor.rowcount + 1
+
+    def execute(self, operation, params=(), multi=False):
+        sql = translate(operation, bool(params))
+        _call(self._cursor.execute, sql, tuple(params) if params else ())
+        self.lastrowid = self._first_insert_id(sql, self._cursor.lastrowid)
+
+    def executemany(self, operation, seq_params):
+        sql = translate(operation, True)
+        _call(self._cursor.executemany, sql, [tuple(params) for params in seq_params])
+        last_id = self._connection.raw.execute('SELECT last_insert_rowid()').fetchone()[0]
+        self.lastrowid = self._first_insert_id(sql, last_id)
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip(self.column_names, row))
+
+    def fetchone(self):
+        return self._row(_call(self._cursor.fetchone))
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in _call(self._cursor.fetchmany, size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in _call(self._cursor.fetchall)]
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """mysql.connector-style connection in autocommit mode, like the pooled MySQL connections"""
+
+    unread_result = False
+    dialect = 'sqlite'
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._closed = False
+
+    def cursor(self, dictionary=False, prepared=False, buffered=None, **kwargs):
+        # sqlite3 already reuses compiled statements by SQL text, so prepared needs nothing extra
+        return SQLiteCursor(self, dictionary)
+
+    def start_transaction(self):
+        _call(self.raw.execute, 'BEGIN IMMEDIATE')
+
+    @property
+    def in_transaction(self):
+        return self.raw.in_transaction
+
+    def commit(self):
+        _call(self.raw.commit)
+
+    def rollback(self):
+        _call(self.raw.rollback)
+
+    def consume_results(self):
+        pass
+
+    def is_connected(self):
+        return not self._closed
+
+    def ping(self, reconnect=False):
+        if self._closed:
+            raise errors.InterfaceError(msg='Connection is closed')
+        _call(self.raw.execute, 'SELECT 1')
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.raw.close()
+
+
+_memory_anchors = {}
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+
+def _schema_statements():
+    with open(SCHEMA_PATH, encoding='utf-8') as f:
+        statement = ''
+        for line in f:
+            statement += line
+            if sqlite3.complete_statement(statement):
+                yield statement
+                statement = ''
+
+
+def create_schema(connection):
+    """Create the tables and demo data of an empty database, then fill the rollups; False if it had them"""
+    raw = connection.raw
+    connection.start_transaction()
+    try:
+        if raw.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'table_versions'").fetchone():
+            raw.rollback()
+            return False
+        for statement in _schema_statements():
+            raw.execute(statement)
+        raw.commit()
+    except sqlite3.Error as e:
+        raw.rollback()
+        raise _error(e) from e
+    rollups.rebuild(connection)
+    reports.backfill(connection)
+    return True
+
+
+def connect(database=SQLITE_PATH, **options):
+    """Open a connection, creating the schema on first use.
+
+    MySQL-only options passed by the pool (autocommit, connection_timeout,
+    charset, ...) are ignored; connections always run in autocommit mode.
+    """
+    if database == ':memory:':
+        target = f"file:suraksha-{os.getpid()}?mode=memory&cache=shared"
+    else:
+        target = database
+    uri = target.startswith('file:')
+    raw = _call(sqlite3.connect, target, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None,
+                detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False,
+                cached_statements=SQLITE_STATEMENT_CACHE, uri=uri)
+    raw.execute('PRAGMA foreign_keys = ON')
+    if not uri:
+        raw.execute('PRAGMA journal_mode = WAL')
+        raw.execute('PRAGMA synchronous = NORMAL')
+    raw.create_function('GREATEST', -1, _greatest, deterministic=True)
+    raw.create_function('LEAST', -1, _least, deterministic=True)
+    raw.create_function('DATE_FORMAT', 2, _date_format, deterministic=True)
+    connection = SQLiteConnection(raw)
+
+    if target not in _schema_ready:
+        with _schema_lock:
+            if uri and target not in _memory_anchors:
+                # An in-memory database lives as long as one connection to it stays open
+                _memory_anchors[target] = sqlite3.connect(target, uri=True, check_same_thread=False)
+            if target not in _schema_ready:
+                create_schema(connection)
+                _schema_ready.add(target)
+    return connection
+
@@ -0,0 +1,166 @@
+"""Idempotency keys behind /api/sync (batched writes queued by offline devices).
+
+A device queues create / edit / delete operations while it has no signal and
+sends them in batches once it does, every operation carrying a key the
+device generated. The result of each applied operation is stored under
+(user_id, key) in the transaction that applied it, so a batch resent after a
+timeout gets the stored results back instead of creating the rows again. The
+keys being read are locked until commit, which makes two replays of the same
+batch wait for each other rather than both apply.
+
+Keys expire SYNC_KEY_TTL_DAYS after they were stored; lookups ignore expired
+keys and ``manage.py prune-sync-keys`` deletes them.
+
+Edits and deletes name their row by ``id`` or, for rows created offline, by
+``ref``: the key of the create operation, in this batch or an earlier one.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+
+SYNC_MAX_OPERATIONS = int(os.environ.get('SYNC_MAX_OPERATIONS', 2000))
+SYNC_CHUNK_SIZE = int(os.environ.get('SYNC_CHUNK_SIZE', 200))
+SYNC_KEY_TTL_DAYS = float(os.environ.get('SYNC_KEY_TTL_DAYS', 7))
+MAX_KEY_LENGTH = 64
+DEFAULT_PRUNE_BATCH = 10000
+
+CREATE = 'create'
+EDIT = 'edit'
+REMOVE = 'delete'
+OPERATIONS = (CREATE, EDIT, REMOVE)
+ENTITIES = ('trainee', 'training')
+
+# Outcomes; all but CONFLICT and FAILED are stored and replayed
+CREATED = 'created'
+UPDATED = 'updated'
+DELETED = 'deleted'
+NOT_FOUND = 'not_found'
+REJECTED = 'rejected'
+CONFLICT = 'conflict'
+FAILED = 'failed'
+
+
+class OperationRejected(Exception):
+    """The operation cannot be applied; ``status`` is its outcome (REJECTED or NOT_FOUND)"""
+
+    def __init__(self, message, status=REJECTED):
+        super().__init__(message)
+        self.status = status
+
+
+def _positive_int(value):
+    return not isinstance(value, bool) and str(value).isdigit() and int(value) > 0
+
+
+def fingerprint(operation):
+    """Hash of what an operation asks for, to spot a key reused for a different one"""
+    payload = [operation.get(field) for field in ('op', 'entity', 'id', 'ref', 'data')]
+    text = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def parse_batch(data, default_user_id=None):
+    """(user_id, operations) of a {"user_id": ..., "operations": [...]} payload; raises ValueError.
+
+    Problems that leave an operation without a usable key fail the whole
+    batch. Anything else is reported per operation, as an 'error' entry the
+    caller turns into a REJECTED result.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Request body must be a JSON object')
+    user_id = data.get('user_id') or default_user_id
+    if not _positive_int(user_id):
+        raise ValueError('user_id must be a positive integer')
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        raise ValueError('operations must be a non-empty list')
+    if len(operations) > SYNC_MAX_OPERATIONS:
+        raise ValueError(f"At most {SYNC_MAX_OPERATIONS} operations per request")
+
+    parsed = []
+    seen = set()
+    for index, operation in enumerate(operations):
+        key = operation.get('key') if isinstance(operation, dict) else None
+        if not isinstance(key, str) or not key or len(key) > MAX_KEY_LENGTH:
+            raise ValueError(f"Operation {index + 1}: key must be a string of 1 to {MAX_KEY_LENGTH} characters")
+        if key in seen:
+            raise ValueError(f"Operation {index + 1}: key {key!r} is used more than once")
+        seen.add(key)
+        entry = {field: operation.get(field) for field in ('key', 'op', 'entity', 'id', 'ref', 'data')}
+        entry['hash'] = fingerprint(operation)
+        entry['error'] = _operation_error(entry)
+        if entry['id'] is not None and not entry['error']:
+            entry['id'] = int(entry['id'])
+        parsed.append(entry)
+    return int(user_id), parsed
+
+
+def _operation_error(operation):
+    if operation['op'] not in OPERATIONS:
+        return f"op must be one of: {', '.join(OPERATIONS)}"
+    if operation['entity'] not in ENTITIES:
+        return f"entity must be one of: {', '.join(ENTITIES)}"
+    if operation['op'] != REMOVE and not isinstance(operation['data'], dict):
+        return 'data must be an object'
+    if operation['op'] == CREATE:
+        return None
+    if (operation['id'] is None) == (operation['ref'] is None):
+        return 'Provide either id or ref'
+    if operation['id'] is not None and not _positive_int(operation['id']):
+        return 'id must be a positive integer'
+    if operation['ref'] is not None and not isinstance(operation['ref'], str):
+        return 'ref must be the key of a create operation'
+    return None
+
+
+def result(operation, status, **fields):
+    return {'key': operation['key'], 'status': status, **fields}
+
+
+def stored_results(cursor, user_id, keys, now=None):
+    """{key: (hash, result)} of the unexpired keys among ``keys``, locked until commit"""
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+    now = now or datetime.now().replace(microsecond=0)
+    cursor.execute(f"SELECT idempotency_key, request_hash, result FROM sync_keys "
+                   f"WHERE user_id = %s AND idempotency_key IN ({', '.join(['%s'] * len(keys))}) "
+                   f"AND expires_at > %s FOR UPDATE", (user_id, *keys, now))
+    return {key: (request_hash, json.loads(stored)) for key, request_hash, stored in cursor.fetchall()}
+
+
+def store_results(cursor, user_id, entries, now=None):
+    """Store (operation, result) entries; an expired key is overwritten"""
+    if not entries:
+        return
+    now = now or datetime.now().replace(microsecond=0)
+    expires_at = now + timedelta(days=SYNC_KEY_TTL_DAYS)
+    placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(entries))
+    params = []
+    for operation, outcome in entries:
+        params += [user_id, operation['key'], operation['hash'], json.dumps(outcome, default=str), now, expires_at]
+    cursor.execute(f"""
+        INSERT INTO sync_keys (user_id, idempotency_key, request_hash, result, created_at, expires_at)
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE request_hash = VALUES(request_hash), result = VALUES(result),
+            created_at = VALUES(created_at), expires_at = VALUES(expires_at)
+    """, params)
+
+
+def prune(connection, batch=DEFAULT_PRUNE_BATCH, log=None):
+    """Delete expired keys in batches"""
+    cursor = connection.cursor()
+    try:
+        now = datetime.now().replace(microsecond=0)
+        removed = 0
+        while True:
+            cursor.execute("DELETE FROM sync_keys WHERE expires_at <= %s LIMIT %s", (now, batch))
+            connection.commit()
+            removed += cursor.rowcount
+            if log:
+                log(f"Removed {removed} sync keys")
+            if cursor.rowcount < batch:
+                return removed
+    finally:
+        cursor.close()
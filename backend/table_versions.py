@@ -0,0 +1,35 @@
+"""Per-table version stamps used to build ETags for the list endpoints"""
+import hashlib
+
+
+def touch_tables(connection, *tables):
+    """Bump the version of every table a write touched (call before commit)"""
+    cursor = connection.cursor()
+    try:
+        for table in sorted(set(tables)):
+            cursor.execute("UPDATE table_versions SET version = version + 1 WHERE table_name = %s", (table,))
+    finally:
+        cursor.close()
+
+
+def read_versions(connection, tables):
+    """{table_name: version} for the given tables"""
+    cursor = connection.cursor()
+    try:
+        placeholders = ', '.join(['%s'] * len(tables))
+        cursor.execute(f"SELECT table_name, version FROM table_versions WHERE table_name IN ({placeholders})",
+                       tuple(tables))
+        return dict(cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def make_etag(path, params, versions):
+    """ETag value over the endpoint, its query parameters and the table versions it reads"""
+    digest = hashlib.sha1()
+    digest.update(path.encode('utf-8'))
+    for key, value in sorted(params):
+        digest.update(f"&{key}={value}".encode('utf-8'))
+    for table in sorted(versions):
+        digest.update(f"|{table}={versions[table]}".encode('utf-8'))
+    return digest.hexdigest()[:32]
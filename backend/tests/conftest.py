@@ -0,0 +1,105 @@
+"""Shared fixtures: the API on the embedded SQLite backend, so no MySQL server is needed.
+
+One database file is created per test run (schema and demo data included,
+see sqlite_backend.py). Tests share it, so each one creates and looks up its
+own rows by a unique name.
+"""
+import os
+import sys
+import tempfile
+import uuid
+
+# Before app is imported: it picks the backend at import time
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ['SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='suraksha-tests-'), 'suraksha.sqlite3')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pytest
+
+from app import create_app, get_db_connection
+
+PROFESSIONAL_ID = 2  # drsmith in the demo data
+OTHER_PROFESSIONAL_ID = 3  # drjohnson
+
+
+@pytest.fixture(scope='session')
+def app():
+    return create_app(warm=False)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def db():
+    """A pooled connection for reading the tables directly"""
+    connection = get_db_connection()
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def tag():
+    """Unique text to name this test's rows by"""
+    return f"t{uuid.uuid4().hex[:10]}"
+
+
+def trainee_payload(name, n=0, **fields):
+    return {
+        'name': name,
+        'mobile_number': f"8{n:09d}",
+        'gender': 'Female' if n % 2 else 'Male',
+        'age': 20 + n % 40,
+        'department': ('Emergency', 'Cardiology', 'Pediatrics')[n % 3],
+        'address': 'Test address',
+        'block': ('Raipur', 'Durg', 'Bastar')[n % 3],
+        'training_date': f"2024-{n % 12 + 1:02d}-{n % 28 + 1:02d}",
+        'cpr_training': n % 2 == 0,
+        'first_aid_kit_given': n % 3 == 0,
+        'life_saving_skills': ('yes', 'no', 'y', 'off')[n % 4],
+        'registered_by': PROFESSIONAL_ID,
+        **fields,
+    }
+
+
+def training_payload(title, max_trainees=50, **fields):
+    return {
+        'title': title,
+        'training_topic': 'CPR',
+        'address': 'Test hall',
+        'block': 'Raipur',
+        'training_date': '2024-07-15',
+        'training_time': '10:00:00',
+        'duration_hours': 2.5,
+        'max_trainees': max_trainees,
+        'conducted_by': PROFESSIONAL_ID,
+        **fields,
+    }
+
+
+@pytest.fixture
+def make_trainees(client):
+    """Register ``count`` trainees named ``{prefix} {n}`` in one bulk request; returns their ids"""
+    def make(prefix, count, **fields):
+        rows = [trainee_payload(f"{prefix} {n}", n, **fields) for n in range(count)]
+        response = client.post('/api/trainees/bulk', json=rows)
+        assert response.status_code == 200 and response.get_json()['accepted'] == count, response.get_json()
+        found = client.get('/api/get_trainees', query_string={'role': 'admin', 'search': prefix}).get_json()
+        ids = sorted(trainee['id'] for trainee in found['trainees'])
+        assert len(ids) == count
+        return ids
+    return make
+
+
+@pytest.fixture
+def make_training(client):
+    """Create a training; returns its id"""
+    def make(title, **fields):
+        response = client.post('/api/create_training', json=training_payload(title, **fields))
+        assert response.status_code == 200, response.get_json()
+        found = client.get('/api/get_trainings', query_string={'role': 'admin', 'search': title}).get_json()
+        (training,) = found['trainings']
+        return training['id']
+    return make
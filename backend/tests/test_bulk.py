@@ -0,0 +1,87 @@
+"""PATCH partial updates and the admin bulk status / delete endpoints"""
+from conftest import PROFESSIONAL_ID
+
+ADMIN = {'role': 'admin'}
+
+
+def trainee_rows(client, tag):
+    found = client.get('/api/get_trainees', query_string={**ADMIN, 'search': tag, 'sort': 'name'}).get_json()
+    return {row['id']: row for row in found['trainees']}
+
+
+def training_statuses(client, tag):
+    found = client.get('/api/get_trainings', query_string={**ADMIN, 'search': tag}).get_json()
+    return {row['title']: row['status'] for row in found['trainings']}
+
+
+def test_patch_writes_only_the_fields_sent(client, make_trainees, tag):
+    untouched_id, trainee_id = make_trainees(tag, 2)  # the second starts without cpr_training
+    before = trainee_rows(client, tag)
+
+    response = client.patch(f"/api/edit_trainee/{trainee_id}", json={'block': 'Bastar', 'cpr_training': 'yes'})
+    assert response.status_code == 200 and response.get_json()['updated'] == ['block', 'cpr_training']
+    after = trainee_rows(client, tag)
+    changed = {column for column in before[trainee_id] if before[trainee_id][column] != after[trainee_id][column]}
+    assert changed == {'block', 'cpr_training'}
+    assert after[trainee_id]['block'] == 'Bastar' and after[trainee_id]['cpr_training']
+    assert after[untouched_id] == before[untouched_id]
+
+    for body in ({'registered_by': 3}, {'name': ''}, {'block': 'Nowhere'}, {}, ['block']):
+        assert client.patch(f"/api/edit_trainee/{trainee_id}", json=body).status_code == 400, body
+    assert client.patch('/api/edit_trainee/999999999', json={'block': 'Durg'}).status_code == 404
+    assert trainee_rows(client, tag) == after
+
+
+def test_patch_professional_refuses_admin(client):
+    assert client.patch('/api/edit_professional/1', json={'department': 'Admin'}).status_code == 403
+
+
+def test_bulk_status_and_delete_report_each_id(client, make_trainees, make_training, tag):
+    ongoing = [make_training(f"{tag} ongoing {n}") for n in range(2)]
+    for training_id, status in zip(ongoing, ('Ongoing', 'Completed')):
+        assert client.patch(f"/api/edit_training/{training_id}", json={'status': status}).status_code == 200
+    planned = make_training(f"{tag} planned")
+
+    response = client.post('/api/trainings/bulk_status', query_string=ADMIN,
+                           json={'status': 'Completed', 'ids': [*ongoing, 999999999]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [(result['id'], result['status']) for result in body['results']] == [
+        (ongoing[0], 'updated'), (ongoing[1], 'unchanged'), (999999999, 'not_found')]
+    assert body['summary'] == {'updated': 1, 'unchanged': 1, 'not_found': 1}
+    assert training_statuses(client, tag) == {f"{tag} ongoing 0": 'Completed', f"{tag} ongoing 1": 'Completed',
+                                              f"{tag} planned": 'Planned'}
+
+    # A filter reaches only the matching rows
+    response = client.post('/api/trainings/bulk_delete', query_string=ADMIN,
+                           json={'filter': {'search': tag, 'status': 'Completed'}})
+    assert response.get_json()['summary'] == {'deleted': 2}
+    assert training_statuses(client, tag) == {f"{tag} planned": 'Planned'}
+
+    trainee_ids = make_trainees(tag, 3)
+    response = client.post('/api/trainees/bulk_delete', query_string=ADMIN, json={'ids': trainee_ids[:2]})
+    assert response.get_json()['summary'] == {'deleted': 2}
+    assert list(trainee_rows(client, tag)) == trainee_ids[2:]
+    assert planned in [row['id'] for row in client.get('/api/get_trainings', query_string={
+        **ADMIN, 'search': tag}).get_json()['trainings']]
+
+
+def test_bulk_endpoints_are_admin_only_and_need_a_target(client, make_trainees, make_training, tag):
+    (trainee_id,) = make_trainees(tag, 1)
+    training_id = make_training(tag)
+    professional = {'role': 'professional', 'user_id': PROFESSIONAL_ID}
+    requests = [('/api/trainings/bulk_status', {'status': 'Cancelled', 'ids': [training_id]}),
+                ('/api/trainings/bulk_delete', {'ids': [training_id]}),
+                ('/api/trainees/bulk_delete', {'ids': [trainee_id]})]
+    for path, body in requests:
+        assert client.post(path, query_string=professional, json=body).status_code == 403, path
+        assert client.post(path, json=body).status_code == 403, path
+    assert list(trainee_rows(client, tag)) == [trainee_id]
+    assert training_statuses(client, tag) == {tag: 'Planned'}
+
+    for body in ({}, {'ids': []}, {'ids': ['x']}, {'ids': [1], 'filter': {'block': 'Durg'}},
+                 {'filter': {'owner': 2}}, {'filter': {'search': ''}}):
+        response = client.post('/api/trainees/bulk_delete', query_string=ADMIN, json=body)
+        assert response.status_code == 400, body
+    assert client.post('/api/trainings/bulk_status', query_string=ADMIN,
+                       json={'status': 'Done', 'ids': [training_id]}).status_code == 400
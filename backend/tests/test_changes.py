@@ -0,0 +1,71 @@
+"""Delta sync through /api/changes"""
+import repository
+from conftest import OTHER_PROFESSIONAL_ID, PROFESSIONAL_ID, trainee_payload
+
+OWNER = {'role': 'professional', 'user_id': PROFESSIONAL_ID}
+
+
+def read_changes(client, since, limit=None):
+    """Follow next_cursor until has_more is false; returns ({table: (upserted rows, deleted ids)}, cursor)"""
+    collected = {}
+    while True:
+        params = {**OWNER, 'since': since}
+        if limit:
+            params['limit'] = limit
+        body = client.get('/api/changes', query_string=params).get_json()
+        assert body['success'], body
+        for table, change in body['changes'].items():
+            upserted, deleted = collected.setdefault(table, ({}, set()))
+            for row in change['upserted']:
+                upserted[row['id']] = row
+                deleted.discard(row['id'])
+            for row_id in change['deleted']:
+                upserted.pop(row_id, None)
+                deleted.add(row_id)
+        since = body['next_cursor']
+        if not body['has_more']:
+            return collected, since
+
+
+def test_changes_returns_rows_written_since_cursor(client, make_trainees, make_training, tag):
+    kept, removed = make_trainees(tag, 2)
+    cursor = client.get('/api/changes', query_string=OWNER).get_json()['next_cursor']
+
+    added = trainee_payload(f"{tag} added", 3)
+    assert client.post('/api/register_trainee', json=added).status_code == 200
+    assert client.patch(f"/api/edit_trainee/{kept}", json={'block': 'Surguja'}).status_code == 200
+    assert client.delete(f"/api/delete_trainee/{removed}").status_code == 200
+    training_id = make_training(tag)
+    # Another professional's row stays out of this professional's feed
+    other = trainee_payload(f"{tag} other", 4, registered_by=OTHER_PROFESSIONAL_ID)
+    assert client.post('/api/register_trainee', json=other).status_code == 200
+
+    for limit in (None, 1):
+        changes, next_cursor = read_changes(client, cursor, limit)
+        trainees, deleted_trainees = changes['trainees']
+        assert sorted(row['name'] for row in trainees.values()) == sorted([added['name'], f"{tag} 0"])
+        assert trainees[kept]['block'] == 'Surguja'
+        assert deleted_trainees == {removed}
+        assert list(changes['trainings'][0]) == [training_id]
+
+    changes, cursor = read_changes(client, next_cursor)
+    assert cursor == next_cursor
+    assert all(not upserted and not deleted for upserted, deleted in changes.values())
+
+
+def test_changes_rejects_malformed_cursor(client):
+    response = client.get('/api/changes', query_string={**OWNER, 'since': 'not-a-cursor'})
+    assert response.status_code == 400
+
+
+
+def test_professional_edit_that_updates_nothing_is_not_logged(client, monkeypatch):
+    admin = {'role': 'admin'}
+    cursor = client.get('/api/changes', query_string=admin).get_json()['next_cursor']
+    # MySQL reports 0 rows when the values are unchanged or the row went away after the role check
+    monkeypatch.setattr(repository.users, 'update_professional', lambda connection, user_id, values: 0)
+    response = client.put(f"/api/edit_professional/{OTHER_PROFESSIONAL_ID}", json={'name': 'Dr. Johnson'})
+    assert response.status_code == 404
+
+    body = client.get('/api/changes', query_string={**admin, 'since': cursor}).get_json()
+    assert body['next_cursor'] == cursor
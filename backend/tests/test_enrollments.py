@@ -0,0 +1,45 @@
+"""Enrollment capacity under concurrent requests (see enrollments.py)"""
+import threading
+
+CAPACITY = 5
+
+
+def test_concurrent_enrollments_never_exceed_capacity(app, make_trainees, make_training, tag):
+    trainee_ids = make_trainees(tag, 24)
+    training_id = make_training(tag, max_trainees=CAPACITY)
+    # Single trainees and pairs, all racing for the same seats
+    batches = [trainee_ids[i:i + 1] for i in range(8)] + [trainee_ids[i:i + 2] for i in range(8, 24, 2)]
+    barrier = threading.Barrier(len(batches))
+    responses = []
+
+    def enroll(batch):
+        client = app.test_client()
+        barrier.wait()
+        response = client.post(f"/api/trainings/{training_id}/enrollments?role=admin", json={'trainee_ids': batch})
+        responses.append((response.status_code, response.get_json()))
+
+    threads = [threading.Thread(target=enroll, args=(batch,)) for batch in batches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [status for status, _ in responses] == [200] * len(batches), responses
+    outcomes = [result['status'] for _, body in responses for result in body['results']]
+    assert outcomes.count('enrolled') == CAPACITY
+    assert outcomes.count('full') == len(trainee_ids) - CAPACITY
+    assert all(body['current_trainees'] <= CAPACITY for _, body in responses)
+
+    listing = app.test_client().get(f"/api/trainings/{training_id}/enrollments?role=admin").get_json()
+    assert listing['training']['current_trainees'] == CAPACITY
+    assert len(listing['trainees']) == CAPACITY
+
+
+def test_capacity_cannot_drop_below_enrolled(client, make_trainees, make_training, tag):
+    trainee_ids = make_trainees(tag, 3)
+    training_id = make_training(tag, max_trainees=CAPACITY)
+    client.post(f"/api/trainings/{training_id}/enrollments?role=admin", json={'trainee_ids': trainee_ids})
+
+    response = client.patch(f"/api/edit_training/{training_id}?role=admin", json={'max_trainees': 2})
+    assert response.status_code == 409
+    assert client.patch(f"/api/edit_training/{training_id}?role=admin", json={'max_trainees': 3}).status_code == 200
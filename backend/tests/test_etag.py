@@ -0,0 +1,53 @@
+"""Conditional GET on the list endpoints: ETags from the table version stamps"""
+import repository
+from conftest import PROFESSIONAL_ID, trainee_payload
+
+ADMIN = {'role': 'admin'}
+
+
+def test_unchanged_list_answers_304_without_querying(client, make_trainees, monkeypatch, tag):
+    make_trainees(tag, 2)
+    params = {**ADMIN, 'search': tag}
+    first = client.get('/api/get_trainees', query_string=params)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert etag.startswith('W/')
+
+    def no_query(*args):
+        raise AssertionError('a 304 must not run the list query')
+
+    monkeypatch.setattr(repository.lists, 'rows', no_query)
+    revalidated = client.get('/api/get_trainees', query_string=params, headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+    assert revalidated.headers['ETag'] == etag
+
+
+def test_etag_follows_writes_and_request_scope(client, make_trainees, make_training, tag):
+    (trainee_id,) = make_trainees(tag, 1)
+    params = {**ADMIN, 'search': tag}
+    etag = client.get('/api/get_trainees', query_string=params).headers['ETag']
+
+    # Other parameters (here the caller's scope) are another representation
+    scoped = client.get('/api/get_trainees', query_string={'role': 'professional', 'user_id': PROFESSIONAL_ID,
+                                                           'search': tag})
+    assert scoped.headers['ETag'] != etag
+
+    # Trainings are not part of the trainee list
+    make_training(tag)
+    assert client.get('/api/get_trainees', query_string=params,
+                      headers={'If-None-Match': etag}).status_code == 304
+
+    assert client.patch(f"/api/edit_trainee/{trainee_id}", json={'block': 'Bastar'}).status_code == 200
+    changed = client.get('/api/get_trainees', query_string=params, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert [row['block'] for row in changed.get_json()['trainees']] == ['Bastar']
+
+
+def test_data_export_is_conditional(client):
+    etag = client.get('/api/data').headers['ETag']
+    assert client.get('/api/data', headers={'If-None-Match': etag}).status_code == 304
+
+    assert client.post('/api/register_trainee', json=trainee_payload('etag data', 1)).status_code == 200
+    assert client.get('/api/data', headers={'If-None-Match': etag}).status_code == 200
@@ -0,0 +1,62 @@
+"""Live change events through /api/events"""
+import json
+
+import pytest
+
+from app import event_broker
+from conftest import OTHER_PROFESSIONAL_ID, PROFESSIONAL_ID, trainee_payload
+
+OWNER = {'role': 'professional', 'user_id': PROFESSIONAL_ID}
+
+
+def open_stream(client):
+    response = client.get('/api/events', query_string=OWNER, buffered=False)
+    assert response.status_code == 200
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b'retry:')
+    return response, chunks
+
+
+def test_events_stream_delivers_own_writes(client, tag):
+    response, chunks = open_stream(client)
+
+    other = trainee_payload(f"{tag} other", 1, registered_by=OTHER_PROFESSIONAL_ID)
+    assert client.post('/api/register_trainee', json=other).status_code == 200
+    assert client.post('/api/register_trainee', json=trainee_payload(tag, 2)).status_code == 200
+    (trainee_id,) = [row['id'] for row in client.get('/api/get_trainees', query_string={
+        **OWNER, 'search': tag}).get_json()['trainees'] if row['name'] == tag]
+
+    events = []
+    try:
+        # A local commit wakes the stream at once; a heartbeat instead means nothing arrived
+        while not any(event['id'] == trainee_id for event in events):
+            chunk = next(chunks).decode()
+            assert not chunk.startswith(':'), f"no event before the heartbeat, got {events}"
+            events += [json.loads(line[len('data: '):]) for line in chunk.splitlines() if line.startswith('data: ')]
+    finally:
+        response.close()
+
+    assert {'table': 'trainees', 'id': trainee_id, 'op': 'upsert'} in events
+    assert all(event['table'] != 'trainees' or event['id'] == trainee_id for event in events)
+
+
+def test_events_stream_unsubscribes_on_disconnect(client):
+    before = event_broker.info()['subscribers']
+    response, chunks = open_stream(client)
+    assert event_broker.info()['subscribers'] == before + 1
+
+    response.close()
+    assert event_broker.info()['subscribers'] == before
+
+
+def test_events_stream_ends_when_broker_closes(client):
+    before = event_broker.info()['subscribers']
+    response, chunks = open_stream(client)
+    try:
+        event_broker.close()
+        # Without the close this would wait out the heartbeat and send a ping
+        with pytest.raises(StopIteration):
+            next(chunks)
+        assert event_broker.info()['subscribers'] == before
+    finally:
+        response.close()
@@ -0,0 +1,78 @@
+"""Liveness and readiness probes over the cached database status (see health.py)"""
+import mysql.connector
+import pytest
+
+import app as backend
+from health import HealthMonitor
+
+
+class Database:
+    """Connects through the real pool until ``down`` is set"""
+
+    def __init__(self):
+        self.down = False
+
+    def connect(self):
+        if self.down:
+            raise mysql.connector.errors.InterfaceError(msg="Can't connect to MySQL server", errno=2003)
+        return backend.primary_pool().acquire()
+
+
+@pytest.fixture
+def database():
+    return Database()
+
+
+@pytest.fixture
+def monitor(database, monkeypatch):
+    """A fresh monitor in place of the app's; the first check runs here, so its thread only wakes after an hour"""
+    monitor = HealthMonitor(database.connect, interval=3600, max_age=3600, failure_threshold=2)
+    assert monitor.check()
+    monkeypatch.setattr(backend, 'health_monitor', monitor)
+    return monitor
+
+
+def probe(client, path):
+    response = client.get(path)
+    return response.status_code, response.get_json()
+
+
+def test_not_ready_while_warming_up(client, monitor):
+    status, body = probe(client, '/api/health/ready')
+    assert status == 503 and body['message'] == 'Warming up'
+    assert probe(client, '/api/health')[0] == 500
+    assert probe(client, '/api/health/live')[0] == 200
+
+    monitor.mark_warmed()
+    status, body = probe(client, '/api/health/ready')
+    assert status == 200 and body['status'] == 'OK' and body['database']['ok']
+    assert probe(client, '/api/health')[0] == 200
+
+
+def test_database_down_turns_not_ready_after_the_threshold(client, monitor, database, monkeypatch):
+    monitor.mark_warmed()
+    database.down = True
+    assert not monitor.check()
+    # One failed check is tolerated
+    assert probe(client, '/api/health/ready')[0] == 200
+
+    assert not monitor.check()
+    status, body = probe(client, '/api/health/ready')
+    assert status == 503 and body['status'] == 'ERROR'
+    assert "Can't connect" in body['message'] and body['database']['consecutive_failures'] == 2
+    assert probe(client, '/api/health')[0] == 500
+
+    # Liveness never touches the database
+    monkeypatch.setattr(backend, 'get_db_connection', lambda: pytest.fail('liveness opened a connection'))
+    assert probe(client, '/api/health/live')[0] == 200
+
+    database.down = False
+    assert monitor.check()
+    assert probe(client, '/api/health/ready')[0] == 200
+
+
+def test_stale_status_is_not_ready(client, monitor):
+    monitor.mark_warmed()
+    monitor.max_age = 0
+    status, body = probe(client, '/api/health/ready')
+    assert status == 503 and body['message'] == 'Database status is stale'
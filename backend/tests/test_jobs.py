@@ -0,0 +1,95 @@
+"""Background jobs: submit, poll, download and cancel through /api/jobs (see jobs.py)"""
+import csv
+import gzip
+import io
+
+import pytest
+
+import jobs
+from conftest import OTHER_PROFESSIONAL_ID, PROFESSIONAL_ID
+
+ADMIN = {'role': 'admin'}
+OWNER = {'role': 'professional', 'user_id': PROFESSIONAL_ID}
+EXPORT = {'kind': 'export', 'params': {'table': 'trainees', 'format': 'csv'}}
+
+
+@pytest.fixture(autouse=True)
+def job_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, 'JOB_DIR', str(tmp_path))
+    return tmp_path
+
+
+def submit(client, body, scope=ADMIN):
+    response = client.post('/api/jobs', query_string=scope, json=body)
+    assert response.status_code == 202, response.get_json()
+    job = response.get_json()['job']
+    assert response.headers['Location'] == f"/api/jobs/{job['id']}"
+    return job
+
+
+def poll(client, job_id, scope=ADMIN):
+    return client.get(f"/api/jobs/{job_id}", query_string=scope).get_json()['job']
+
+
+def run_next(db, job_id):
+    """Do what one `manage.py worker` loop iteration does, for the oldest queued job"""
+    job = jobs.claim(db, 'test-worker')
+    assert job is not None and job['id'] == job_id
+    return jobs.run(db, job)
+
+
+def test_export_job_lifecycle(client, db, job_dir):
+    job = submit(client, EXPORT)
+    assert job['status'] == 'queued' and job['progress'] == 0
+    assert client.get(f"/api/jobs/{job['id']}/download", query_string=ADMIN).status_code == 409
+
+    assert run_next(db, job['id']) == 'done'
+    finished = poll(client, job['id'])
+    assert finished['status'] == 'done' and finished['progress'] == 1.0
+    cursor = db.cursor()
+    cursor.execute("SELECT COUNT(*) FROM trainees")
+    (trainees,) = cursor.fetchone()
+    cursor.close()
+    assert finished['rows_written'] == trainees
+    assert [row['id'] for row in client.get('/api/jobs', query_string=ADMIN).get_json()['jobs']][0] == job['id']
+
+    response = client.get(f"/api/jobs/{job['id']}/download", query_string=ADMIN)
+    assert response.status_code == 200 and response.mimetype == 'application/gzip'
+    assert finished['artifact_bytes'] == len(response.data)
+    rows = list(csv.reader(io.StringIO(gzip.decompress(response.data).decode('utf-8'))))
+    assert rows[0][:2] == ['id', 'name'] and len(rows) == trainees + 1
+    assert not [name for name in map(str, job_dir.iterdir()) if name.endswith('.part')]
+
+
+def test_cancel_queued_and_running_jobs(client, db, job_dir):
+    queued = submit(client, EXPORT)
+    cancelled = client.post(f"/api/jobs/{queued['id']}/cancel", query_string=ADMIN).get_json()['job']
+    assert cancelled['status'] == 'cancelled'
+    assert client.post(f"/api/jobs/{queued['id']}/cancel", query_string=ADMIN).status_code == 409
+    assert client.get(f"/api/jobs/{queued['id']}/download", query_string=ADMIN).status_code == 409
+    assert jobs.claim(db, 'test-worker') is None
+
+    running = submit(client, EXPORT)
+    job = jobs.claim(db, 'test-worker')
+    assert job['id'] == running['id']
+    stopping = client.post(f"/api/jobs/{running['id']}/cancel", query_string=ADMIN).get_json()['job']
+    assert stopping['status'] == 'running' and stopping['cancel_requested']
+    # The worker notices at its first checkpoint and leaves no partial file behind
+    assert jobs.run(db, job) == 'cancelled'
+    assert poll(client, running['id'])['status'] == 'cancelled'
+    assert list(job_dir.iterdir()) == []
+
+
+def test_jobs_are_scoped_to_their_owner(client, db):
+    assert client.post('/api/jobs', query_string=OWNER, json=EXPORT).status_code == 400
+    report = submit(client, {'kind': 'report', 'params': {'metric': 'trainees', 'bucket': 'month',
+                                                         'format': 'ndjson'}}, scope=OWNER)
+    other = {'role': 'professional', 'user_id': OTHER_PROFESSIONAL_ID}
+    assert client.get(f"/api/jobs/{report['id']}", query_string=other).status_code == 404
+    assert client.post(f"/api/jobs/{report['id']}/cancel", query_string=other).status_code == 404
+    assert report['id'] not in [job['id'] for job in client.get('/api/jobs', query_string=other).get_json()['jobs']]
+
+    assert run_next(db, report['id']) == 'done'
+    assert poll(client, report['id'], scope=OWNER)['status'] == 'done'
+    assert client.get(f"/api/jobs/{report['id']}/download", query_string=other).status_code == 404
+    assert client.get(f"/api/jobs/{report['id']}/download", query_string=OWNER).status_code == 200
@@ -0,0 +1,60 @@
+"""Keyset pagination of the list endpoints"""
+from conftest import PROFESSIONAL_ID
+
+
+def read_pages(client, path, key, params):
+    """Follow next_cursor to the last page; returns (row ids in order, pages read, totals reported)"""
+    ids, pages, totals = [], 0, set()
+    cursor, seen = None, set()
+    while True:
+        body = client.get(path, query_string={**params, **({'cursor': cursor} if cursor else {})}).get_json()
+        assert body['success'], body
+        ids += [row['id'] for row in body[key]]
+        pages += 1
+        totals.add(body.get('total'))
+        cursor = body['next_cursor']
+        if cursor is None:
+            return ids, pages, totals
+        assert cursor not in seen, f"cursor repeated after {ids}"
+        seen.add(cursor)
+
+
+def test_cursor_pages_cover_the_list_once_in_order(client, make_trainees, tag):
+    # One shared training date so the order falls back to the id tie-breaker
+    make_trainees(tag, 7, training_date='2024-05-05')
+    for sort, order in (('training_date', 'desc'), ('name', 'asc')):
+        params = {'role': 'professional', 'user_id': PROFESSIONAL_ID, 'search': tag, 'sort': sort, 'order': order}
+        unpaged = [row['id'] for row in client.get('/api/get_trainees', query_string=params).get_json()['trainees']]
+        assert len(unpaged) == 7
+
+        ids, pages, totals = read_pages(client, '/api/get_trainees', 'trainees',
+                                        {**params, 'limit': 3, 'include_total': 1})
+        assert ids == unpaged
+        assert pages == 3
+        assert totals == {7}
+        if sort == 'training_date':
+            assert ids == sorted(ids, reverse=True)
+
+
+def test_trainings_page_on_two_sort_columns(client, make_training, tag):
+    for n, (date, time) in enumerate([('2024-03-01', '09:00:00'), ('2024-03-01', '14:00:00'),
+                                      ('2024-03-01', '14:00:00'), ('2024-02-01', '18:00:00')]):
+        make_training(f"{tag} {n}", training_date=date, training_time=time)
+    params = {'role': 'admin', 'search': tag, 'sort': 'training_date', 'order': 'asc'}
+    unpaged = [row['id'] for row in client.get('/api/get_trainings', query_string=params).get_json()['trainings']]
+
+    ids, pages, _ = read_pages(client, '/api/get_trainings', 'trainings', {**params, 'limit': 1})
+    assert ids == unpaged
+    assert pages == 4
+
+
+def test_cursor_must_match_the_sort(client, make_trainees, tag):
+    make_trainees(tag, 2)
+    params = {'role': 'admin', 'search': tag, 'sort': 'name', 'limit': 1}
+    cursor = client.get('/api/get_trainees', query_string=params).get_json()['next_cursor']
+    assert cursor
+
+    response = client.get('/api/get_trainees', query_string={**params, 'sort': 'created_at', 'cursor': cursor})
+    assert response.status_code == 400
+    response = client.get('/api/get_trainees', query_string={**params, 'cursor': 'not-a-cursor'})
+    assert response.status_code == 400
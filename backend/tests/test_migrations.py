@@ -0,0 +1,65 @@
+"""Upgrading a populated database fills the derived tables it creates"""
+import os
+import shutil
+
+import app as backend
+import migrations
+import sqlite_backend
+
+ADMIN = {'role': 'admin'}
+
+
+def sqlite_migration(tmp_path, name, tables):
+    """A migration file creating ``tables`` with the SQLite DDL (for MySQL-only migration files)"""
+    statements = [statement for statement in sqlite_backend._schema_statements()
+                  if any(f" {table} " in statement for table in tables)]
+    (tmp_path / name).write_text(''.join(statements), encoding='utf-8')
+
+
+def upgrade_to(connection, tmp_path, *versions):
+    """Mark ``versions`` as pending and upgrade with the migration files in ``tmp_path``"""
+    for migration in migrations.discover():
+        if migration.version in versions and not (tmp_path / os.path.basename(migration.path)).exists():
+            shutil.copy(migration.path, tmp_path)
+    cursor = connection.cursor()
+    migrations.applied_versions(cursor)
+    cursor.execute(f"DELETE FROM schema_migrations WHERE version IN ({', '.join(['%s'] * len(versions))})",
+                   versions)
+    cursor.close()
+    return migrations.upgrade(connection, directory=str(tmp_path), log=lambda message: None)
+
+
+def test_upgrade_fills_stat_rollups(client, db, make_trainees, make_training, tag, tmp_path):
+    make_trainees(tag, 6)
+    make_training(tag)
+    expected = client.get('/api/stats', query_string=ADMIN).get_json()
+    assert expected['stats']['trainees']['total'] > 0
+
+    cursor = db.cursor()
+    cursor.execute("DROP TABLE stat_rollups")
+    cursor.close()
+    applied = upgrade_to(db, tmp_path, 3)
+    assert [migration.version for migration in applied] == [3]
+
+    backend.result_cache.clear()
+    assert client.get('/api/stats', query_string=ADMIN).get_json() == expected
+
+
+def test_upgrade_fills_report_summaries(client, db, make_trainees, make_training, tag, tmp_path):
+    make_trainees(tag, 6)
+    make_training(tag, duration_hours=3.5)
+    queries = [{**ADMIN, 'metric': metric, 'bucket': bucket, 'group_by': 'block'}
+               for metric in ('trainees', 'trainings') for bucket in ('day', 'quarter')]
+    expected = [client.get('/api/reports', query_string=query).get_json() for query in queries]
+    assert all(body['rows'] for body in expected)
+
+    cursor = db.cursor()
+    cursor.execute("DROP TABLE report_trainees")
+    cursor.execute("DROP TABLE report_trainings")
+    cursor.close()
+    sqlite_migration(tmp_path, '0004_report_summaries.sql', ('report_trainees', 'report_trainings'))
+    applied = upgrade_to(db, tmp_path, 4)
+    assert [migration.version for migration in applied] == [4]
+
+    backend.result_cache.clear()
+    assert [client.get('/api/reports', query_string=query).get_json() for query in queries] == expected
@@ -0,0 +1,45 @@
+"""Result cache: cached reads and their invalidation by writes"""
+import time
+
+from app import result_cache
+from result_cache import MemoryCache
+
+
+def test_write_invalidates_cached_read(client, make_trainees, tag):
+    (trainee_id,) = make_trainees(tag, 1, block='Raipur')
+    # Not the parameters make_trainees looked the row up with, so not cached yet
+    params = {'role': 'admin', 'search': tag, 'sort': 'name'}
+    assert client.get('/api/get_trainees', query_string=params).headers['X-Cache'] == 'MISS'
+    cached = client.get('/api/get_trainees', query_string=params)
+    assert cached.headers['X-Cache'] == 'HIT'
+    assert cached.get_json()['trainees'][0]['block'] == 'Raipur'
+
+    invalidations = result_cache.info()['invalidations']
+    assert client.patch(f"/api/edit_trainee/{trainee_id}", json={'block': 'Durg'}).status_code == 200
+    # commit_write drops the entries built from trainees, not just makes them unreachable
+    assert result_cache.info()['invalidations'] > invalidations
+
+    fresh = client.get('/api/get_trainees', query_string=params)
+    assert fresh.headers['X-Cache'] == 'MISS'
+    assert fresh.get_json()['trainees'][0]['block'] == 'Durg'
+
+
+def test_memory_cache_bounds_and_tags():
+    cache = MemoryCache(max_entries=2, max_bytes=100, ttl=60)
+    cache.set('a', (b'1', 'application/json'), ['trainees'])
+    cache.set('b', (b'2', 'application/json'), ['trainings'])
+    assert cache.get('a') is not None
+    cache.set('c', (b'3', 'application/json'), ['trainees'])
+    # 'b' was the least recently used
+    assert cache.get('b') is None and cache.get('a') is not None
+
+    cache.set('big', (b'x' * 90, 'application/json'), ['users'])
+    assert cache.info()['bytes'] <= 100
+
+    cache.invalidate(['trainees'])
+    assert cache.get('a') is None and cache.get('c') is None
+
+    cache.set('short', (b'4', 'application/json'), ['users'], ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get('short') is None
+    assert cache.info()['expirations'] == 1
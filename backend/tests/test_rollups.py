@@ -0,0 +1,92 @@
+"""The incrementally maintained stats and report tables match a rebuild from the base tables"""
+import reports
+import rollups
+from conftest import PROFESSIONAL_ID, trainee_payload, training_payload
+
+REPORT_COLUMNS = {
+    'report_trainees': ('grain', 'period_start', 'block', 'department', 'registered_by'),
+    'report_trainings': ('grain', 'period_start', 'block', 'status', 'conducted_by'),
+}
+
+
+def snapshot(connection):
+    """Non-zero rows of stat_rollups and the report tables (deltas may leave zero rows behind)"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT owner_id, metric, bucket, value FROM stat_rollups WHERE value <> 0")
+        tables = {'stat_rollups': sorted(cursor.fetchall())}
+        for spec in reports.REPORTS.values():
+            measures = list(spec.measures)
+            cursor.execute(f"SELECT {', '.join(REPORT_COLUMNS[spec.table] + tuple(measures))} FROM {spec.table}")
+            key_size = len(REPORT_COLUMNS[spec.table])
+            tables[spec.table] = sorted((tuple(str(value) for value in row[:key_size]),
+                                         tuple(float(value) for value in row[key_size:]))
+                                        for row in cursor.fetchall() if any(row[key_size:]))
+        return tables
+    finally:
+        cursor.close()
+
+
+def test_rollups_match_rebuild_after_mixed_writes(client, db, make_trainees, make_training, tag):
+    admin = {'role': 'admin'}
+    trainee_ids = make_trainees(tag, 12)
+    single = trainee_payload(f"{tag} single", 40, cpr_training='on', first_aid_kit_given='1')
+    assert client.post('/api/register_trainee', json=single).status_code == 200
+
+    # Edits that move trainees between blocks, departments, months and flag values
+    edited = trainee_payload(f"{tag} edited", 7, block='Bastar', cpr_training='y', life_saving_skills=True)
+    assert client.put(f"/api/edit_trainee/{trainee_ids[0]}", query_string=admin, json=edited).status_code == 200
+    patch = {'department': 'Neurology', 'training_date': '2023-11-30', 'first_aid_kit_given': 'yes'}
+    assert client.patch(f"/api/edit_trainee/{trainee_ids[1]}", query_string=admin, json=patch).status_code == 200
+    assert client.delete(f"/api/delete_trainee/{trainee_ids[2]}").status_code == 200
+    response = client.post('/api/trainees/bulk_delete', query_string=admin, json={'ids': trainee_ids[3:6]})
+    assert response.status_code == 200
+
+    training_ids = [make_training(f"{tag} training {n}", duration_hours=1.5 + n) for n in range(4)]
+    assert client.patch(f"/api/edit_training/{training_ids[0]}", query_string=admin,
+                        json={'status': 'Ongoing', 'block': 'Durg', 'training_date': '2024-02-29'}).status_code == 200
+    put = training_payload(f"{tag} training 1", status='Completed', duration_hours=4.5, block='Bastar')
+    assert client.put(f"/api/edit_training/{training_ids[1]}", query_string=admin, json=put).status_code == 200
+    response = client.post('/api/trainings/bulk_status', query_string=admin,
+                           json={'status': 'Cancelled', 'ids': training_ids[2:]})
+    assert response.status_code == 200
+    assert client.delete(f"/api/delete_training/{training_ids[3]}").status_code == 200
+
+    # A professional who registers trainees and trainings, then is removed with them
+    professional = {'name': f"{tag} doctor", 'username': tag, 'mobile_number': '7000000001',
+                    'gender': 'Female', 'age': 40}
+    assert client.post('/api/register_professional', json=professional).status_code == 200
+    found = client.get('/api/get_professionals', query_string={**admin, 'search': tag}).get_json()
+    (professional_id,) = [row['id'] for row in found['professionals']]
+    rows = [trainee_payload(f"{tag} other {n}", n, registered_by=professional_id) for n in range(4)]
+    assert client.post('/api/trainees/bulk', json=rows).get_json()['accepted'] == 4
+    make_training(f"{tag} other training", conducted_by=professional_id)
+    assert client.delete(f"/api/delete_professional/{professional_id}").status_code == 200
+
+    operations = [
+        {'key': f"{tag}-1", 'op': 'create', 'entity': 'trainee', 'data': trainee_payload(f"{tag} synced", 5)},
+        {'key': f"{tag}-2", 'op': 'edit', 'entity': 'trainee', 'ref': f"{tag}-1", 'data': {'block': 'Durg'}},
+        {'key': f"{tag}-3", 'op': 'delete', 'entity': 'trainee', 'id': trainee_ids[6]},
+    ]
+    response = client.post('/api/sync', json={'user_id': PROFESSIONAL_ID, 'operations': operations})
+    assert [result['status'] for result in response.get_json()['results']] == ['created', 'updated', 'deleted']
+
+    maintained = snapshot(db)
+    rollups.rebuild(db)
+    reports.backfill(db)
+    assert snapshot(db) == maintained
+
+
+def test_non_numeric_owner_is_rejected_before_counting(client, db, tag):
+    before = snapshot(db)
+    response = client.post('/api/register_trainee', json=trainee_payload(tag, registered_by='drsmith'))
+    assert response.status_code == 400
+    response = client.post('/api/create_training', json=training_payload(tag, conducted_by='2x'))
+    assert response.status_code == 400
+    response = client.post('/api/trainees/bulk', json=[trainee_payload(tag, registered_by='drsmith')])
+    assert response.status_code == 200 and response.get_json()['rejected'] == 1
+    operation = {'key': f"{tag}-1", 'op': 'create', 'entity': 'training',
+                 'data': training_payload(tag, conducted_by='abc')}
+    response = client.post('/api/sync', json={'user_id': PROFESSIONAL_ID, 'operations': [operation]})
+    assert response.status_code == 200 and response.get_json()['results'][0]['status'] == 'rejected'
+    assert snapshot(db) == before
@@ -0,0 +1,50 @@
+"""/api/search: word-prefix matches, ranking and owner scoping"""
+from werkzeug.datastructures import MultiDict
+
+from conftest import OTHER_PROFESSIONAL_ID, PROFESSIONAL_ID, trainee_payload
+from search import build_search_queries
+
+OWNER = {'role': 'professional', 'user_id': PROFESSIONAL_ID}
+
+
+def search(client, q, **params):
+    response = client.get('/api/search', query_string={'q': q, **params})
+    assert response.status_code == 200, response.get_json()
+    return {name: [row['name' if name != 'trainings' else 'title'] for row in rows]
+            for name, rows in response.get_json()['results'].items()}
+
+
+def test_prefix_search_hits_and_ranks_name_prefix_first(client, tag):
+    for name in (f"{tag} Rajesh Kumar", f"Kumar {tag} Rajesh"):
+        assert client.post('/api/register_trainee', json=trainee_payload(name)).status_code == 200
+
+    # Every word has to start a word of the row, in any order
+    assert sorted(search(client, f"{tag} raj kum", **OWNER)['trainees']) == [f"Kumar {tag} Rajesh",
+                                                                            f"{tag} Rajesh Kumar"]
+    # A name starting with the whole query ranks above the newer row
+    assert search(client, f"{tag} RAJ", **OWNER)['trainees'] == [f"{tag} Rajesh Kumar", f"Kumar {tag} Rajesh"]
+    assert search(client, f"{tag} esh", **OWNER)['trainees'] == []
+
+
+def test_search_is_scoped_to_the_owner(client, make_training, tag):
+    assert client.post('/api/register_trainee', json=trainee_payload(f"{tag} own")).status_code == 200
+    other = trainee_payload(f"{tag} other", registered_by=OTHER_PROFESSIONAL_ID)
+    assert client.post('/api/register_trainee', json=other).status_code == 200
+    make_training(f"{tag} own session")
+    make_training(f"{tag} other session", conducted_by=OTHER_PROFESSIONAL_ID)
+
+    results = search(client, tag, **OWNER)
+    assert results['trainees'] == [f"{tag} own"]
+    assert results['trainings'] == [f"{tag} own session"]
+    assert 'professionals' not in results
+
+    results = search(client, tag, role='admin')
+    assert sorted(results['trainees']) == [f"{tag} other", f"{tag} own"]
+    assert sorted(results['trainings']) == [f"{tag} other session", f"{tag} own session"]
+
+
+def test_mysql_query_uses_required_prefix_terms():
+    (_, _, params), = build_search_queries(MultiDict({'q': 'raj +kum*', 'types': 'trainees'}), owner_id=PROFESSIONAL_ID)
+    # Boolean-mode operators typed by the user are dropped, every word becomes +word*
+    assert params[0] == '+raj* +kum*'
+    assert PROFESSIONAL_ID in params
@@ -0,0 +1,87 @@
+"""/api/sync idempotency: replayed keys, reused keys and concurrent resends (see sync.py)"""
+import threading
+
+from conftest import OTHER_PROFESSIONAL_ID, PROFESSIONAL_ID, trainee_payload, training_payload
+
+
+def send(client, operations, user_id=PROFESSIONAL_ID):
+    response = client.post('/api/sync', json={'user_id': user_id, 'operations': operations})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['results']
+
+
+def trainee_names(client, tag):
+    params = {'role': 'admin', 'search': tag, 'sort': 'name', 'order': 'asc'}
+    found = client.get('/api/get_trainees', query_string=params).get_json()
+    return [(row['name'], row['block']) for row in found['trainees']]
+
+
+def batch(tag):
+    return [
+        {'key': f"{tag}-1", 'op': 'create', 'entity': 'trainee', 'data': trainee_payload(f"{tag} a", 1)},
+        {'key': f"{tag}-2", 'op': 'edit', 'entity': 'trainee', 'ref': f"{tag}-1", 'data': {'block': 'Bastar'}},
+        {'key': f"{tag}-3", 'op': 'create', 'entity': 'training', 'data': training_payload(tag)},
+        {'key': f"{tag}-4", 'op': 'edit', 'entity': 'trainee', 'id': 999999999, 'data': {'block': 'Durg'}},
+        {'key': f"{tag}-5", 'op': 'create', 'entity': 'trainee', 'data': {'name': f"{tag} incomplete"}},
+    ]
+
+
+def test_resent_batch_replays_stored_results(client, tag):
+    first = send(client, batch(tag))
+    assert [result['status'] for result in first] == ['created', 'updated', 'created', 'not_found', 'rejected']
+    assert first[1]['id'] == first[0]['id']
+    rows = trainee_names(client, tag)
+    assert rows == [(f"{tag} a", 'Bastar')]
+    cursor = client.get('/api/changes', query_string={'role': 'admin'}).get_json()['next_cursor']
+
+    again = send(client, batch(tag))
+    assert again == [{**result, 'replayed': True} for result in first]
+    assert trainee_names(client, tag) == rows
+    changes = client.get('/api/changes', query_string={'role': 'admin', 'since': cursor}).get_json()
+    assert changes['next_cursor'] == cursor
+
+    # A later batch can still refer to the earlier create by its key
+    edit = {'key': f"{tag}-6", 'op': 'edit', 'entity': 'trainee', 'ref': f"{tag}-1", 'data': {'block': 'Durg'}}
+    assert send(client, [edit]) == [{'key': f"{tag}-6", 'status': 'updated', 'entity': 'trainee',
+                                     'id': first[0]['id']}]
+
+
+def test_key_reused_for_another_operation_conflicts(client, tag):
+    operation = {'key': f"{tag}-1", 'op': 'create', 'entity': 'trainee', 'data': trainee_payload(f"{tag} a", 1)}
+    (created,) = send(client, [operation])
+    assert created['status'] == 'created'
+
+    changed = {**operation, 'data': trainee_payload(f"{tag} b", 2)}
+    (conflict,) = send(client, [changed])
+    assert conflict['status'] == 'conflict' and 'error' in conflict
+    assert [name for name, _ in trainee_names(client, tag)] == [f"{tag} a"]
+    # The stored result is untouched by the conflicting attempt
+    assert send(client, [operation]) == [{**created, 'replayed': True}]
+
+    # Keys are per user: another professional's device may use the same one
+    (other,) = send(client, [changed], user_id=OTHER_PROFESSIONAL_ID)
+    assert other['status'] == 'created'
+    assert [name for name, _ in trainee_names(client, tag)] == [f"{tag} a", f"{tag} b"]
+
+
+def test_concurrent_resends_apply_once(app, tag):
+    operations = [{'key': f"{tag}-{n}", 'op': 'create', 'entity': 'trainee',
+                   'data': trainee_payload(f"{tag} {n}", n)} for n in range(5)]
+    barrier = threading.Barrier(4)
+    responses = []
+
+    def resend():
+        client = app.test_client()
+        barrier.wait()
+        responses.append(send(client, operations))
+
+    threads = [threading.Thread(target=resend) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(responses) == 4
+    assert sorted(sum(1 for result in results if not result.get('replayed')) for results in responses) == [0, 0, 0, 5]
+    assert len({tuple(result['id'] for result in results) for results in responses}) == 1
+    assert len(trainee_names(app.test_client(), tag)) == 5
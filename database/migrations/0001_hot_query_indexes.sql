@@ -0,0 +1,28 @@
+-- Composite indexes matched to the WHERE / ORDER BY of the hot handler queries.
+-- InnoDB appends the primary key to every secondary index, so each of these
+-- also serves the trailing "id" tie-breaker used by keyset pagination.
+-- The login lookup (username, password, role) is already a const lookup
+-- through the UNIQUE key on username and needs nothing extra.
+
+-- get_trainees (admin): ORDER BY t.created_at DESC, t.id DESC
+-- /api/data trainees:   ORDER BY created_at DESC
+ALTER TABLE trainees
+    ADD INDEX idx_trainees_created_at (created_at),
+    -- get_trainees (professional): WHERE t.registered_by = ? ORDER BY t.created_at DESC
+    -- get_professionals: COUNT(*) ... WHERE tr.registered_by = u.id
+    ADD INDEX idx_trainees_registered_by_created_at (registered_by, created_at);
+
+-- get_trainings (admin): ORDER BY t.training_date DESC, t.training_time DESC
+ALTER TABLE trainings
+    ADD INDEX idx_trainings_date_time (training_date, training_time),
+    -- get_trainings (professional): WHERE t.conducted_by = ? ORDER BY training_date, training_time
+    -- get_professionals: COUNT(*) ... WHERE t.conducted_by = u.id
+    ADD INDEX idx_trainings_conducted_by_date_time (conducted_by, training_date, training_time),
+    -- /api/data trainings: ORDER BY created_at DESC
+    ADD INDEX idx_trainings_created_at (created_at);
+
+-- get_professionals: WHERE u.role = 'professional' ORDER BY u.created_at DESC
+ALTER TABLE users
+    ADD INDEX idx_users_role_created_at (role, created_at),
+    -- /api/data users: ORDER BY created_at DESC
+    ADD INDEX idx_users_created_at (created_at);
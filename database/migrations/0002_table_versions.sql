@@ -0,0 +1,13 @@
+-- Cheap per-table version stamps. Every write path bumps the row for each
+-- table it modifies inside the same transaction; list endpoints derive their
+-- ETags from these so unchanged data can be answered with 304 Not Modified.
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO table_versions (table_name, version) VALUES
+    ('users', 0),
+    ('trainees', 0),
+    ('trainings', 0)
+ON DUPLICATE KEY UPDATE version = version;
@@ -0,0 +1,13 @@
+-- Counters behind /api/stats, maintained by every trainee / training /
+-- professional write in the same transaction. owner_id 0 holds the
+-- system-wide numbers; other rows hold one professional's share (trainees
+-- they registered, trainings they conduct). bucket is '' for plain totals
+-- and the dimension value (block, department, status) for breakdowns.
+-- "manage.py upgrade" fills it from the existing rows (migrations.BACKFILLS).
+CREATE TABLE IF NOT EXISTS stat_rollups (
+    owner_id INT NOT NULL,
+    metric VARCHAR(64) NOT NULL,
+    bucket VARCHAR(100) NOT NULL DEFAULT '',
+    value BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (owner_id, metric, bucket)
+);
@@ -0,0 +1,31 @@
+-- Summary tables behind /api/reports. Each row aggregates the trainees or
+-- trainings that share a training_date bucket and dimension values; grain
+-- 'day' serves day/week reports and grain 'month' serves month/quarter
+-- reports. Write handlers keep them current in their transaction;
+-- "manage.py upgrade" fills them from the existing rows (migrations.BACKFILLS)
+-- and "manage.py backfill-reports" rebuilds them in chunks.
+CREATE TABLE IF NOT EXISTS report_trainees (
+    grain ENUM('day', 'month') NOT NULL,
+    period_start DATE NOT NULL,
+    block VARCHAR(20) NOT NULL,
+    department VARCHAR(100) NOT NULL,
+    registered_by INT NOT NULL,
+    trainees INT NOT NULL DEFAULT 0,
+    cpr_training INT NOT NULL DEFAULT 0,
+    first_aid_kit_given INT NOT NULL DEFAULT 0,
+    life_saving_skills INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (grain, period_start, block, department, registered_by),
+    INDEX idx_report_trainees_owner (registered_by, grain, period_start)
+);
+
+CREATE TABLE IF NOT EXISTS report_trainings (
+    grain ENUM('day', 'month') NOT NULL,
+    period_start DATE NOT NULL,
+    block VARCHAR(20) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    conducted_by INT NOT NULL,
+    trainings INT NOT NULL DEFAULT 0,
+    hours DECIMAL(12,1) NOT NULL DEFAULT 0,
+    PRIMARY KEY (grain, period_start, block, status, conducted_by),
+    INDEX idx_report_trainings_owner (conducted_by, grain, period_start)
+);
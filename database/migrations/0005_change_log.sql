@@ -0,0 +1,24 @@
+-- Delta sync for /api/changes: trainees get the updated_at column trainings
+-- already have, and every write appends (table, row id, upsert/delete) entries
+-- to change_log in its transaction. Deletes cascaded from a professional are
+-- logged row by row, so clients see them as deletions too.
+ALTER TABLE trainees
+    ADD COLUMN updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP;
+
+CREATE TABLE IF NOT EXISTS change_log (
+    seq BIGINT AUTO_INCREMENT PRIMARY KEY,
+    table_name VARCHAR(32) NOT NULL,
+    row_id INT NOT NULL,
+    op ENUM('upsert', 'delete') NOT NULL,
+    owner_id INT NOT NULL,
+    changed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_change_log_owner_seq (owner_id, seq),
+    INDEX idx_change_log_changed_at (changed_at)
+);
+
+-- 'change_log' is the row writers lock while appending (keeps seq order equal
+-- to commit order); 'change_log_pruned' holds the highest pruned seq.
+INSERT INTO table_versions (table_name, version) VALUES
+    ('change_log', 0),
+    ('change_log_pruned', 0)
+ON DUPLICATE KEY UPDATE version = version;
@@ -0,0 +1,22 @@
+-- Indexes behind /api/search (see backend/search.py).
+-- The FULLTEXT indexes use the default parser; queries use boolean-mode
+-- prefix terms, so words shorter than innodb_ft_min_token_size (3) are
+-- still found as prefixes of longer words. Building a FULLTEXT index on a
+-- large table rebuilds it; run this migration off-peak.
+
+ALTER TABLE trainees
+    ADD FULLTEXT INDEX ft_trainees_search (name, address, department);
+
+-- Digit-only queries are mobile number prefixes, ordered by mobile_number
+ALTER TABLE trainees
+    ADD INDEX idx_trainees_mobile_number (mobile_number),
+    ADD INDEX idx_trainees_registered_by_mobile_number (registered_by, mobile_number);
+
+ALTER TABLE trainings
+    ADD FULLTEXT INDEX ft_trainings_search (title, training_topic, description);
+
+ALTER TABLE users
+    ADD FULLTEXT INDEX ft_users_search (name, specialization);
+
+ALTER TABLE users
+    ADD INDEX idx_users_role_mobile_number (role, mobile_number);
@@ -0,0 +1,19 @@
+-- Links trainees to the trainings they are enrolled in. trainings.current_trainees
+-- is maintained by the enrollment endpoints with a conditional UPDATE that
+-- enforces max_trainees (see backend/enrollments.py); deleting a trainee or a
+-- training cascades to its enrollments.
+CREATE TABLE IF NOT EXISTS training_enrollments (
+    training_id INT NOT NULL,
+    trainee_id INT NOT NULL,
+    enrolled_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (training_id, trainee_id),
+    INDEX idx_training_enrollments_trainee (trainee_id),
+    FOREIGN KEY (training_id) REFERENCES trainings(id) ON DELETE CASCADE,
+    FOREIGN KEY (trainee_id) REFERENCES trainees(id) ON DELETE CASCADE
+);
+
+-- Existing sessions have no enrollments yet
+UPDATE trainings SET current_trainees = 0;
+
+INSERT INTO table_versions (table_name, version) VALUES ('training_enrollments', 0)
+ON DUPLICATE KEY UPDATE version = version;
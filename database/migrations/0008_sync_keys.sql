@@ -0,0 +1,15 @@
+-- Idempotency keys for /api/sync: the result of each operation a device sent,
+-- stored in the operation's transaction so a resent batch is answered from
+-- here instead of being applied twice. Expired keys are removed by
+-- "manage.py prune-sync-keys" (see backend/sync.py).
+CREATE TABLE IF NOT EXISTS sync_keys (
+    user_id INT NOT NULL,
+    idempotency_key VARCHAR(64) NOT NULL,
+    request_hash CHAR(64) NOT NULL,
+    result TEXT NOT NULL,
+    created_at DATETIME NOT NULL,
+    expires_at DATETIME NOT NULL,
+    PRIMARY KEY (user_id, idempotency_key),
+    INDEX idx_sync_keys_expires_at (expires_at),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
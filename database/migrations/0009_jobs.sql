@@ -0,0 +1,27 @@
+-- Background export and report jobs (/api/jobs). Requests queue a row here;
+-- the worker processes started by "manage.py worker" claim it, record
+-- progress and a heartbeat after every chunk, and store the name of the
+-- compressed output file (see backend/jobs.py). owner_id is NULL for jobs
+-- submitted by an admin.
+CREATE TABLE IF NOT EXISTS jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    kind ENUM('export', 'report') NOT NULL,
+    params TEXT NOT NULL,
+    owner_id INT NULL,
+    status ENUM('queued', 'running', 'done', 'failed', 'cancelled') NOT NULL DEFAULT 'queued',
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    attempts INT NOT NULL DEFAULT 0,
+    rows_written BIGINT NOT NULL DEFAULT 0,
+    progress FLOAT NOT NULL DEFAULT 0,
+    artifact VARCHAR(255) NULL,
+    artifact_bytes BIGINT NULL,
+    error TEXT NULL,
+    worker VARCHAR(128) NULL,
+    created_at DATETIME NOT NULL,
+    started_at DATETIME NULL,
+    heartbeat_at DATETIME NULL,
+    finished_at DATETIME NULL,
+    INDEX idx_jobs_status (status, id),
+    INDEX idx_jobs_owner (owner_id, id),
+    INDEX idx_jobs_created_at (created_at)
+);
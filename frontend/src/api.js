@@ -18,6 +18,7 @@ export const professionalAPI = {
   register: (data) => api.post('/register_professional', data),
   getAll: () => api.get('/get_professionals'),
   update: (id, data) => api.put(`/edit_professional/${id}`, data),
+  patch: (id, changes) => api.patch(`/edit_professional/${id}`, changes),
   delete: (id) => api.delete(`/delete_professional/${id}`),
 };
 
@@ -25,14 +26,21 @@ export const traineeAPI = {
   register: (data) => api.post('/register_trainee', data),
   getAll: (userId, role) => api.get(`/get_trainees?user_id=${userId}&role=${role}`),
   update: (id, data) => api.put(`/edit_trainee/${id}`, data),
+  patch: (id, changes) => api.patch(`/edit_trainee/${id}`, changes),
   delete: (id) => api.delete(`/delete_trainee/${id}`),
+  // target is { ids: [...] } or { filter: { block, department, ... } }
+  bulkDelete: (target) => api.post('/trainees/bulk_delete', target, { params: { role: 'admin' } }),
 };
 
 export const trainingAPI = {
   create: (data) => api.post('/create_training', data),
   getAll: (userId, role) => api.get(`/get_trainings?user_id=${userId}&role=${role}`),
   update: (id, data) => api.put(`/edit_training/${id}`, data),
+  patch: (id, changes) => api.patch(`/edit_training/${id}`, changes),
   delete: (id) => api.delete(`/delete_training/${id}`),
+  bulkStatus: (status, target) =>
+    api.post('/trainings/bulk_status', { status, ...target }, { params: { role: 'admin' } }),
+  bulkDelete: (target) => api.post('/trainings/bulk_delete', target, { params: { role: 'admin' } }),
 };
 
 export const healthAPI = {
@@ -43,4 +51,68 @@ export const dataAPI = {
   getAllData: () => api.get('/data'),
 };
 
+// Delta sync: call without a cursor to get the current one, load the lists,
+// then poll with the returned next_cursor
+export const changesAPI = {
+  since: (userId, role, cursor) =>
+    api.get('/changes', { params: { user_id: userId, role, ...(cursor ? { since: cursor } : {}) } }),
+};
+
+export const enrollmentAPI = {
+  list: (trainingId, userId, role) =>
+    api.get(`/trainings/${trainingId}/enrollments`, { params: { user_id: userId, role } }),
+  enroll: (trainingId, traineeIds) =>
+    api.post(`/trainings/${trainingId}/enrollments`, { trainee_ids: traineeIds }),
+  unenroll: (trainingId, traineeIds) =>
+    api.delete(`/trainings/${trainingId}/enrollments`, { data: { trainee_ids: traineeIds } }),
+};
+
+export const searchAPI = {
+  search: (q, userId, role, types) =>
+    api.get('/search', { params: { q, user_id: userId, role, ...(types ? { types: types.join(',') } : {}) } }),
+};
+
+// Apply one table's {upserted, deleted} entries from /api/changes to a list of rows
+export const applyChanges = (rows, { upserted = [], deleted = [] } = {}) => {
+  const replaced = new Map(upserted.map((row) => [row.id, row]));
+  const removed = new Set(deleted);
+  const merged = rows
+    .filter((row) => !removed.has(row.id))
+    .map((row) => {
+      const updated = replaced.get(row.id);
+      replaced.delete(row.id);
+      return updated || row;
+    });
+  return [...replaced.values(), ...merged];
+};
+
+// Rebuild row objects from a ?layout=columnar response table
+export const decodeColumnar = ({ count, columns }) => {
+  const decoded = Object.entries(columns).map(([name, column]) => {
+    if (Array.isArray(column)) {
+      return [name, (i) => column[i]];
+    }
+    if (column.dict) {
+      return [name, (i) => (column.codes[i] === null ? null : column.dict[column.codes[i]])];
+    }
+    const bits = Uint8Array.from(atob(column.bits), (c) => c.charCodeAt(0));
+    const nulls = column.nulls ? Uint8Array.from(atob(column.nulls), (c) => c.charCodeAt(0)) : null;
+    return [name, (i) => {
+      if (nulls && (nulls[i >> 3] >> (i & 7)) & 1) {
+        return null;
+      }
+      return (bits[i >> 3] >> (i & 7)) & 1;
+    }];
+  });
+  const rows = new Array(count);
+  for (let i = 0; i < count; i += 1) {
+    const row = {};
+    decoded.forEach(([name, read]) => {
+      row[name] = read(i);
+    });
+    rows[i] = row;
+  }
+  return rows;
+};
+
 export default api;
@@ -4,4 +4,5 @@ echo =====================================
 cd backend
 set FLASK_ENV=production
 set SECRET_KEY=suraksha-production-secret-key-2024
-gunicorn --bind 0.0.0.0:5000 --workers 4 app:app
+rem gevent workers: each /api/events stream is a greenlet, not a whole worker
+gunicorn --bind 0.0.0.0:5000 --workers 4 --worker-class gevent --worker-connections 10000 "app:create_app()"